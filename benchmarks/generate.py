@@ -0,0 +1,141 @@
+import random
+from typing import Any
+
+
+OPERATIONS = ("upper", "lower", "reverse", "base64")
+
+
+def generate_manifest(
+    width: int = 8,
+    depth: int = 3,
+    list_length: int = 8,
+    expression_density: float = 0.1,
+    ref_fanout: int = 0,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """
+    Generate a synthetic manifest. Every mapping has `width` keys down to `depth` levels,
+    so the manifest has `width ** depth` leaves.
+
+    :param width: The number of keys in each mapping.
+    :type width: int
+    :param depth: The number of levels of nested mappings.
+    :type depth: int
+    :param list_length: The length of the lists among the leaves.
+    :type list_length: int
+    :param expression_density: The fraction of string leaves that are expressions.
+    :type expression_density: float
+    :param ref_fanout: The number of keys that reference the same shared value with `$ref`.
+    :type ref_fanout: int
+    :param seed: The seed of the random generator.
+    :type seed: int
+    :return: The manifest.
+    :rtype: dict[str, Any]
+    """
+    rng = random.Random(seed)
+
+    def _leaf(index: int) -> Any:
+        kind = index % 4
+
+        if kind == 0:
+            if rng.random() < expression_density:
+                return f"${rng.choice(OPERATIONS)}{{value_{index}}}"
+            return f"value_{index}"
+        if kind == 1:
+            return rng.randint(0, 1_000_000)
+        if kind == 2:
+            return rng.random() < 0.5
+        return [rng.randint(0, 1000) for _ in range(list_length)]
+
+    def _mapping(level: int) -> dict[str, Any]:
+        if level == depth:
+            return {f"key_{index}": _leaf(index) for index in range(width)}
+        return {f"section_{index}": _mapping(level + 1) for index in range(width)}
+
+    manifest = _mapping(1)
+
+    if ref_fanout:
+        manifest["shared"] = {"target": {"name": "shared", "values": list(range(list_length))}}
+        manifest["refs"] = {f"ref_{index}": "$ref{shared.target}" for index in range(ref_fanout)}
+
+    return manifest
+
+
+def generate_layers(
+    layers: int = 3, override_fraction: float = 0.1, seed: int = 0, **kwargs
+) -> list[dict[str, Any]]:
+    """
+    Generate a base manifest followed by overlay layers that each override a fraction
+    of its leaves, as with a base config file and environment specific files.
+
+    :param layers: The total number of layers, including the base.
+    :type layers: int
+    :param override_fraction: The fraction of leaves each overlay overrides.
+    :type override_fraction: float
+    :param seed: The seed of the random generator.
+    :type seed: int
+    :param kwargs: Additional keyword arguments to pass to `generate_manifest`.
+    :return: The layers, base first.
+    :rtype: list[dict[str, Any]]
+    """
+    base = generate_manifest(seed=seed, **kwargs)
+    paths = leaf_paths(base)
+    rng = random.Random(seed)
+    result = [base]
+
+    for layer in range(1, layers):
+        overlay: dict[str, Any] = {}
+
+        for path in rng.sample(paths, max(1, int(len(paths) * override_fraction))):
+            target = overlay
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = f"override_{layer}"
+
+        result.append(overlay)
+
+    return result
+
+
+def generate_env_vars(
+    count: int = 1000, prefix: str = "CONFIG", delimiter: str = "__", depth: int = 3
+) -> dict[str, str]:
+    """
+    Generate environment variables that override nested keys.
+
+    :param count: The number of environment variables.
+    :type count: int
+    :return: The environment variables.
+    :rtype: dict[str, str]
+    """
+    return {
+        delimiter.join(
+            [prefix] + [f"section_{(index >> level) % 8}" for level in range(depth - 1)]
+            + [f"key_{index}"]
+        ): str(index)
+        for index in range(count)
+    }
+
+
+def leaf_paths(data: dict[str, Any]) -> list[tuple[str, ...]]:
+    """
+    Get the paths of the leaves of nested mappings.
+
+    :param data: The nested mappings.
+    :type data: dict[str, Any]
+    :return: The path of each leaf.
+    :rtype: list[tuple[str, ...]]
+    """
+    paths = []
+    stack: list[tuple[tuple[str, ...], Any]] = [((), data)]
+
+    while stack:
+        path, value = stack.pop()
+
+        if isinstance(value, dict):
+            stack.extend((path + (key,), child) for key, child in value.items())
+        else:
+            paths.append(path)
+
+    return sorted(paths)
+
@@ -0,0 +1,205 @@
+"""
+Run the benchmarks and optionally compare the results against a baseline.
+
+    python -m benchmarks.run --size small --baseline benchmarks/baseline.json
+    python -m benchmarks.run --size small --output benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable
+
+from benchmarks.generate import generate_env_vars, generate_layers, leaf_paths
+from manifest import Instantiable, Manifest, __version__
+from manifest.hooks.expressions import resolve_expressions
+from manifest.parse import dump_to_file, load_from_file, parse_env_vars
+from manifest.utils import merge_dicts
+
+
+SIZES: dict[str, dict[str, Any]] = {
+    "small": {"width": 8, "depth": 3, "list_length": 8, "ref_fanout": 16},
+    "medium": {"width": 10, "depth": 4, "list_length": 16, "ref_fanout": 64},
+    "large": {"width": 12, "depth": 5, "list_length": 32, "ref_fanout": 256},
+}
+SERIALIZERS = ("json", "yaml", "toml")
+
+
+class BenchmarkManifest(Manifest, extra="allow"):
+    pass
+
+
+async def measure(func: Callable[[], Any | Awaitable[Any]], repeat: int) -> dict[str, Any]:
+    """
+    Time a benchmark, awaiting it if it's a coroutine function. The benchmark is run
+    once beforehand without timing it, to warm up caches and the thread pool.
+
+    :param func: The benchmark.
+    :param repeat: The number of times to run it.
+    :return: The min, median and mean duration in seconds.
+    """
+    durations = []
+
+    for index in range(repeat + 1):
+        start = time.perf_counter()
+        result = func()
+        if asyncio.iscoroutine(result):
+            await result
+        if index:
+            durations.append(time.perf_counter() - start)
+
+    return {
+        "min": min(durations),
+        "median": statistics.median(durations),
+        "mean": statistics.fmean(durations),
+        "repeat": repeat,
+    }
+
+
+async def run_benchmarks(
+    directory: str,
+    size: dict[str, Any],
+    layers: int,
+    expression_density: float,
+    repeat: int,
+    only: list[str] | None = None,
+) -> dict[str, dict[str, Any]]:
+    """
+    Generate the manifests and run every benchmark against them.
+
+    :return: The results of each benchmark by name.
+    """
+    manifests = generate_layers(layers=layers, expression_density=expression_density, **size)
+    base = manifests[0]
+    files = {}
+
+    for serializer in SERIALIZERS:
+        files[serializer] = [
+            os.path.join(directory, f"layer_{index}.{serializer}")
+            for index in range(len(manifests))
+        ]
+        for file, manifest in zip(files[serializer], manifests, strict=True):
+            await dump_to_file(file, manifest)
+
+    built = await BenchmarkManifest.build(files=files["json"])
+    keys = [".".join(path) for path in leaf_paths(base) if path[0].startswith("section")][::7]
+    env_vars = generate_env_vars(count=len(keys), depth=size["depth"])
+    instantiable = Instantiable[Any](
+        **{"__target__": "datetime.timedelta", "days": 1, "hours": 2}
+    )
+
+    benchmarks: dict[str, Callable[[], Any]] = {
+        "build": lambda: BenchmarkManifest.build(files=files["json"]),
+        **{
+            f"load_from_file[{serializer}]": (
+                lambda serializer=serializer: load_from_file(files[serializer][0])
+            )
+            for serializer in SERIALIZERS
+        },
+        "resolve_expressions": lambda: resolve_expressions(base),
+        "merge_dicts": lambda: merge_dicts(*manifests),
+        "parse_env_vars": lambda: parse_env_vars(env_vars, prefix="CONFIG"),
+        "get_by_key": lambda: [built.get_by_key(key) for key in keys[:100]],
+        "set_by_key": lambda: [built.set_by_key(key, "value") for key in keys[:100]],
+        "instantiate": lambda: [instantiable.instantiate() for _ in range(1000)],
+    }
+
+    return {
+        name: await measure(benchmark, repeat)
+        for name, benchmark in benchmarks.items()
+        if not only or name in only
+    }
+
+
+def compare(
+    results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]], tolerance: float
+) -> list[str]:
+    """
+    Compare the median durations against a baseline.
+
+    :return: The names of the benchmarks slower than the baseline by more than the tolerance.
+    """
+    regressions = []
+
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result["median"] / baseline[name]["median"]
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+
+        print(f"{name:<28} {ratio:6.2f}x {'REGRESSION' if ratio > 1 + tolerance else ''}")
+
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the python-manifest benchmarks")
+    parser.add_argument("--size", choices=list(SIZES), default="small")
+    parser.add_argument("--layers", type=int, default=3, help="The number of files to merge")
+    parser.add_argument("--expression-density", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--only", nargs="*", help="The names of the benchmarks to run")
+    parser.add_argument("--output", help="A path to write the results to as JSON")
+    parser.add_argument("--baseline", help="A path to results to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25,
+        help="The fraction slower than the baseline that counts as a regression",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = asyncio.run(
+            run_benchmarks(
+                directory,
+                SIZES[args.size],
+                layers=args.layers,
+                expression_density=args.expression_density,
+                repeat=args.repeat,
+                only=args.only,
+            )
+        )
+
+    for name, result in results.items():
+        print(f"{name:<28} {result['median'] * 1000:10.3f} ms")
+
+    report = {
+        "meta": {
+            "manifest": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "size": args.size,
+            "layers": args.layers,
+            "expression_density": args.expression_density,
+        },
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        if baseline["meta"]["size"] != args.size:
+            print(f"Baseline was recorded with size {baseline['meta']['size']}, not {args.size}")
+            return 1
+
+        print(f"\nCompared to {args.baseline}:")
+        if compare(results, baseline["results"], args.tolerance):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
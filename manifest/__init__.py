@@ -6,9 +6,11 @@ del metadata
 
 from manifest.base import Manifest  # noqa: E402
 from manifest.instantiable import Instantiable  # noqa: E402
+from manifest.options import BuildOptions  # noqa: E402
 
 
 __all__ = (
     "Manifest",
     "Instantiable",
+    "BuildOptions",
 )
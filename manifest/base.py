@@ -1,34 +1,338 @@
+import builtins
 import os
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Any, Callable, Type, TypeVar
 
 from dotenv import dotenv_values
 
+from manifest.executor import use_executor
+from manifest.hooks.expressions.budget import expression_budget
+from manifest.hooks.expressions.resolve import (
+    contains_expressions,
+    defer_expressions,
+    find_references,
+    resolve_key_expressions,
+)
+from manifest.layers import Layer, LayeredDict
+from manifest.options import BuildOptions
 from manifest.parse import (
     dump_to_file,
+    get_env_var_paths,
+    load_files,
     parse_env_vars,
     parse_files,
     parse_key_values,
 )
+from manifest.patch import PatchError, parse_patch_operation
+from manifest.profile import profile_build, profile_memory
 from manifest.pydantic import (
+    IS_V1,
     BaseModel,
+    PrivateAttr,
+    ValidationError,
+    get_extra_behavior,
+    get_field_names_by_alias,
+    get_fields,
     get_model_extras,
+    is_required_field,
     model_copy,
     model_dump,
+    set_field,
+    unset_field,
 )
+from manifest.tracing import span
 from manifest.utils import (
+    Missing,
+    SentinelMeta,
+    Wildcard,
+    compile_dot_path,
     get_by_dot_path,
+    get_by_parts,
     merge_dicts,
     merge_dicts_flat,
-    set_by_dot_path,
-    unset_by_dot_path,
+    parse_dot_path,
+    run_sync,
+    set_by_parts,
+    unset_by_parts,
 )
 
 
 T = TypeVar("T", bound="Manifest")
 
 
+async def _resolve_file_key(
+    document: dict[str, Any],
+    pending: set[str],
+    key: str,
+    resolving: tuple[str, ...] = (),
+) -> None:
+    """
+    Resolve the expressions of a top-level key of a loaded file in place, as loading the
+    file would have, after resolving any keys of the file it references.
+
+    :param document: The data of the file, with the values of resolved keys replaced.
+    :param pending: The keys of the file that still contain unresolved expressions.
+    :param key: The key to resolve.
+    :param resolving: The keys being resolved further up the chain.
+    :raises ValueError: If the references between keys form a cycle.
+    """
+    if key not in pending:
+        return
+
+    if key in resolving:
+        raise ValueError("Circular $ref detected: " + " -> ".join(resolving + (key,)))
+
+    for key_path in find_references(document[key]):
+        targets = list(pending) if key_path == "*" else [key_path.split(".", 1)[0]]
+
+        for target in [target for target in targets if target != key and target in pending]:
+            await _resolve_file_key(document, pending, target, resolving + (key,))
+
+    if key not in pending:
+        return
+
+    document[key] = await resolve_key_expressions(document, key)
+    pending.discard(key)
+
+
+async def _resolve_deferred(
+    layers: LayeredDict, pending: dict[str, set[str]], key: str
+) -> None:
+    """
+    Resolve a deferred top-level key in each of the file layers that set it, and merge
+    the resolved values back into the layers.
+
+    :param layers: The layers of the Manifest.
+    :param pending: The keys of each file layer that still contain unresolved expressions.
+    :param key: The key to resolve.
+    """
+    for name, keys in pending.items():
+        if key not in keys:
+            continue
+
+        document = dict(layers.get_layer(name).data)
+        await _resolve_file_key(document, keys, key)
+        layers.replace(name, document)
+
+
+def _file_layer_name(index: int) -> str:
+    # The files get layers by position so they can't collide with each other, such as a
+    # file passed twice, or with the other layers, while `Layer.source` keeps the path
+    return f"files[{index}]"
+
+
+def _is_pending(pending: dict[str, set[str]], key: str) -> bool:
+    return any(key in keys for keys in pending.values())
+
+
+def _pending_keys(data: dict[str, Any]) -> set[str]:
+    return {key for key, value in data.items() if contains_expressions(value)}
+
+
+def _get_path_in_model(data: Any, parts: tuple, start: int, live: bool) -> Any:
+    # Walk the attributes of models and the items of dicts and lists to the value at
+    # the parts of a dot path, dumping only that value unless live
+    for position in range(start, len(parts)):
+        key = parts[position]
+
+        if isinstance(data, BaseModel):
+            name = get_field_names_by_alias(type(data)).get(key, key)
+            extras = get_model_extras(data)
+
+            if name in get_fields(type(data)):
+                value = getattr(data, name)
+            elif name in extras:
+                value = extras[name]
+            else:
+                return None
+
+            if not live and position == len(parts) - 1:
+                # Dump the field through its model to keep any serializers of the field
+                return next(iter(model_dump(data, include={name}).values()), value)
+            data = value
+        elif isinstance(data, dict):
+            if key not in data:
+                return None
+            data = data[key]
+        elif isinstance(data, (list, tuple)):
+            if key is Wildcard:
+                return [_get_path_in_model(item, parts, position + 1, live) for item in data]
+            if not isinstance(key, int) or not -len(data) <= key < len(data):
+                return None
+            data = data[key]
+        else:
+            return None
+
+    return data if live else _dump_value(data)
+
+
+def _set_path_in_model(data: Any, parts: tuple, position: int, value: Any, unset: bool) -> Any:
+    # Get a copy of data with the value at the parts of a dot path set or unset, copying
+    # only the models and containers along the path and validating only the fields
+    # along it. Data is returned as is if there's nothing to unset
+    if isinstance(data, BaseModel):
+        return _set_path_in_fields(data, parts, position, value, unset)
+
+    if isinstance(data, (dict, list, tuple)):
+        return _set_path_in_container(data, parts, position, value, unset)
+
+    if unset:
+        return data
+
+    # A path can't go through anything else, as with `set_by_dot_path`
+    raise ValueError(f"Unsupported type: {type(data)}")
+
+
+def _set_path_in_fields(
+    data: BaseModel, parts: tuple, position: int, value: Any, unset: bool
+) -> BaseModel:
+    key = parts[position]
+
+    if not isinstance(key, str):
+        raise ValueError(f"Cannot index {type(data).__name__} with `{key}`")
+
+    name = get_field_names_by_alias(type(data)).get(key, key)
+
+    if position == len(parts) - 1:
+        copy = model_copy(data)
+        if unset:
+            unset_field(copy, name)
+        else:
+            set_field(copy, name, value)
+        return copy
+
+    if name in get_fields(type(data)):
+        child = getattr(data, name)
+    else:
+        child = get_model_extras(data).get(name)
+
+    if child is None:
+        if unset:
+            return data
+        child = {}
+
+    new_child = _set_path_in_model(child, parts, position + 1, value, unset)
+    if new_child is child:
+        return data
+
+    copy = model_copy(data)
+    set_field(copy, name, new_child)
+    return copy
+
+
+def _set_path_in_container(
+    data: dict | list | tuple, parts: tuple, position: int, value: Any, unset: bool
+) -> dict | list | tuple:
+    key = parts[position]
+    last = position == len(parts) - 1
+    copy = dict(data) if isinstance(data, dict) else list(data)
+
+    if isinstance(copy, list) and key is Wildcard and not last:
+        copy[:] = [_set_path_in_model(item, parts, position + 1, value, unset) for item in copy]
+        return copy
+
+    if isinstance(copy, dict):
+        child = copy.get(key, Missing)
+    elif isinstance(key, int) and -len(copy) <= key < len(copy):
+        child = copy[key]
+    else:
+        child = Missing
+
+    if last or not isinstance(child, (BaseModel, dict, list, tuple)):
+        # Only the copy and any new containers are changed from here on
+        if unset:
+            unset_by_parts(copy, parts, position)
+        else:
+            set_by_parts(copy, parts, position, value)
+        return copy
+
+    new_child = _set_path_in_model(child, parts, position + 1, value, unset)
+    if new_child is child:
+        return data
+
+    copy[key] = new_child
+    return copy
+
+
+def _apply_patch_operation(document: dict, kind: str, parts: tuple, value: Any) -> None:
+    # Apply an operation of a patch to the working copy of the fields it touches, where
+    # any value is copied first so later operations don't change the caller's data
+    if kind == "unset":
+        unset_by_parts(document, parts, 0)
+        return
+
+    value = _dump_value(value)
+
+    if kind == "merge":
+        if Wildcard in parts:
+            raise ValueError("Cannot merge into a path with a wildcard")
+
+        current = get_by_parts(document, parts, 0, Missing)
+        if current is not Missing:
+            value = merge_dicts({"value": current}, {"value": value})["value"]
+
+    set_by_parts(document, parts, 0, value)
+
+
+def _find_patch_operation(operations: list[tuple[int, tuple]], loc: tuple) -> int:
+    # Get the index of the last operation of a field whose path leads to or into the
+    # location of a validation error, or the last operation of the field if none do
+    for index, parts in reversed(operations):
+        size = min(len(parts), len(loc))
+        if all(
+            part is Wildcard or part == loc[position] or str(part) == str(loc[position])
+            for position, part in enumerate(parts[:size])
+        ):
+            return index
+
+    return operations[-1][0]
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return model_dump(value)
+    if isinstance(value, dict):
+        return {k: _dump_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_dump_value(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_dump_value(item) for item in value)
+    return value
+
+
+class Deferred(metaclass=SentinelMeta): ...
+
+
 class Manifest(BaseModel):
+    _lazy_layers: LayeredDict | None = PrivateAttr(default=None)
+    _pending: dict[str, set[str]] = PrivateAttr(default_factory=dict)
+    _deferred: dict[str, str] = PrivateAttr(default_factory=dict)
+    _layers: LayeredDict | None = PrivateAttr(default=None)
+    _build_arguments: dict[str, Any] = PrivateAttr(default_factory=dict)
+
+    def __getattr__(self, name: str) -> Any:
+        if not name.startswith("_") and name in self._deferred.values():
+            self._resolve_fields({name})
+            return getattr(self, name)
+
+        parent = getattr(super(), "__getattr__", None)
+        if parent is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        return parent(name)
+
+    def __repr_args__(self) -> Any:
+        # Deferred fields aren't set on the model until resolved
+        yield from super().__repr_args__()
+        for name in self._deferred.values():
+            yield name, Deferred
+
+    def __eq__(self, other: Any) -> bool:
+        self._resolve_fields()
+        if isinstance(other, Manifest):
+            other._resolve_fields()
+        return super().__eq__(other)
+
     def normalize(
         self,
         *,
@@ -56,6 +360,9 @@ class Manifest(BaseModel):
         :param exclude_none: Whether to exclude None values or not
         :type exclude_none: bool
         """
+        if self._deferred:
+            run_sync(self.resolve)
+
         return model_dump(
             self,
             include=include,
@@ -69,6 +376,10 @@ class Manifest(BaseModel):
     @property
     def extra_fields(self) -> dict[str, Any]:
         # Get any extra fields that were set but not defined in the model
+        if self._deferred:
+            fields = get_fields(type(self))
+            self._resolve_fields({name for name in self._deferred.values() if name not in fields})
+
         return get_model_extras(self)
 
     @classmethod
@@ -82,11 +393,23 @@ class Manifest(BaseModel):
         pre_process_hooks: list[Callable] | None = None,
         post_process_hooks: list[Callable] | None = None,
         filesystem_options: dict[str, Any] | None = None,
+        build_options: BuildOptions | None = None,
         **kwargs,
     ) -> T:
         """
         Build the Manifest from a variety of sources.
 
+        Options for how the Manifest is built, such as lazy mode or profiling, are passed
+        together as a `BuildOptions`, so the fields of the model can still be passed as
+        keyword arguments whatever their names.
+
+        In lazy mode the expressions in the files are not resolved while loading. Instead,
+        each top-level key of the files that contains expressions is resolved on first
+        access or by `resolve`, against the files that set it. Required fields are always resolved
+        up front since they are needed for validation. Accessing a deferred field from
+        async code resolves it on a new event loop in another thread, see `run_sync`,
+        so prefer awaiting `resolve` there.
+
         :param files: A list of files to parse
         :type files: list[Path]
         :param dotenv_files: A list of dotenv files to parse
@@ -101,38 +424,284 @@ class Manifest(BaseModel):
         :type pre_process_hooks: list[Callable]
         :param post_process_hooks: A list of post-process hooks to run after deserialization
         :type post_process_hooks: list[Callable]
+        :param build_options: Options for how the Manifest is built, see `BuildOptions`
+        :type build_options: BuildOptions | None
         :param kwargs: Additional keyword arguments to pass to the model
         :type kwargs: dict[str, Any]
         :return: The built Manifest
         """
-        # Get the environment variables from any dotenv files if
-        # provided and os.environ and merge to a flat dict
-        env_vars = merge_dicts_flat(
-            *[dotenv_values(dotenv_file) for dotenv_file in dotenv_files or []] + [dict(os.environ)]
-        )
+        options = build_options or BuildOptions()
+
+        with (
+            use_executor(options.executor) if options.executor is not None else nullcontext(),
+            profile_build(options.profile) if options.profile is not None else nullcontext(),
+            (
+                profile_memory(options.memory_profile)
+                if options.memory_profile is not None
+                else nullcontext()
+            ),
+            span("manifest.build"),
+        ):
+            # Get the environment variables from any dotenv files if
+            # provided and os.environ and merge to a flat dict
+            with span("manifest.dotenv"):
+                dotenv_vars = [dotenv_values(dotenv_file) for dotenv_file in dotenv_files or []]
+
+            with span("manifest.env"):
+                env_vars = merge_dicts_flat(*dotenv_vars + [dict(os.environ)])
+
+            # Load the files if they are provided
+            with (
+                defer_expressions() if options.lazy else nullcontext(),
+                expression_budget(options.budget) if options.budget else nullcontext(),
+                span("manifest.files"),
+            ):
+                loaded_files = (
+                    await load_files(
+                        files=files or [],
+                        pre_process_hooks=pre_process_hooks,
+                        post_process_hooks=post_process_hooks,
+                        process_threshold=options.process_threshold,
+                        **(filesystem_options or {}),
+                    )
+                    if files
+                    else []
+                )
+
+            # Parse the env vars for the final dictionary representation
+            with span("manifest.env"):
+                parsed_env_vars = parse_env_vars(
+                    env_vars=env_vars, prefix=env_prefix, delimiter=env_delimiter, model=cls
+                )
+                env_var_paths = get_env_var_paths(
+                    env_vars=env_vars, prefix=env_prefix, delimiter=env_delimiter
+                )
+
+            # Parse any key_values provided
+            with span("manifest.key_values"):
+                parsed_overrides = parse_key_values(key_values or [], coerce=True, model=cls)
+
+            # Merge everything together into a single material dictionary, keeping
+            # each source as a layer so it can be reloaded on its own
+            with span("manifest.merge"):
+                layers = LayeredDict(
+                    [
+                        Layer(_file_layer_name(index), data, flat=True, source=str(file))
+                        for index, (file, data) in enumerate(
+                            zip(files or [], loaded_files, strict=True)
+                        )
+                    ]
+                    + [
+                        Layer("env", parsed_env_vars, sources=env_var_paths),
+                        Layer("key_values", parsed_overrides),
+                        Layer("kwargs", kwargs),
+                    ],
+                    list_keys=options.list_keys,
+                )
+
+            # The keys of each file that still contain expressions, which lazy mode defers
+            pending = (
+                {
+                    _file_layer_name(index): _pending_keys(data)
+                    for index, data in enumerate(loaded_files)
+                }
+                if options.lazy
+                else {}
+            )
+
+            build_arguments = {
+                "files": [str(file) for file in files or []],
+                "pre_process_hooks": pre_process_hooks,
+                "post_process_hooks": post_process_hooks,
+                "filesystem_options": filesystem_options,
+                "options": options,
+            }
+
+            with span("manifest.validate"):
+                return await cls._from_layers(layers, build_arguments, pending)
+
+    @classmethod
+    async def _from_layers(
+        cls: Type[T],
+        layers: LayeredDict,
+        build_arguments: dict[str, Any],
+        pending: dict[str, set[str]],
+    ) -> T:
+        budget = build_arguments["options"].budget
+
+        if build_arguments["options"].lazy:
+            with expression_budget(budget) if budget else nullcontext():
+                instance = await cls._from_deferred(layers, pending)
+        else:
+            instance = cls(**layers.data)
+
+        if build_arguments["options"].keep_layers:
+            instance._layers = layers
+            instance._build_arguments = build_arguments
+        return instance
 
-        # Parse the files if they are provided
-        parsed_files = (
-            await parse_files(
-                files=files or [],
-                pre_process_hooks=pre_process_hooks,
-                post_process_hooks=post_process_hooks,
-                **(filesystem_options or {}),
+    def provenance(self, key: str) -> str | None:
+        """
+        Get the source of the value of a key in a Manifest created with `build` with
+        `keep_layers`: the file path, the environment variable, or `key_values` or `kwargs`
+        for the values passed to `build`.
+
+        :param key: The key which looks like `a.b.c` for nested parameters
+        :type key: str
+        :return: The source of the value, or None if the key wasn't set by any source or
+        the Manifest doesn't keep its layers, such as after it was changed
+        """
+        if self._layers is None:
+            return None
+        return self._layers.provenance(key)
+
+    async def reload(self: T, files: list[str | Path] | None = None) -> T:
+        """
+        Get a copy of a Manifest created with `build` with `keep_layers`, with some of its
+        files loaded again. Only the keys the reloaded files set, before or after reloading, are
+        merged again, and the other sources are kept as they were when built.
+
+        :param files: The files to reload, out of those the Manifest was built with.
+        Defaults to all of them.
+        :type files: list[str | Path] | None
+        :return: The reloaded Manifest
+        :raises ValueError: If the Manifest doesn't keep its layers, such as after it was
+        changed, or a file isn't one it was built with
+        """
+        if self._layers is None:
+            raise ValueError(
+                "Only a Manifest created with `build` with `keep_layers`, and not changed "
+                "since, can be reloaded"
             )
-            if files
-            else {}
-        )
 
-        # Parse the env vars for the final dictionary representation
-        parsed_env_vars = parse_env_vars(
-            env_vars=env_vars, prefix=env_prefix, delimiter=env_delimiter
+        arguments = self._build_arguments
+        options = arguments["options"]
+        # A file passed to `build` more than once is loaded once for all of its layers
+        paths = list(
+            dict.fromkeys(
+                [str(file) for file in files] if files is not None else arguments["files"]
+            )
         )
 
-        # Parse any key_values provided
-        parsed_overrides = parse_key_values(key_values or [], coerce=True)
-        # Merge everything together into a single material dictionary
-        material = merge_dicts(parsed_files, parsed_env_vars, parsed_overrides, kwargs)
-        return cls(**material)
+        for path in paths:
+            if path not in arguments["files"]:
+                raise ValueError(f"The Manifest wasn't built with the file `{path}`")
+
+        with (
+            use_executor(options.executor) if options.executor is not None else nullcontext(),
+            defer_expressions() if options.lazy else nullcontext(),
+            expression_budget(options.budget) if options.budget else nullcontext(),
+        ):
+            loaded_files = await load_files(
+                files=paths,
+                pre_process_hooks=arguments["pre_process_hooks"],
+                post_process_hooks=arguments["post_process_hooks"],
+                process_threshold=options.process_threshold,
+                **(arguments["filesystem_options"] or {}),
+            )
+
+        layers = self._layers.copy()
+        pending = {name: set(keys) for name, keys in self._pending.items()}
+
+        for path, data in zip(paths, loaded_files, strict=True):
+            for index, file in enumerate(arguments["files"]):
+                if file != path:
+                    continue
+
+                layers.replace(_file_layer_name(index), data)
+                if options.lazy:
+                    pending[_file_layer_name(index)] = _pending_keys(data)
+
+        return await type(self)._from_layers(layers, arguments, pending)
+
+    @classmethod
+    async def _from_deferred(
+        cls: Type[T], layers: LayeredDict, pending: dict[str, set[str]]
+    ) -> T:
+        names = get_field_names_by_alias(cls)
+        allow_extra = get_extra_behavior(cls) == "allow"
+        # Only the keys that files set are deferred, since only the expressions in files
+        # are resolved when eager. Keys that aren't fields are only deferred if the model
+        # keeps extras, otherwise they are passed on for the model to ignore or reject as
+        # it would when eager, and only resolved if another key of their file references them
+        deferred = {
+            key: names.get(key, key)
+            for key in layers.data
+            if _is_pending(pending, key) and (key in names or allow_extra)
+        }
+
+        for key in [key for key, name in deferred.items() if is_required_field(cls, name)]:
+            await _resolve_deferred(layers, pending, key)
+
+        # Resolving the required keys also resolves the keys of their files they reference
+        deferred = {key: name for key, name in deferred.items() if _is_pending(pending, key)}
+        instance = cls(**{key: value for key, value in layers.data.items() if key not in deferred})
+
+        # Drop the defaults of the deferred fields so accessing them goes through __getattr__
+        for name in deferred.values():
+            instance.__dict__.pop(name, None)
+
+        instance._lazy_layers = layers if deferred else None
+        instance._pending = pending
+        instance._deferred = deferred
+        return instance
+
+    async def resolve(self, key: str | None = None) -> Any:
+        """
+        Resolve the deferred expressions of a lazily built Manifest. Only the top-level key
+        containing the given key is resolved, along with any keys it references.
+
+        :param key: The key to resolve which looks like `a.b.c` for nested parameters.
+        Defaults to resolving every deferred key.
+        :type key: str | None
+        :return: The value of the key, or None if no key is given
+        """
+        if key is None:
+            await self._resolve_keys(list(self._deferred))
+            return None
+
+        top_level = parse_dot_path(key)[0]
+        names = get_field_names_by_alias(type(self))
+        name = names.get(top_level, top_level)
+
+        await self._resolve_keys([
+            deferred_key
+            for deferred_key, deferred_name in self._deferred.items()
+            if top_level in (deferred_key, deferred_name)
+        ])
+
+        return get_by_dot_path(model_dump(self, include={name}), key)
+
+    async def _resolve_keys(self, keys: list[str]) -> None:
+        layers = self._lazy_layers
+        if layers is None:
+            return
+
+        for key in keys:
+            await _resolve_deferred(layers, self._pending, key)
+
+        # Resolving a key also resolves the keys of its files it references
+        for key, name in list(self._deferred.items()):
+            if not _is_pending(self._pending, key):
+                set_field(self, name, layers.data[key])
+                self._deferred.pop(key)
+
+        if not self._deferred:
+            self._lazy_layers = None
+
+    def _drop_layers(self) -> None:
+        # The layers describe the Manifest as it was built, not a changed copy of it
+        self._layers = None
+        self._build_arguments = {}
+
+    def _resolve_fields(self, names: Any = None) -> None:
+        # Resolve the deferred keys of the given field names, or all of them, from sync
+        # code. See `run_sync` for how this works inside a running event loop
+        keys = [
+            key for key, name in self._deferred.items() if names is None or name in names
+        ]
+        if keys:
+            run_sync(lambda: self._resolve_keys(keys))
 
     @classmethod
     async def from_files(
@@ -142,6 +711,7 @@ class Manifest(BaseModel):
         post_process_hooks: list[Callable] | None = None,
         root_alias: str = "root",
         filesystem_options: dict | None = None,
+        build_options: BuildOptions | None = None,
         **kwargs,
     ) -> T:
         """
@@ -153,15 +723,22 @@ class Manifest(BaseModel):
         :type pre_process_hooks: list[Callable]
         :param post_process_hooks: A list of post-process hooks to run after deserialization
         :type post_process_hooks: list[Callable]
+        :param build_options: Options for how the Manifest is built, of which only
+        `process_threshold` and `list_keys` apply to loading files. The list keys are
+        matched at the top-level keys of the files, see `merge_dicts_flat`
+        :type build_options: BuildOptions | None
         :param kwargs: Additional keyword arguments to pass to the model
         :type kwargs: dict[str, Any]
         :return: The built Manifest
         """
+        options = build_options or BuildOptions()
         parsed_files = await parse_files(
             files=files,
             pre_process_hooks=pre_process_hooks,
             post_process_hooks=post_process_hooks,
             root_alias=root_alias,
+            process_threshold=options.process_threshold,
+            list_keys=options.list_keys,
             **(filesystem_options or {}),
         )
 
@@ -228,7 +805,7 @@ class Manifest(BaseModel):
 
         # Parse the env vars for the final dictionary representation
         parsed_env_vars = parse_env_vars(
-            env_vars=env_vars, prefix=env_prefix, delimiter=env_delimiter
+            env_vars=env_vars, prefix=env_prefix, delimiter=env_delimiter, model=cls
         )
 
         return cls(**{**parsed_env_vars, **kwargs})
@@ -244,12 +821,14 @@ class Manifest(BaseModel):
         :type kwargs: dict[str, Any]
         :return: The built Manifest
         """
-        parsed_key_values = parse_key_values(key_values, coerce=True)
+        parsed_key_values = parse_key_values(key_values, coerce=True, model=cls)
         return cls(**{**parsed_key_values, **kwargs})
 
     def set_by_key(self, key: str, value: Any):
         """
-        Get a copy of the Manifest with the given key set to the given value.
+        Get a copy of the Manifest with the given key set to the given value. Only the
+        nested models and containers along the key are copied, and only the fields along
+        it are validated.
 
         :param key: The key to set which looks like `a.b.c` for nested parameters
         :type key: str
@@ -257,27 +836,117 @@ class Manifest(BaseModel):
         :type value: Any
         :return: A copy of the Manifest with the given key set to the given value
         """
-        return model_copy(self, update=set_by_dot_path(self.normalize(), key, value))
+        if self._deferred:
+            run_sync(self.resolve)
+
+        result = _set_path_in_model(self, compile_dot_path(key).parts, 0, value, unset=False)
+        result._drop_layers()
+        return result
 
     def unset_by_key(self, key: str):
         """
-        Get a copy of the Manifest with the given key unset.
+        Get a copy of the Manifest with the given key unset, which resets a field to its
+        default. Only the nested models and containers along the key are copied, and only
+        the fields along it are validated.
 
         :param key: The key to unset which looks like `a.b.c` for nested parameters
         :type key: str
         :return: A copy of the Manifest with the given key unset
         """
-        return type(self)(**unset_by_dot_path(self.normalize(), key))
+        if self._deferred:
+            run_sync(self.resolve)
+
+        result = _set_path_in_model(self, compile_dot_path(key).parts, 0, None, unset=True)
+        if result is self:
+            return model_copy(self)
+
+        result._drop_layers()
+        return result
 
-    def get_by_key(self, key: str):
+    def apply_patch(self, operations: list[dict[str, Any]]):
         """
-        Get the value of a key in the Manifest.
+        Get a copy of the Manifest with a patch applied, a list of operations such as
+        `{"op": "set", "path": "a.b", "value": 1}`, `{"op": "unset", "path": "a.b"}` or
+        `{"op": "merge", "path": "a", "value": {"b": 1}}`. The operations are applied in
+        order to one working copy of the fields they touch, and each of those fields is
+        then validated once.
+
+        :param operations: The operations of the patch.
+        :type operations: list[dict[str, Any]]
+        :return: A copy of the Manifest with the patch applied
+        :raises PatchError: If any of the operations fail, with the errors of each, in
+        which case none of them are applied.
+        """
+        if self._deferred:
+            run_sync(self.resolve)
+
+        names = get_field_names_by_alias(type(self))
+        # The dumped values of the top-level fields touched by the patch, by field name
+        document: dict[str, Any] = {}
+        # The indices and parts of the operations applied to each field
+        applied: dict[str, list[tuple[int, tuple]]] = {}
+        errors: dict[int, list[str]] = {}
+
+        for index, operation in enumerate(operations):
+            try:
+                kind, parts, value = parse_patch_operation(operation)
+                name = names.get(parts[0], parts[0])
+                parts = (name, *parts[1:])
+
+                if name not in applied:
+                    applied[name] = []
+                    if name in get_fields(type(self)) or name in get_model_extras(self):
+                        document[name] = _get_path_in_model(self, (name,), 0, live=False)
+
+                _apply_patch_operation(document, kind, parts, value)
+                applied[name].append((index, parts))
+            except (ValueError, IndexError) as e:
+                errors[index] = [str(e)]
+
+        result = model_copy(self)
+
+        for name, field_operations in applied.items():
+            if not field_operations:
+                continue
+
+            try:
+                if name in document:
+                    set_field(result, name, document[name])
+                else:
+                    unset_field(result, name)
+            except ValidationError as e:
+                for error in e.errors():
+                    index = _find_patch_operation(field_operations, tuple(error["loc"]))
+                    location = ".".join(str(part) for part in error["loc"])
+                    errors.setdefault(index, []).append(f"{location}: {error['msg']}")
+            except ValueError as e:
+                errors.setdefault(field_operations[-1][0], []).append(str(e))
+
+        if errors:
+            raise PatchError(errors)
+
+        result._drop_layers()
+        return result
+
+    def get_by_key(self, key: str, live: bool = False):
+        """
+        Get the value of a key in the Manifest. Only the value is dumped to basic types,
+        by walking the fields of the Manifest down to it. On a lazily built Manifest, the
+        top-level key containing it is resolved first.
 
         :param key: The key to get which looks like `a.b.c` for nested parameters
         :type key: str
-        :return: The value of the key
+        :param live: Whether to get the value as it is in the Manifest, such as a nested
+        model, rather than dumped. Changing a live value changes the Manifest.
+        :type live: bool
+        :return: The value of the key, or None if it doesn't exist
         """
-        return get_by_dot_path(self.normalize(), key)
+        parts = compile_dot_path(key).parts
+
+        if self._deferred and isinstance(parts[0], str):
+            self._resolve_fields({get_field_names_by_alias(type(self)).get(parts[0], parts[0])})
+
+        return _get_path_in_model(self, parts, 0, live)
 
     async def to_file(
         self,
@@ -311,3 +980,39 @@ class Manifest(BaseModel):
             **(filesystem_options or {}),
             **kwargs,
         )
+
+    # Dumping or copying a lazily built Manifest resolves the deferred fields it needs,
+    # and a copy with changes doesn't keep the layers. These come last so the `dict`
+    # method doesn't shadow the builtin in the annotations of the other methods
+    if IS_V1:
+        def dict(  # type: ignore
+            self, *, include: Any = None, **kwargs
+        ) -> builtins.dict[str, Any]:
+            self._resolve_fields(include)
+            return super().dict(include=include, **kwargs)
+
+        def json(self, *, include: Any = None, **kwargs) -> str:  # type: ignore
+            self._resolve_fields(include)
+            return super().json(include=include, **kwargs)
+
+        def copy(self, **kwargs) -> Any:  # type: ignore
+            self._resolve_fields()
+            copy = super().copy(**kwargs)
+            if kwargs.get("update"):
+                copy._drop_layers()
+            return copy
+    else:
+        def model_dump(self, *, include: Any = None, **kwargs) -> builtins.dict[str, Any]:
+            self._resolve_fields(include)
+            return super().model_dump(include=include, **kwargs)
+
+        def model_dump_json(self, *, include: Any = None, **kwargs) -> str:
+            self._resolve_fields(include)
+            return super().model_dump_json(include=include, **kwargs)
+
+        def model_copy(self, **kwargs) -> Any:
+            self._resolve_fields()
+            copy = super().model_copy(**kwargs)
+            if kwargs.get("update"):
+                copy._drop_layers()
+            return copy
@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable
+
+from manifest.profile import Timing
+
+
+class ExecutorMetrics:
+    """
+    A snapshot of the work done by a ManifestExecutor.
+
+    :param max_workers: The maximum number of worker threads.
+    :type max_workers: int
+    :param queue_depth: The number of tasks waiting for a worker.
+    :type queue_depth: int
+    :param active_workers: The number of tasks running.
+    :type active_workers: int
+    :param wait: How long tasks waited for a worker.
+    :type wait: Timing
+    :param run: How long tasks ran for.
+    :type run: Timing
+    """
+    def __init__(
+        self,
+        max_workers: int,
+        queue_depth: int,
+        active_workers: int,
+        wait: Timing,
+        run: Timing,
+    ) -> None:
+        self.max_workers = max_workers
+        self.queue_depth = queue_depth
+        self.active_workers = active_workers
+        self.wait = wait
+        self.run = run
+
+    def __repr__(self) -> str:
+        return (
+            f"ExecutorMetrics(queue_depth={self.queue_depth}, "
+            f"active_workers={self.active_workers}, completed={self.completed})"
+        )
+
+    @property
+    def completed(self) -> int:
+        """
+        The number of tasks that finished running.
+        """
+        return self.run.count
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "queue_depth": self.queue_depth,
+            "active_workers": self.active_workers,
+            "completed": self.completed,
+            "wait": self.wait.to_dict(),
+            "run": self.run.to_dict(),
+        }
+
+
+class ManifestExecutor(ThreadPoolExecutor):
+    """
+    A thread pool for the sync work of loading and dumping Manifests, such as reading
+    files and running hooks and operations, that keeps metrics of the tasks it runs.
+
+    :param max_workers: The maximum number of worker threads, defaults to that of
+    ThreadPoolExecutor.
+    :type max_workers: int | None
+    :param thread_name_prefix: The prefix of the names of the worker threads.
+    :type thread_name_prefix: str
+    """
+    def __init__(self, max_workers: int | None = None, thread_name_prefix: str = "manifest"):
+        super().__init__(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        # The worker threads don't exist in processes forked from this one
+        self._pid = os.getpid()
+        self._queued = 0
+        self._active = 0
+        self._wait = Timing()
+        self._run = Timing()
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        submitted = time.perf_counter()
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._wait.add(started - submitted)
+
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._run.add(time.perf_counter() - started)
+
+        with self._lock:
+            self._queued += 1
+
+        try:
+            return super().submit(run)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+
+    @property
+    def metrics(self) -> ExecutorMetrics:
+        """
+        A snapshot of the metrics of the executor.
+        """
+        with self._lock:
+            wait, run = Timing(), Timing()
+            wait.merge(self._wait)
+            run.merge(self._run)
+
+            return ExecutorMetrics(
+                max_workers=self._max_workers,
+                queue_depth=self._queued,
+                active_workers=self._active,
+                wait=wait,
+                run=run,
+            )
+
+    def reset_metrics(self) -> None:
+        """
+        Reset the wait and run times of the executor.
+        """
+        with self._lock:
+            self._wait = Timing()
+            self._run = Timing()
+
+
+_executor: ManifestExecutor | None = None
+_scoped_executor: ContextVar[ManifestExecutor | None] = ContextVar(
+    "scoped_executor", default=None
+)
+
+
+def set_executor(executor: ManifestExecutor | None) -> None:
+    """
+    Set the executor used everywhere outside of `use_executor`. The previous executor
+    isn't shut down.
+
+    :param executor: The executor, or None to create a new default executor on next use.
+    :type executor: ManifestExecutor | None
+    """
+    global _executor
+    _executor = executor
+
+
+def get_executor() -> ManifestExecutor:
+    """
+    Get the executor for the current context: the one set by `use_executor` if any,
+    otherwise the global executor, creating a default one on first use. In a process
+    forked from the one the executor was created in, such as a worker of the process
+    pool, a default executor is used instead.
+
+    :returns: The executor
+    """
+    global _executor
+
+    pid = os.getpid()
+
+    scoped = _scoped_executor.get()
+    if scoped is not None and scoped._pid == pid:
+        return scoped
+
+    if _executor is None or _executor._pid != pid:
+        _executor = ManifestExecutor()
+    return _executor
+
+
+@contextmanager
+def use_executor(executor: ManifestExecutor):
+    """
+    Context manager that runs the sync work of the block in the given executor.
+
+    :param executor: The executor.
+    :type executor: ManifestExecutor
+    :yields: The executor
+    """
+    token = _scoped_executor.set(executor)
+
+    try:
+        yield executor
+    finally:
+        _scoped_executor.reset(token)
@@ -1,9 +1,15 @@
 from manifest.hooks.builtin import substitute_env_vars
 from manifest.hooks.expressions import resolve_expressions
-from manifest.hooks.interface import execute_hook, get_hooks, register_hook
+from manifest.hooks.interface import (
+    HookPipeline,
+    execute_hook,
+    get_hook_pipeline,
+    get_hooks,
+    register_hook,
+)
 
 
-register_hook(substitute_env_vars, hook_type="pre", operation="load")
+register_hook(substitute_env_vars, hook_type="pre", operation="load", execution="inline")
 register_hook(resolve_expressions, hook_type="post", operation="load")
 
 
@@ -11,6 +17,8 @@ __all__ = (
     "get_hooks",
     "register_hook",
     "execute_hook",
+    "get_hook_pipeline",
+    "HookPipeline",
     "substitute_env_vars",
     "resolve_expressions",
 )
@@ -1,3 +1,8 @@
+from manifest.hooks.expressions.budget import (
+    BudgetExceededError,
+    ExpressionBudget,
+    expression_budget,
+)
 from manifest.hooks.expressions.operations import OPERATIONS, execute_operation, register_operation
 from manifest.hooks.expressions.resolve import (
     parse_expression,
@@ -13,4 +18,7 @@ __all__ = (
     "OPERATIONS",
     "register_operation",
     "execute_operation",
+    "ExpressionBudget",
+    "BudgetExceededError",
+    "expression_budget",
 )
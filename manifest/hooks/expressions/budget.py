@@ -0,0 +1,283 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+
+# The nesting depth allowed when no budget is active, which stops expressions
+# that keep expanding into new expressions
+DEFAULT_MAX_DEPTH = 64
+
+
+class BudgetExceededError(ValueError):
+    """
+    Raised when resolving expressions exceeds the active ExpressionBudget.
+    """
+
+
+class ExpressionBudget:
+    """
+    Limits on the work done resolving expressions, applied with `expression_budget`.
+    Every limit can be set to None to disable it.
+
+    :param max_depth: The maximum nesting depth of expressions, counting nested arguments,
+    expressions produced by other expressions and expressions in referenced files.
+    :type max_depth: int, optional
+    :param max_bytes: The maximum total size of the resolved values.
+    :type max_bytes: int, optional
+    :param max_operations: The maximum number of operations executed.
+    :type max_operations: int, optional
+    :param timeout: The maximum number of seconds spent resolving expressions.
+    :type timeout: float, optional
+    """
+    def __init__(
+        self,
+        max_depth: int | None = DEFAULT_MAX_DEPTH,
+        max_bytes: int | None = None,
+        max_operations: int | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.max_operations = max_operations
+        self.timeout = timeout
+
+    def __repr__(self) -> str:
+        return (
+            f"ExpressionBudget(max_depth={self.max_depth}, max_bytes={self.max_bytes}, "
+            f"max_operations={self.max_operations}, timeout={self.timeout})"
+        )
+
+
+class BudgetUsage:
+    """
+    The work done so far against an ExpressionBudget.
+
+    :param budget: The budget.
+    :type budget: ExpressionBudget
+    :param operations: The number of operations already executed.
+    :type operations: int
+    :param bytes: The total size of the values already resolved.
+    :type bytes: int
+    :param remaining: The number of seconds left before the deadline, to continue the
+    usage of a budget started elsewhere, such as in another process. Defaults to the
+    timeout of the budget.
+    :type remaining: float, optional
+    """
+    def __init__(
+        self,
+        budget: ExpressionBudget,
+        operations: int = 0,
+        bytes: int = 0,
+        remaining: float | None = None,
+    ) -> None:
+        self.budget = budget
+        self.operations = operations
+        self.bytes = bytes
+
+        if remaining is not None:
+            self.deadline: float | None = time.monotonic() + remaining
+        else:
+            self.deadline = time.monotonic() + budget.timeout if budget.timeout else None
+
+
+_DEFAULT_BUDGET = ExpressionBudget()
+_usage: ContextVar[BudgetUsage | None] = ContextVar("budget_usage", default=None)
+_depth: ContextVar[int] = ContextVar("expression_depth", default=0)
+
+
+@contextmanager
+def expression_budget(budget: ExpressionBudget | None = None, usage: BudgetUsage | None = None):
+    """
+    Context manager that applies a budget to the expressions resolved in the block,
+    including those in files loaded by `$ref` expressions.
+
+    :param budget: The budget to apply. Defaults to the default ExpressionBudget.
+    :type budget: ExpressionBudget, optional
+    :param usage: The usage of a budget to continue instead, such as that of a build
+    in another process.
+    :type usage: BudgetUsage, optional
+    :yields: The usage of the budget
+    """
+    usage = usage or BudgetUsage(budget or ExpressionBudget())
+    token = _usage.set(usage)
+
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def get_budget_usage() -> BudgetUsage | None:
+    """
+    Get the usage of the active budget, if any.
+
+    :returns: The usage of the active budget
+    """
+    return _usage.get()
+
+
+def check_deadline() -> None:
+    """
+    :raises BudgetExceededError: If the deadline of the active budget has passed.
+    """
+    usage = _usage.get()
+    if usage is not None and usage.deadline is not None and time.monotonic() > usage.deadline:
+        raise BudgetExceededError(
+            f"Resolving expressions took longer than {usage.budget.timeout} seconds"
+        )
+
+
+def remaining_time() -> float | None:
+    """
+    Get the number of seconds left before the deadline of the active budget.
+
+    :returns: The seconds left, or None if there is no deadline
+    """
+    usage = _usage.get()
+    if usage is None or usage.deadline is None:
+        return None
+    return max(usage.deadline - time.monotonic(), 0.0)
+
+
+def get_expression_depth() -> int:
+    """
+    Get the nesting depth of the expression being resolved.
+
+    :returns: The nesting depth
+    """
+    return _depth.get()
+
+
+@contextmanager
+def at_expression_depth(depth: int):
+    """
+    Context manager that resolves the expressions of the block from the given nesting
+    depth, such as that of the expression loading a file in another process.
+
+    :param depth: The nesting depth.
+    :type depth: int
+    :yields: The nesting depth
+    """
+    token = _depth.set(depth)
+
+    try:
+        yield depth
+    finally:
+        _depth.reset(token)
+
+
+def check_depth(depth: int) -> None:
+    """
+    :raises BudgetExceededError: If the depth exceeds the maximum depth of the active budget.
+    """
+    usage = _usage.get()
+    budget = usage.budget if usage is not None else _DEFAULT_BUDGET
+    if budget.max_depth is not None and depth > budget.max_depth:
+        raise BudgetExceededError(
+            f"Expressions are nested deeper than the maximum depth of {budget.max_depth}"
+        )
+
+
+@contextmanager
+def nested_expression():
+    """
+    Context manager that enters one level deeper of expression nesting for the block.
+
+    :yields: The new nesting depth
+    :raises BudgetExceededError: If the depth exceeds the maximum depth of the active budget.
+    """
+    depth = _depth.get() + 1
+    check_depth(depth)
+    token = _depth.set(depth)
+
+    try:
+        yield depth
+    finally:
+        _depth.reset(token)
+
+
+def charge_operation(operation: str) -> None:
+    """
+    Count an operation call against the active budget.
+
+    :raises BudgetExceededError: If the maximum number of operations is exceeded.
+    """
+    usage = _usage.get()
+    if usage is None:
+        return
+
+    usage.operations += 1
+    if usage.budget.max_operations is not None and usage.operations > usage.budget.max_operations:
+        raise BudgetExceededError(
+            f"Executing `{operation}` exceeds the maximum of "
+            f"{usage.budget.max_operations} operations"
+        )
+    check_deadline()
+
+
+def charge_usage(operations: int, bytes: int) -> None:
+    """
+    Count work done elsewhere, such as in another process, against the active budget.
+
+    :param operations: The number of operations executed.
+    :type operations: int
+    :param bytes: The total size of the values resolved.
+    :type bytes: int
+    :raises BudgetExceededError: If the maximum number of operations or bytes is exceeded.
+    """
+    usage = _usage.get()
+    if usage is None:
+        return
+
+    usage.operations += operations
+    usage.bytes += bytes
+
+    if usage.budget.max_operations is not None and usage.operations > usage.budget.max_operations:
+        raise BudgetExceededError(
+            f"Expressions exceed the maximum of {usage.budget.max_operations} operations"
+        )
+    if usage.budget.max_bytes is not None and usage.bytes > usage.budget.max_bytes:
+        raise BudgetExceededError(
+            f"Resolved values exceed the maximum of {usage.budget.max_bytes} bytes"
+        )
+    check_deadline()
+
+
+def charge_value(value: Any) -> None:
+    """
+    Count the size of a resolved value against the active budget.
+
+    :raises BudgetExceededError: If the maximum number of bytes is exceeded.
+    """
+    usage = _usage.get()
+    if usage is None or usage.budget.max_bytes is None:
+        return
+
+    usage.bytes += _estimate_size(value)
+    if usage.bytes > usage.budget.max_bytes:
+        raise BudgetExceededError(
+            f"Resolved values exceed the maximum of {usage.budget.max_bytes} bytes"
+        )
+
+
+def _estimate_size(value: Any) -> int:
+    # The length of the serialized value, roughly, without serializing it
+    stack = [value]
+    size = 0
+
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            size += 2 * len(item)
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            size += len(item)
+            stack.extend(item)
+        elif isinstance(item, (str, bytes)):
+            size += len(item)
+        else:
+            size += 8
+
+    return size
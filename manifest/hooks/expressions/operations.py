@@ -1,8 +1,44 @@
+import asyncio
 import base64
+import copy
 import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Any, Callable
 
-from manifest.utils import is_async_callable, run_in_thread
+from manifest.hooks.expressions.budget import (
+    BudgetExceededError,
+    charge_operation,
+    charge_value,
+    remaining_time,
+)
+from manifest.tracing import set_span_attribute, span
+from manifest.utils import is_async_callable, run_in_process, run_in_thread
+
+
+EXECUTION_POLICIES = ("inline", "thread", "process")
+CACHE_MODES = (None, "pure", "ttl")
+
+
+def resolve_ref_path(file_path: str) -> str:
+    """
+    Resolve the file path of a $ref expression. A relative local path is joined with the
+    parent directory of the current file, so that it's relative to the current file and
+    not the current working directory.
+
+    :param file_path: The file path of the $ref expression.
+    :type file_path: str
+    :returns: The resolved file path.
+    :rtype: str
+    """
+    from manifest.parse import current_file, parse_file_path
+
+    if parse_file_path(file_path)["is_local"]:  # pragma: no cover
+        if not os.path.isabs(file_path):
+            return os.path.join(os.path.dirname(current_file.get()), file_path)
+    return file_path
 
 
 async def ref_op(args: list[str], data: Any) -> Any:
@@ -42,7 +78,7 @@ async def ref_op(args: list[str], data: Any) -> Any:
     :raises KeyError: If the referenced key is not found in the referenced file.
 
     """
-    from manifest.parse import current_file, load_from_file, parse_file_path
+    from manifest.parse import load_from_file_cached
 
     # Split the path into file_path and key_path
     path, *_ = args
@@ -51,36 +87,32 @@ async def ref_op(args: list[str], data: Any) -> Any:
     if len(parts) == 2:
         # Both file_path and key_path are included
         file_path, key_path = parts
-        parsed_path = parse_file_path(file_path)
+        file_path = resolve_ref_path(file_path)
 
-        # If the file path is local, and it's relative
-        # join it with the parent directory of the current file
-        # so that it's relative to the current file and not the
-        # current working directory
-        if parsed_path["is_local"]:  # pragma: no cover
-            if not os.path.isabs(file_path):
-                file_path = os.path.join(os.path.dirname(current_file.get()), file_path)
-
-        ref_data = await load_from_file(file_path)
+        # Documents are loaded once per build, so hand out copies of the shared values
+        ref_data = await load_from_file_cached(file_path)
+        copy_result = True
     elif len(parts) == 1:
         # Only a dict path, referencing part from same data
         key_path = parts[0]
         ref_data = data
+        copy_result = False
     else:
         raise ValueError(f"Invalid $ref format: {path}")
 
-    # If the key_path is "*", return the entire dictionary
-    if key_path == "*":
-        return ref_data
+    # A key_path of "*" returns the entire dictionary
+    if key_path != "*":
+        # Split the key_path into individual keys
+        keys = key_path.split(".")
 
-    # Split the key_path into individual keys
-    keys = key_path.split(".")
+        # Traverse the dictionary using each key in key_path
+        for key in keys:
+            if not isinstance(ref_data, dict) or key not in ref_data:
+                raise KeyError(f"No such key: {key_path}")
+            ref_data = ref_data[key]
 
-    # Traverse the dictionary using each key in key_path
-    for key in keys:
-        if not isinstance(ref_data, dict) or key not in ref_data:
-            raise KeyError(f"No such key: {key_path}")
-        ref_data = ref_data[key]
+    if copy_result and isinstance(ref_data, (dict, list)):
+        return copy.deepcopy(ref_data)
     return ref_data
 
 
@@ -95,17 +127,97 @@ OPERATIONS: dict[str, Callable] = {
     "unbase64": lambda args, _: base64.b64decode(args[0]).decode(),
 }
 
+# The builtin sync operations are pure and cheap, so they are called directly
+# on the event loop rather than paying for an executor handoff. Only the operations
+# whose cost grows with their input are memoized, for the rest a cache lookup costs
+# about as much as recomputing the result.
+_OPERATION_OPTIONS: dict[str, dict[str, Any]] = {
+    "env": {"execution": "inline"},
+    "sum": {"execution": "inline"},
+    "reverse": {"execution": "inline"},
+    "upper": {"execution": "inline"},
+    "lower": {"execution": "inline"},
+    "base64": {"execution": "inline", "cache": "pure"},
+    "unbase64": {"execution": "inline", "cache": "pure"},
+}
 
-def register_operation(operation_name: str, func: Callable[[list[str], dict], Any]) -> None:
+# Results of `pure` operations, scoped to a build by `cache_operations`
+_operation_memo: ContextVar[dict[tuple, asyncio.Future] | None] = ContextVar(
+    "operation_memo", default=None
+)
+# Results of `ttl` operations, shared across builds and bounded per operation
+_TTL_CACHES: dict[str, OrderedDict[tuple, tuple[float, Any]]] = {}
+_OPERATION_STATS: dict[str, dict[str, int]] = {}
+# Calls to batched operations waiting to be dispatched, by event loop, operation and data.
+# Each batch holds on to its data, so the id of the data can't be reused while it waits
+_PENDING_BATCHES: dict[tuple, tuple[Any, list[tuple[list[str], asyncio.Future]]]] = {}
+# Batches being dispatched, kept referenced so they aren't garbage collected while running
+_DISPATCHING_BATCHES: set[asyncio.Task] = set()
+
+
+def register_operation(
+    operation_name: str,
+    func: Callable[[list[str], dict], Any],
+    execution: str = "thread",
+    cache: str | None = None,
+    ttl: float | None = None,
+    maxsize: int = 128,
+    batch: bool = False,
+) -> None:
     """
     Register an operation with the given name.
 
+    The execution policy only applies to sync functions, async functions are always awaited
+    on the event loop. The available policies are:
+
+        - `inline`: Call the function directly on the event loop, for pure and cheap functions.
+        - `thread`: Run the function in a thread pool, for blocking I/O.
+        - `process`: Run the function in a process pool, for CPU-heavy work. The function
+          and its arguments must be picklable.
+
+    Results can be memoized by their arguments, which must be hashable. The data passed
+    to the operation is not part of the cache key. The available cache modes are:
+
+        - `pure`: Results are reused for the duration of a build.
+        - `ttl`: Results are reused across builds for `ttl` seconds, keeping at most
+          `maxsize` results. See `invalidate_operation_cache`.
+
+    A batched operation is called once with the list of arguments of every call to it that
+    is issued during the same iteration of the event loop, such as the expressions resolved
+    concurrently by `resolve_expressions`. It must return a list of results in the same order.
+
     :param operation_name: The name of the operation.
     :type operation_name: str
     :param func: The function to register.
     :type func: Callable
+    :param execution: The execution policy of the operation. Defaults to `thread`.
+    :type execution: str
+    :param cache: The cache mode of the operation. Defaults to no caching.
+    :type cache: str, optional
+    :param ttl: The number of seconds results are cached for in `ttl` mode.
+    :type ttl: float, optional
+    :param maxsize: The maximum number of results cached in `ttl` mode. Defaults to 128.
+    :type maxsize: int
+    :param batch: Whether the function accepts a batch of calls. Defaults to False.
+    :type batch: bool
+    :raises ValueError: If the execution policy or cache options are invalid.
     """
+    if execution not in EXECUTION_POLICIES:
+        raise ValueError(f"Invalid execution policy: {execution}")
+    if cache not in CACHE_MODES:
+        raise ValueError(f"Invalid cache mode: {cache}")
+    if cache == "ttl" and (not ttl or ttl <= 0 or maxsize < 1):
+        raise ValueError("The `ttl` cache mode requires a positive ttl and maxsize")
+
     OPERATIONS[operation_name] = func
+    _OPERATION_OPTIONS[operation_name] = {
+        "execution": execution,
+        "cache": cache,
+        "ttl": ttl,
+        "maxsize": maxsize,
+        "batch": batch,
+    }
+    invalidate_operation_cache(operation_name)
 
 
 def unregister_operation(operation_name: str) -> None:
@@ -116,6 +228,9 @@ def unregister_operation(operation_name: str) -> None:
     :type operation_name: str
     """
     del OPERATIONS[operation_name]
+    _OPERATION_OPTIONS.pop(operation_name, None)
+    _OPERATION_STATS.pop(operation_name, None)
+    invalidate_operation_cache(operation_name)
 
 
 def get_operation(operation_name: str) -> Callable[[list[str], dict], Any]:
@@ -130,6 +245,167 @@ def get_operation(operation_name: str) -> Callable[[list[str], dict], Any]:
     return OPERATIONS[operation_name]
 
 
+def get_operation_execution(operation_name: str) -> str:
+    """
+    Get the execution policy of the operation with the given name.
+
+    :param operation_name: The name of the operation.
+    :type operation_name: str
+    :returns: The execution policy, `thread` if the operation was not registered with one.
+    :rtype: str
+    """
+    return _OPERATION_OPTIONS.get(operation_name, {}).get("execution", "thread")
+
+
+def get_operation_stats(operation_name: str | None = None) -> dict:
+    """
+    Get the cache hit and miss counts of the operations.
+
+    :param operation_name: The name of the operation. Defaults to all operations.
+    :type operation_name: str, optional
+    :returns: A dictionary with `hits` and `misses` counts, or a dictionary of those
+    by operation name if no operation name is given.
+    :rtype: dict
+    """
+    if operation_name is not None:
+        return dict(_OPERATION_STATS.get(operation_name, {"hits": 0, "misses": 0}))
+    return {name: dict(stats) for name, stats in _OPERATION_STATS.items()}
+
+
+def reset_operation_stats() -> None:
+    """
+    Reset the cache hit and miss counts of all operations.
+    """
+    _OPERATION_STATS.clear()
+
+
+def invalidate_operation_cache(operation_name: str | None = None) -> None:
+    """
+    Drop the results cached across builds by `ttl` operations.
+
+    :param operation_name: The name of the operation. Defaults to all operations.
+    :type operation_name: str, optional
+    """
+    if operation_name is None:
+        _TTL_CACHES.clear()
+    else:
+        _TTL_CACHES.pop(operation_name, None)
+
+
+@contextmanager
+def cache_operations():
+    """
+    Context manager that memoizes the results of `pure` operations for the duration
+    of the block. If a cache is already active it is reused.
+
+    :yields: None
+    """
+    if _operation_memo.get() is not None:
+        yield
+        return
+
+    token = _operation_memo.set({})
+
+    try:
+        yield
+    finally:
+        _operation_memo.reset(token)
+
+
+def _record(operation_name: str, outcome: str) -> None:
+    stats = _OPERATION_STATS.setdefault(operation_name, {"hits": 0, "misses": 0})
+    stats[outcome] += 1
+    set_span_attribute("cache_hit", outcome == "hits")
+
+
+async def _call_operation(
+    op_func: Callable, options: dict[str, Any], args: list[str], data: Any
+) -> Any:
+    if is_async_callable(op_func):
+        return await op_func(args, data)
+
+    execution = options.get("execution", "thread")
+
+    if execution == "inline":
+        return op_func(args, data)
+    elif execution == "process":
+        return await run_in_process(op_func, args, data)
+
+    return await run_in_thread(op_func, args, data)
+
+
+async def _call_batch(
+    op_func: Callable, options: dict[str, Any], batch: list[list[str]], data: Any
+) -> list[Any]:
+    # Call a batched operation with the arguments of every call in the batch
+    if is_async_callable(op_func):
+        return await op_func(batch, data)
+
+    execution = options.get("execution", "thread")
+
+    if execution == "inline":
+        return op_func(batch, data)
+    elif execution == "process":
+        return await run_in_process(op_func, batch, data)
+
+    return await run_in_thread(op_func, batch, data)
+
+
+async def _call_batched(
+    operation: str, op_func: Callable, options: dict[str, Any], args: list[str], data: Any
+) -> Any:
+    loop = asyncio.get_running_loop()
+    key = (loop, operation, id(data))
+    future = loop.create_future()
+
+    if key not in _PENDING_BATCHES:
+        _PENDING_BATCHES[key] = (data, [])
+
+        def dispatch() -> None:
+            _, calls = _PENDING_BATCHES.pop(key)
+            task = loop.create_task(_dispatch_batch(op_func, options, calls, data))
+            _DISPATCHING_BATCHES.add(task)
+            task.add_done_callback(_DISPATCHING_BATCHES.discard)
+
+        # Dispatch once the calls already scheduled on the loop have had a chance to join
+        loop.call_soon(dispatch)
+
+    _PENDING_BATCHES[key][1].append((args, future))
+    return await future
+
+
+async def _dispatch_batch(
+    op_func: Callable,
+    options: dict[str, Any],
+    calls: list[tuple[list[str], asyncio.Future]],
+    data: Any,
+) -> None:
+    try:
+        results = await _call_batch(op_func, options, [args for args, _ in calls], data)
+
+        if len(results) != len(calls):
+            raise ValueError(
+                f"Batched operation returned {len(results)} results for {len(calls)} calls"
+            )
+    except Exception as e:
+        for _, future in calls:
+            if not future.done():
+                future.set_exception(e)
+        return
+
+    for (_, future), result in zip(calls, results, strict=True):
+        if not future.done():
+            future.set_result(result)
+
+
+async def _invoke_operation(
+    operation: str, op_func: Callable, options: dict[str, Any], args: list[str], data: Any
+) -> Any:
+    if options.get("batch"):
+        return await _call_batched(operation, op_func, options, args, data)
+    return await _call_operation(op_func, options, args, data)
+
+
 async def execute_operation(operation: str, args: list[str], data: Any) -> Any:
     """
     Execute an operation with the given arguments and data.
@@ -142,13 +418,80 @@ async def execute_operation(operation: str, args: list[str], data: Any) -> Any:
     :type data: dict
     :returns: The result of the operation.
     :rtype: Any
+    :raises BudgetExceededError: If the operation exceeds the active budget.
     """
     op_func = OPERATIONS.get(operation, None)
 
     if not op_func:
         raise ValueError(f"Unknown operation: `{operation}`")
 
-    if not is_async_callable(op_func):
-        return await run_in_thread(op_func, args, data)
-
-    return await op_func(args, data)
+    charge_operation(operation)
+    timeout = remaining_time()
+
+    with span("manifest.operation", operation=operation):
+        if timeout is None:
+            result = await _execute_operation(operation, op_func, args, data)
+        else:
+            try:
+                result = await asyncio.wait_for(
+                    _execute_operation(operation, op_func, args, data), timeout
+                )
+            except asyncio.TimeoutError:
+                raise BudgetExceededError(
+                    f"Resolving expressions timed out while executing `{operation}`"
+                ) from None
+
+    charge_value(result)
+    return result
+
+
+async def _execute_operation(operation: str, op_func: Callable, args: list[str], data: Any) -> Any:
+    options = _OPERATION_OPTIONS.get(operation, {})
+    cache = options.get("cache")
+
+    if cache is None:
+        return await _invoke_operation(operation, op_func, options, args, data)
+
+    key = tuple(args)
+    try:
+        hash(key)
+    except TypeError:
+        # Arguments resolved from nested expressions may not be hashable
+        return await _invoke_operation(operation, op_func, options, args, data)
+
+    if cache == "pure":
+        memo = _operation_memo.get()
+
+        if memo is None:
+            return await _invoke_operation(operation, op_func, options, args, data)
+
+        memo_key = (operation, key)
+        # A memo copied into another event loop by `run_sync` can't share its results
+        if memo_key in memo and memo[memo_key].get_loop() is asyncio.get_running_loop():
+            _record(operation, "hits")
+        else:
+            _record(operation, "misses")
+            memo[memo_key] = asyncio.ensure_future(
+                _invoke_operation(operation, op_func, options, args, data)
+            )
+
+        # Shield the shared call so a cancelled caller doesn't cancel it for the others
+        return await asyncio.shield(memo[memo_key])
+
+    entries = _TTL_CACHES.setdefault(operation, OrderedDict())
+    entry = entries.get(key)
+
+    if entry is not None and entry[0] > time.monotonic():
+        _record(operation, "hits")
+        entries.move_to_end(key)
+        return entry[1]
+
+    _record(operation, "misses")
+    result = await _invoke_operation(operation, op_func, options, args, data)
+
+    entries[key] = (time.monotonic() + options["ttl"], result)
+    entries.move_to_end(key)
+    while len(entries) > options["maxsize"]:
+        entries.popitem(last=False)
+
+    return result
@@ -1,11 +1,52 @@
+import asyncio
 import re
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
 from typing import Any
 
-from manifest.hooks.expressions.operations import execute_operation
+from manifest.hooks.expressions.budget import check_deadline, nested_expression
+from manifest.hooks.expressions.operations import (
+    cache_operations,
+    execute_operation,
+    resolve_ref_path,
+)
+from manifest.tracing import span
 
 
+# The maximum number of expressions resolved concurrently by `resolve_expressions`
+DEFAULT_CONCURRENCY = 64
+
 EXPRESSION_REGEX = re.compile(r"\$(?P<operation>\w+)\{(?P<args>.*)\}")
 EXPRESSION_LOC_REGEX = re.compile(r"\$(\w+)\{([^{}]*)\}")
+REF_REGEX = re.compile(r"\$ref\{([^{}$|]*)\}")
+FILE_REF_REGEX = re.compile(r"\$ref\{([^{}$|]+)\|")
+
+_deferred: ContextVar[bool] = ContextVar("deferred_expressions", default=False)
+
+
+@contextmanager
+def defer_expressions():
+    """
+    Context manager that makes `resolve_expressions` leave expressions unresolved for
+    the duration of the block, so they can be resolved later. Relative file paths in
+    `$ref` expressions are made absolute, since the current file is no longer known
+    by the time they are resolved.
+
+    :yields: None
+    """
+    token = _deferred.set(True)
+
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+
+
+def expressions_deferred() -> bool:
+    """
+    :returns: Whether expressions are being deferred by `defer_expressions`
+    """
+    return _deferred.get()
 
 
 def parse_expression(expression: str) -> dict | None:
@@ -44,8 +85,9 @@ async def resolve_expression(expression: str, context: Any) -> Any:
     :returns: The string with all expressions resolved.
     :rtype: Any
     :raises ValueError: If an expression string is invalid or unknown.
+    :raises BudgetExceededError: If resolving the expression exceeds the active budget.
     """
-    if not isinstance(expression, str):
+    if not isinstance(expression, str) or "$" not in expression:
         return expression
 
     async def _resolve(expr: str) -> str:
@@ -64,45 +106,323 @@ async def resolve_expression(expression: str, context: Any) -> Any:
             op, [await resolve_expression(arg, context) for arg in args], context
         )
 
-    while True:
-        matches = list(re.finditer(EXPRESSION_LOC_REGEX, expression))
-        if not matches:
-            break
+    with ExitStack() as stack:
+        stack.enter_context(nested_expression())
+        rescan = False
+
+        while True:
+            matches = list(re.finditer(EXPRESSION_LOC_REGEX, expression))
+            if not matches:
+                break
+
+            # Every rescan expands expressions that were nested in, or produced by,
+            # the previous ones, so it counts as another level of nesting, including
+            # for the expressions resolved within it
+            check_deadline()
+            if rescan:
+                stack.enter_context(nested_expression())
+            rescan = True
 
-        for match in reversed(matches):
-            start, end = match.span()
-            resolved_value = await _resolve(match.group(0))
+            for match in reversed(matches):
+                start, end = match.span()
+                resolved_value = await _resolve(match.group(0))
 
-            if expression == match.group(0):
-                # If the entire expression is the match, return the resolved value directly
-                return resolved_value
-            else:
-                # Otherwise, concatenate the resolved value as a string
-                expression = expression[:start] + str(resolved_value) + expression[end:]
+                if expression == match.group(0):
+                    # If the entire expression is the match, return the resolved value directly
+                    return resolved_value
+                else:
+                    # Otherwise, concatenate the resolved value as a string
+                    expression = expression[:start] + str(resolved_value) + expression[end:]
 
     return expression
 
 
-async def resolve_expressions(data: dict | list | Any, parent: Any | None = None):
+def has_expression(value: str) -> bool:
+    """
+    Check if a string contains an expression in the format `$operation_name{arg}`.
+
+    :param value: The string to check.
+    :type value: str
+    :returns: Whether the string contains an expression.
+    :rtype: bool
+    """
+    return "$" in value and EXPRESSION_LOC_REGEX.search(value) is not None
+
+
+def contains_expressions(data: dict | list | Any) -> bool:
+    """
+    Check if a structure contains any expressions.
+
+    :param data: The structure to check.
+    :type data: dict | list | Any
+    :returns: Whether any string in the structure contains an expression.
+    :rtype: bool
+    """
+    if isinstance(data, dict):
+        return any(contains_expressions(value) for value in data.values())
+    elif isinstance(data, list):
+        return any(contains_expressions(item) for item in data)
+    return isinstance(data, str) and has_expression(data)
+
+
+def find_references(data: dict | list | Any) -> set[str]:
+    """
+    Find the key paths of the $ref expressions in a structure that point within the
+    same document. References whose key path is itself an expression are not included.
+
+    :param data: The structure to search.
+    :type data: dict | list | Any
+    :returns: The referenced key paths.
+    :rtype: set[str]
+    """
+    if isinstance(data, dict):
+        return set().union(*[find_references(value) for value in data.values()])
+    elif isinstance(data, list):
+        return set().union(*[find_references(item) for item in data])
+    elif isinstance(data, str) and "$ref{" in data:
+        return {match.group(1) for match in REF_REGEX.finditer(data)}
+    return set()
+
+
+def _copy_structure(
+    data: dict | list,
+    leaves: list[tuple[dict | list, Any, str, tuple]],
+    path: tuple = (),
+) -> dict | list:
+    """
+    Copy the dicts and lists of a structure that contain expressions, collecting every
+    expression leaf along with the container and key it was copied into, and its path
+    from the root. Subtrees without expressions are returned as is.
+    """
+    copied: Any = None
+    items = data.items() if isinstance(data, dict) else enumerate(data)
+
+    for key, value in items:
+        if isinstance(value, (dict, list)):
+            child = _copy_structure(value, leaves, path + (key,))
+            if child is value:
+                continue
+        elif not isinstance(value, str) or not has_expression(value):
+            continue
+
+        # Only copy the container once something inside of it needs resolving
+        if copied is None:
+            copied = dict(data) if isinstance(data, dict) else list(data)
+
+        if isinstance(value, str):
+            leaves.append((copied, key, value, path + (key,)))
+        else:
+            copied[key] = child
+
+    return data if copied is None else copied
+
+
+def _format_path(path: tuple) -> str:
+    return ".".join(str(key) for key in path) or "*"
+
+
+def _ref_dependencies(leaves: list[tuple[dict | list, Any, str, tuple]]) -> list[set[int]]:
     """
-    Recursively resolves expressions in a dictionary and returns a new dictionary
+    Build the dependency graph of intra-document $ref expressions, mapping each leaf
+    to the expression leaves that its references point at or into.
+    """
+    dependencies: list[set[int]] = [set() for _ in leaves]
+
+    if not any("$ref{" in value for _, _, value, _ in leaves):
+        return dependencies
+
+    # Index every expression leaf by its path, and by every prefix of its path
+    # so that a reference to a subtree depends on all the expressions inside of it
+    paths: dict[tuple, int] = {}
+    prefixes: dict[tuple, list[int]] = {}
+    for index, (_, _, _, path) in enumerate(leaves):
+        paths[path] = index
+        for length in range(len(path) + 1):
+            prefixes.setdefault(path[:length], []).append(index)
+
+    for index, (_, _, value, _) in enumerate(leaves):
+        if "$ref{" not in value:
+            continue
+
+        for match in REF_REGEX.finditer(value):
+            key_path = match.group(1)
+            ref_path = () if key_path == "*" else tuple(key_path.split("."))
+
+            dependencies[index].update(prefixes.get(ref_path, ()))
+            # A reference into the value of an expression depends on that expression
+            for length in range(1, len(ref_path)):
+                if (ancestor := paths.get(ref_path[:length])) is not None:
+                    dependencies[index].add(ancestor)
+
+    return dependencies
+
+
+def _topological_layers(
+    dependencies: list[set[int]],
+    leaves: list[tuple[dict | list, Any, str, tuple]],
+) -> list[list[int]]:
+    """
+    Group the leaves into layers where every leaf only depends on leaves in earlier layers.
+
+    :raises ValueError: If the references form a cycle.
+    """
+    dependents: list[list[int]] = [[] for _ in dependencies]
+    remaining = [len(deps) for deps in dependencies]
+
+    for index, deps in enumerate(dependencies):
+        for dependency in deps:
+            dependents[dependency].append(index)
+
+    layers = []
+    layer = [index for index, count in enumerate(remaining) if count == 0]
+    while layer:
+        layers.append(layer)
+        next_layer = []
+        for index in layer:
+            for dependent in dependents[index]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    next_layer.append(dependent)
+        layer = next_layer
+
+    if sum(len(layer) for layer in layers) != len(dependencies):
+        # Every unresolved leaf still depends on another unresolved leaf,
+        # so walking those dependencies must eventually revisit a leaf
+        index = next(index for index, count in enumerate(remaining) if count)
+        visited: list[int] = []
+        while index not in visited:
+            visited.append(index)
+            index = next(dep for dep in dependencies[index] if remaining[dep])
+        cycle = visited[visited.index(index):] + [index]
+        raise ValueError(
+            "Circular $ref detected: " + " -> ".join(_format_path(leaves[i][3]) for i in cycle)
+        )
+
+    return layers
+
+
+async def resolve_expressions(
+    data: dict | list | Any,
+    parent: Any | None = None,
+    concurrency: int | None = None,
+):
+    """
+    Resolves expressions in a dictionary and returns a new dictionary
     with the resolved values.
 
+    Independent expressions are resolved concurrently, with at most `concurrency`
+    of them in flight at once. The resolved values are placed back in the same
+    structure and key order as the original data. Only the dicts and lists that contain
+    expressions are copied, any subtree without expressions is shared with the original data.
+
+    Within a `defer_expressions` block the expressions are left unresolved.
+
+    When no parent is given, `$ref` expressions that point within the data are resolved
+    against the resolved values. The references form a dependency graph which is evaluated
+    in topological order, so each value is resolved exactly once before it is referenced.
+
     :param data: The dictionary to resolve expressions in.
     :type data: dict
     :param parent: The parent dictionary. Defaults to None.
     :type parent: dict, optional
+    :param concurrency: The maximum number of expressions to resolve concurrently.
+    Defaults to `DEFAULT_CONCURRENCY`.
+    :type concurrency: int, optional
     :returns: A new dictionary with the resolved values.
     :rtype: dict
+    :raises ValueError: If the concurrency is less than 1 or if the references form a cycle.
     """
-    if not parent:
-        parent = data
+    if not isinstance(data, (dict, list)):
+        return await resolve_expression(data, parent or data)
 
-    if isinstance(data, dict):
-        return {key: await resolve_expressions(value, parent) for key, value in data.items()}
-    elif isinstance(data, list):
-        return [await resolve_expressions(item, parent) for item in data]
+    concurrency = _check_concurrency(concurrency)
+    leaves: list[tuple[dict | list, Any, str, tuple]] = []
+    result = _copy_structure(data, leaves)
+
+    if not leaves:
+        return result
+
+    if _deferred.get():
+        for container, key, value, _ in leaves:
+            if "|" in value:
+                container[key] = FILE_REF_REGEX.sub(
+                    lambda match: f"$ref{{{resolve_ref_path(match.group(1))}|", value
+                )
+        return result
+
+    if parent:
+        # References point outside of the data, so there is nothing to order
+        layers = [list(range(len(leaves)))]
     else:
-        return await resolve_expression(data, parent)
+        parent = result
+        layers = _topological_layers(_ref_dependencies(leaves), leaves)
+
+    await _resolve_leaves(leaves, layers, parent, concurrency)
+    return result
+
+
+async def resolve_key_expressions(
+    document: dict[str, Any], key: str, concurrency: int | None = None
+) -> Any:
+    """
+    Resolve the expressions in the value of a top-level key of a document, as
+    `resolve_expressions` would when resolving the whole document. Only the value of the
+    key is scanned for expressions, and `$ref` expressions pointing outside of it are
+    resolved against the other keys of the document as they are, so the keys it references
+    should be resolved first.
+
+    :param document: The document.
+    :type document: dict
+    :param key: The top-level key to resolve.
+    :type key: str
+    :param concurrency: The maximum number of expressions to resolve concurrently.
+    Defaults to `DEFAULT_CONCURRENCY`.
+    :type concurrency: int, optional
+    :returns: The resolved value of the key.
+    :rtype: Any
+    :raises ValueError: If the concurrency is less than 1 or if the references form a cycle.
+    """
+    concurrency = _check_concurrency(concurrency)
+    leaves: list[tuple[dict | list, Any, str, tuple]] = []
+    result: Any = _copy_structure({key: document[key]}, leaves)
+
+    if not leaves:
+        return document[key]
+
+    layers = _topological_layers(_ref_dependencies(leaves), leaves)
+    await _resolve_leaves(leaves, layers, {**document, **result}, concurrency)
+    return result[key]
+
+
+def _check_concurrency(concurrency: int | None) -> int:
+    if concurrency is None:
+        return DEFAULT_CONCURRENCY
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1, got {concurrency}")
+    return concurrency
+
+
+async def _resolve_leaves(
+    leaves: list[tuple[dict | list, Any, str, tuple]],
+    layers: list[list[int]],
+    parent: Any,
+    concurrency: int,
+) -> None:
+    # Resolve the expression leaves one layer at a time, placing the resolved values
+    # back into the containers they were copied into
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _resolve_leaf(value: str) -> Any:
+        async with semaphore:
+            with span("manifest.expression", expression=value):
+                return await resolve_expression(value, parent)
+
+    with cache_operations():
+        for layer in layers:
+            resolved = await asyncio.gather(
+                *[_resolve_leaf(leaves[index][2]) for index in layer]
+            )
 
-    return data
+            for index, value in zip(layer, resolved, strict=True):
+                container, key, _, _ = leaves[index]
+                container[key] = value
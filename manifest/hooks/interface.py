@@ -1,14 +1,141 @@
 from typing import Any, Callable
 
-from manifest.utils import is_async_callable, run_in_thread
+from manifest.tracing import span
+from manifest.utils import callable_name, is_async_callable, run_in_thread
 
 
+HOOK_EXECUTION_POLICIES = ("inline", "thread")
+
 _HOOKS: dict[tuple[str, str], list[Callable]] = {
     ("pre", "load"): [],
     ("post", "load"): [],
     ("pre", "dump"): [],
     ("post", "dump"): [],
 }
+_HOOK_EXECUTION: dict[Callable, str] = {}
+_PIPELINES: dict[tuple[str, str], "HookPipeline"] = {}
+
+
+class HookPipeline:
+    """
+    A chain of hooks where each hook is called with the result of the previous one.
+
+    The chain is split into stages once, when the pipeline is created. Async hooks are
+    awaited on the event loop, sync hooks marked `inline` are called directly, and
+    consecutive sync hooks marked `thread` are fused into a single executor call.
+
+    :param hooks: The hooks to chain.
+    :type hooks: list[Callable]
+    """
+    def __init__(self, hooks: list[Callable]) -> None:
+        self.hooks = list(hooks)
+        self._stages: list[tuple[str, list[Callable]]] = []
+        self._extended: tuple[tuple[Callable, ...], HookPipeline] | None = None
+
+        for hook in self.hooks:
+            kind = "async" if is_async_callable(hook) else get_hook_execution(hook)
+
+            if kind != "async" and self._stages and self._stages[-1][0] == kind:
+                self._stages[-1][1].append(hook)
+            else:
+                self._stages.append((kind, [hook]))
+
+    def __len__(self) -> int:
+        return len(self.hooks)
+
+    def extend(self, hooks: list[Callable]) -> "HookPipeline":
+        """
+        Get a new pipeline with the given hooks appended. The last extended pipeline is
+        kept, so extending repeatedly with the same hooks builds it only once.
+
+        :param hooks: The hooks to append.
+        :type hooks: list[Callable]
+        :return: The new pipeline, or this pipeline if there are no hooks to append.
+        """
+        if not hooks:
+            return self
+
+        key = tuple(hooks)
+
+        if self._extended is None or self._extended[0] != key:
+            self._extended = (key, HookPipeline(self.hooks + list(hooks)))
+
+        return self._extended[1]
+
+    async def __call__(self, data: Any) -> Any:
+        for kind, hooks in self._stages:
+            if kind == "async":
+                with span("manifest.hook", hook=callable_name(hooks[0])):
+                    data = await hooks[0](data)
+            elif kind == "inline":
+                data = _run_chain(hooks, data)
+            else:
+                data = await run_in_thread(_run_chain, hooks, data)
+        return data
+
+
+def _run_chain(hooks: list[Callable], data: Any) -> Any:
+    for hook in hooks:
+        with span("manifest.hook", hook=callable_name(hook)):
+            data = hook(data)
+    return data
+
+
+def get_hook_execution(hook: Callable) -> str:
+    """
+    Get the execution policy of a sync hook.
+
+    :param hook: The hook.
+    :type hook: Callable
+    :return: The execution policy, `thread` if none was set.
+    :rtype: str
+    """
+    return _HOOK_EXECUTION.get(hook, "thread")
+
+
+def set_hook_execution(hook: Callable, execution: str) -> None:
+    """
+    Set the execution policy of a sync hook, which applies wherever the hook is used.
+
+    The available policies are `inline`, to call the hook directly on the event loop
+    for cheap hooks, and `thread`, to run the hook in a thread pool.
+
+    :param hook: The hook.
+    :type hook: Callable
+    :param execution: The execution policy.
+    :type execution: str
+    :raises ValueError: If the execution policy is unknown.
+    """
+    if execution not in HOOK_EXECUTION_POLICIES:
+        raise ValueError(f"Invalid execution policy: {execution}")
+
+    _HOOK_EXECUTION[hook] = execution
+    _PIPELINES.clear()
+
+
+def get_hook_pipeline(
+    hook_type: str, operation: str, hooks: list[Callable] | None = None
+) -> HookPipeline:
+    """
+    Get the pipeline of the registered hooks followed by the given hooks.
+
+    The pipeline of the registered hooks is built once and reused until the hooks change.
+
+    :param hook_type: The hook type.
+    :type hook_type: str
+    :param operation: The operation.
+    :type operation: str
+    :param hooks: Additional hooks to run after the registered hooks.
+    :type hooks: list[Callable]
+    :return: The hook pipeline.
+    :rtype: HookPipeline
+    """
+    key = (hook_type, operation)
+
+    if key not in _PIPELINES:
+        _PIPELINES[key] = HookPipeline(get_hooks(hook_type, operation))
+
+    return _PIPELINES[key].extend(hooks or [])
 
 
 def get_hooks(hook_type: str, operation: str) -> list[Callable]:
@@ -16,14 +143,17 @@ def get_hooks(hook_type: str, operation: str) -> list[Callable]:
     Get the pre hooks.
 
     The available hook_types are `pre` and `post`. The available operations are `load` and `dump`.
+    The hooks are returned as a copy, use `register_hook` and `unregister_hook` to change them.
 
     :return: The pre hooks.
     :rtype: list[Callable]
     """
-    return _HOOKS.get((hook_type, operation), [])
+    return list(_HOOKS.get((hook_type, operation), []))
 
 
-def register_hook(hook: Callable, hook_type: str, operation: str) -> None:
+def register_hook(
+    hook: Callable, hook_type: str, operation: str, execution: str | None = None
+) -> None:
     """
     Register a hook to be executed on the data.
 
@@ -31,13 +161,19 @@ def register_hook(hook: Callable, hook_type: str, operation: str) -> None:
 
     :param hook: The hook to be registered.
     :type hook: Callable
+    :param execution: The execution policy of the hook if it's sync, see `set_hook_execution`.
+    :type execution: str
     """
     key = (hook_type, operation)
 
     if key not in _HOOKS:
         raise ValueError(f"Invalid hook type and/or operation: {hook_type}, {operation}")
 
+    if execution is not None:
+        set_hook_execution(hook, execution)
+
     _HOOKS[key].append(hook)
+    _PIPELINES.pop(key, None)
 
 
 def unregister_hook(hook: Callable, hook_type: str, operation: str) -> None:
@@ -59,6 +195,7 @@ def unregister_hook(hook: Callable, hook_type: str, operation: str) -> None:
         raise ValueError(f"Invalid hook type and/or operation: {hook_type}, {operation}")
 
     _HOOKS[key].remove(hook)
+    _PIPELINES.pop(key, None)
 
 
 async def execute_hook(hook: Callable, *args, **kwargs) -> Any:
@@ -0,0 +1,344 @@
+from typing import Any
+
+from manifest.utils import (
+    Missing,
+    Sentinel,
+    Wildcard,
+    compile_dot_path,
+    join_dot_path,
+    merge_dicts,
+    merge_dicts_flat,
+    merge_lists,
+)
+
+
+class Layer:
+    """
+    A named source of data in a LayeredDict.
+
+    :param name: The name of the layer, unique within its LayeredDict.
+    :type name: str
+    :param data: The data of the layer.
+    :type data: dict
+    :param flat: Whether the top-level values of the layer replace those of the layers
+    before it rather than being merged into them, as with `merge_dicts_flat`.
+    :type flat: bool
+    :param sources: The names of the sources of individual dot paths in the layer,
+    such as the environment variables of an env layer.
+    :type sources: dict[str, str] | None
+    :param source: The name of the source of the layer, such as a file path, reported by
+    `LayeredDict.provenance`. Defaults to the name of the layer.
+    :type source: str | None
+    """
+    __slots__ = ("name", "data", "flat", "sources", "source")
+
+    def __init__(
+        self,
+        name: str,
+        data: dict,
+        flat: bool = False,
+        sources: dict[str, str] | None = None,
+        source: str | None = None,
+    ) -> None:
+        self.name = name
+        self.data = data
+        self.flat = flat
+        self.sources = sources or {}
+        self.source = source or name
+
+    def __repr__(self) -> str:
+        return f"Layer(name={self.name!r}, flat={self.flat})"
+
+
+class LayeredDict:
+    """
+    A stack of layers merged in order, as with `merge_dicts`, that remembers which layer
+    each value comes from. Adding, replacing or removing a layer only re-merges the keys
+    that layer touches, and the merged data shares everything else with the previous
+    merge, so the merged data should be treated as read-only.
+
+    :param layers: The layers to start with.
+    :type layers: list[Layer] | None
+    :param list_keys: The key field to merge the records of the list at each dot path by,
+    see `merge_dicts`.
+    :type list_keys: dict[str, str] | None
+    """
+    def __init__(
+        self, layers: list[Layer] | None = None, list_keys: dict[str, str] | None = None
+    ) -> None:
+        self._layers: list[Layer] = []
+        self._data: dict = {}
+        self._list_keys = list_keys or {}
+
+        for layer in layers or []:
+            if layer.name in self.names:
+                raise ValueError(f"Layer `{layer.name}` already exists")
+            self._layers.append(layer)
+
+        # Merge the runs of flat and non-flat layers in one pass each
+        start = 0
+        for end in range(1, len(self._layers) + 1):
+            if end == len(self._layers) or self._layers[end].flat != self._layers[start].flat:
+                runs = [self._data, *[layer.data for layer in self._layers[start:end]]]
+                self._data = (
+                    merge_dicts_flat(*runs, list_keys=self._list_keys)
+                    if self._layers[start].flat
+                    else merge_dicts(*runs, list_keys=self._list_keys)
+                )
+                start = end
+
+    def __repr__(self) -> str:
+        return f"LayeredDict(layers={self.names!r})"
+
+    @property
+    def data(self) -> dict:
+        """
+        The merged data of the layers.
+        """
+        return self._data
+
+    @property
+    def names(self) -> list[str]:
+        """
+        The names of the layers, in order.
+        """
+        return [layer.name for layer in self._layers]
+
+    def copy(self) -> "LayeredDict":
+        """
+        Get a copy of the LayeredDict that can be changed without affecting this one.
+        The data of the layers and the merged data are shared until they change.
+
+        :return: The copy.
+        :rtype: LayeredDict
+        """
+        layered = LayeredDict(list_keys=self._list_keys)
+        layered._layers = [
+            Layer(layer.name, layer.data, layer.flat, dict(layer.sources), layer.source)
+            for layer in self._layers
+        ]
+        layered._data = self._data
+        return layered
+
+    def get_layer(self, name: str) -> Layer:
+        """
+        Get a layer by name.
+
+        :param name: The name of the layer.
+        :type name: str
+        :return: The layer.
+        :raises KeyError: If there is no layer with the name.
+        """
+        return self._layers[self._index(name)]
+
+    def add(self, layer: Layer) -> None:
+        """
+        Add a layer on top of the others.
+
+        :param layer: The layer.
+        :type layer: Layer
+        :raises ValueError: If there is already a layer with the same name.
+        """
+        if layer.name in self.names:
+            raise ValueError(f"Layer `{layer.name}` already exists")
+
+        self._layers.append(layer)
+        self._remerge(len(self._layers) - 1, Missing, layer.data)
+
+    def replace(self, name: str, data: dict, sources: dict[str, str] | None = None) -> None:
+        """
+        Replace the data of a layer, re-merging only the keys in its old or new data.
+
+        :param name: The name of the layer.
+        :type name: str
+        :param data: The new data of the layer.
+        :type data: dict
+        :param sources: The new sources of the layer, see `Layer`.
+        :type sources: dict[str, str] | None
+        :raises KeyError: If there is no layer with the name.
+        """
+        index = self._index(name)
+        layer = self._layers[index]
+        old = layer.data
+
+        layer.data = data
+        layer.sources = sources or {}
+        self._remerge(index, old, data)
+
+    def remove(self, name: str) -> None:
+        """
+        Remove a layer, re-merging only the keys in its data.
+
+        :param name: The name of the layer.
+        :type name: str
+        :raises KeyError: If there is no layer with the name.
+        """
+        index = self._index(name)
+        old = self._layers[index].data
+
+        # Merge with the layer emptied so the indices of the layers stay the same
+        self._layers[index].data = {}
+        self._remerge(index, old, {})
+        del self._layers[index]
+
+    def provenance(self, key: str) -> str | None:
+        """
+        Get the name of the source of the value at a dot path: the source of the last layer
+        to set it, or a source of that layer if it has one for the path. For dicts merged from
+        several layers, this is the last layer to set any part of it.
+
+        :param key: The dot path.
+        :type key: str
+        :return: The name of the source, or None if the path doesn't exist or has a
+        wildcard.
+        :rtype: str | None
+        """
+        parts = compile_dot_path(key).parts
+
+        if not compile_dot_path(key).exists(self._data) or Wildcard in parts:
+            return None
+
+        # Since the path exists in the merged data, it comes from the last layer that
+        # sets it, other than with a Sentinel placeholder
+        for layer in reversed(self._layers):
+            if self._find(layer.data, parts) is not Sentinel:
+                return layer.sources.get(key, layer.source)
+
+        return None
+
+    def _find(self, data: dict, parts: tuple) -> Any:
+        # Get the value at the parts of a path in a layer, following the merged data
+        # to match the records of lists merged by a key field, or Sentinel if not found
+        merged: Any = self._data
+        value: Any = data
+        path = ""
+
+        for part in parts:
+            if isinstance(part, int):
+                if not isinstance(value, list):
+                    return Sentinel
+
+                index = part if part >= 0 else part + len(merged)
+                field = self._list_keys.get(path)
+                record = merged[index]
+
+                if field is not None and isinstance(record, dict) and field in record:
+                    matches = [
+                        item for item in value
+                        if isinstance(item, dict) and item.get(field, Missing) == record[field]
+                    ]
+                    value = matches[-1] if matches else Sentinel
+                else:
+                    value = value[index] if index < len(value) else Sentinel
+
+                merged = record
+                path += "[*]"
+            else:
+                if not isinstance(value, dict) or part not in value:
+                    return Sentinel
+
+                value = value[part]
+                merged = merged[part]
+                path = join_dot_path(path, part)
+
+        return value
+
+    def _index(self, name: str) -> int:
+        for index, layer in enumerate(self._layers):
+            if layer.name == name:
+                return index
+        raise KeyError(f"No layer named `{name}`")
+
+    def _remerge(self, index: int, old: Any, new: Any) -> None:
+        layers = [(position, layer.data) for position, layer in enumerate(self._layers)]
+        self._data = self._update(self._data, layers, index, old, new, "")
+
+    def _update(
+        self,
+        merged: dict,
+        layers: list[tuple[int, dict]],
+        index: int,
+        old: Any,
+        new: Any,
+        path: str,
+    ) -> dict:
+        # Re-merge the keys the changed layer touches in a copy of the merged dict, where
+        # layers are the dicts merged into it and old and new the changed layer's dicts
+        result = dict(merged)
+        keys = list(old) if isinstance(old, dict) else []
+        keys += [key for key in new if key not in keys] if isinstance(new, dict) else []
+
+        for key in keys:
+            child_path = join_dot_path(path, key)
+            values = [(position, data[key]) for position, data in layers if key in data]
+
+            if not values:
+                result.pop(key, None)
+                continue
+
+            old_child = old.get(key, Missing) if isinstance(old, dict) else Missing
+            new_child = new.get(key, Missing) if isinstance(new, dict) else Missing
+            # The values merged into the key before the change
+            old_values = [(position, value) for position, value in values if position != index]
+            if old_child is not Missing:
+                old_values.append((index, old_child))
+                old_values.sort(key=lambda item: item[0])
+
+            start = self._run_start(values, path)
+            old_start = self._run_start(old_values, path) if old_values else None
+
+            if (
+                key in result
+                and old_start is not None
+                and old_values[old_start][0] == values[start][0]
+                and _kind(old_values[-1][1]) == _kind(values[-1][1])
+            ):
+                if index < values[start][0]:
+                    # The changed layer is overridden by a later layer
+                    continue
+
+                if isinstance(values[-1][1], dict) and isinstance(result[key], dict):
+                    result[key] = self._update(
+                        result[key], values[start:], index, old_child, new_child, child_path
+                    )
+                    continue
+
+            result[key] = self._merge_run([value for _, value in values[start:]], child_path)
+
+        return result
+
+    def _run_start(self, values: list[tuple[int, Any]], path: str) -> int:
+        # The index of the first of the trailing values that are merged together, since
+        # a value of a different type replaces everything before it
+        kind = _kind(values[-1][1])
+        start = len(values) - 1
+
+        if kind is None:
+            return start
+
+        while start > 0:
+            if kind is dict and not path and self._layers[values[start][0]].flat:
+                break
+            if _kind(values[start - 1][1]) is not kind:
+                break
+            start -= 1
+
+        return start
+
+    def _merge_run(self, values: list[Any], path: str) -> Any:
+        # Merge the trailing values of the same type found at a dot path
+        if isinstance(values[-1], dict):
+            return merge_dicts(*values, list_keys=self._list_keys, path=path)
+
+        if isinstance(values[-1], list):
+            return merge_lists(*values, list_key=self._list_keys.get(path))
+
+        return values[-1]
+
+
+def _kind(value: Any) -> type | None:
+    if isinstance(value, dict):
+        return dict
+    if isinstance(value, list):
+        return list
+    return None
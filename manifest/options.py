@@ -0,0 +1,70 @@
+from manifest.executor import ManifestExecutor
+from manifest.hooks.expressions.budget import ExpressionBudget
+from manifest.profile import BuildProfile, MemoryProfile
+
+
+class BuildOptions:
+    """
+    Options for how `Manifest.build` builds a Manifest. These are passed together as
+    `build_options` so they can't collide with the fields of the model, which are
+    passed to `build` as keyword arguments.
+
+    :param lazy: Whether to defer resolving expressions until they are accessed
+    :type lazy: bool
+    :param budget: Limits on the work done resolving expressions while building
+    :type budget: ExpressionBudget | None
+    :param process_threshold: The file size in bytes from which to load a file in
+    the process pool, see `load_from_file`
+    :type process_threshold: int | None
+    :param profile: A profile to record where the time building goes, see `BuildProfile`
+    :type profile: BuildProfile | None
+    :param memory_profile: A profile to record the memory allocated while building,
+    see `MemoryProfile`
+    :type memory_profile: MemoryProfile | None
+    :param list_keys: The key field to merge the records of the list at each dot path
+    by instead of by position, see `merge_dicts`
+    :type list_keys: dict[str, str] | None
+    :param executor: The executor to read files and run hooks and operations in,
+    see `get_executor`
+    :type executor: ManifestExecutor | None
+    :param keep_layers: Whether to keep the sources of the Manifest as layers, so it can
+    report the provenance of its values and reload its files, see `Manifest.reload`
+    :type keep_layers: bool
+    """
+    __slots__ = (
+        "lazy",
+        "budget",
+        "process_threshold",
+        "profile",
+        "memory_profile",
+        "list_keys",
+        "executor",
+        "keep_layers",
+    )
+
+    def __init__(
+        self,
+        lazy: bool = False,
+        budget: ExpressionBudget | None = None,
+        process_threshold: int | None = None,
+        profile: BuildProfile | None = None,
+        memory_profile: MemoryProfile | None = None,
+        list_keys: dict[str, str] | None = None,
+        executor: ManifestExecutor | None = None,
+        keep_layers: bool = False,
+    ) -> None:
+        self.lazy = lazy
+        self.budget = budget
+        self.process_threshold = process_threshold
+        self.profile = profile
+        self.memory_profile = memory_profile
+        self.list_keys = list_keys
+        self.executor = executor
+        self.keep_layers = keep_layers
+
+    def __repr__(self) -> str:
+        return (
+            f"BuildOptions(lazy={self.lazy}, budget={self.budget!r}, "
+            f"process_threshold={self.process_threshold}, list_keys={self.list_keys!r}, "
+            f"keep_layers={self.keep_layers})"
+        )
@@ -1,24 +1,43 @@
+import asyncio
 import os
+from contextlib import contextmanager, nullcontext
 from contextvars import ContextVar
 from pathlib import Path
 from typing import Any, Callable
 
 from fsspec import AbstractFileSystem
 from fsspec import open as fsspec_open
-from fsspec.core import url_to_fs
-
-from manifest.hooks import execute_hook, get_hooks
+from fsspec.core import split_protocol, url_to_fs
+
+from manifest.hooks import get_hook_pipeline
+from manifest.hooks.expressions.budget import (
+    BudgetUsage,
+    ExpressionBudget,
+    at_expression_depth,
+    charge_usage,
+    expression_budget,
+    get_budget_usage,
+    get_expression_depth,
+    remaining_time,
+)
+from manifest.hooks.expressions.operations import cache_operations
+from manifest.hooks.expressions.resolve import defer_expressions, expressions_deferred
+from manifest.profile import BuildProfile, get_profile, profile_build
+from manifest.pydantic import BaseModel, get_field_type
 from manifest.serializers import (
     JSONSerializer,
     Serializer,
     TOMLSerializer,
     YAMLSerializer,
 )
+from manifest.tracing import span
 from manifest.utils import (
     coerce_to_basic_types,
+    compile_dot_path,
     get_filename_suffix,
     merge_dicts,
     merge_dicts_flat,
+    run_in_process,
     run_in_thread,
     set_by_dot_path,
 )
@@ -26,6 +45,12 @@ from manifest.utils import (
 
 Undefined = type("Undefined", (), {"__repr__": lambda self: "Undefined"})
 current_file: ContextVar[str] = ContextVar("current_file", default="")
+document_cache: ContextVar[dict[str, asyncio.Future] | None] = ContextVar(
+    "document_cache", default=None
+)
+# The document being loaded by the current task, and which documents each load is waiting on
+loading_document: ContextVar[str | None] = ContextVar("loading_document", default=None)
+document_waits: ContextVar[dict[str, set[str]]] = ContextVar("document_waits")
 
 
 def parse_file_path(file_path: str) -> dict[str, Any]:
@@ -47,6 +72,39 @@ def parse_file_path(file_path: str) -> dict[str, Any]:
     }
 
 
+def get_protocol(file_path: str) -> str:
+    """
+    Get the protocol of a file path without creating its filesystem.
+
+    :param file_path: The path to the file.
+    :type file_path: str
+    :return: The protocol, `file` if the path has none.
+    """
+    return split_protocol(file_path)[0] or "file"
+
+
+@contextmanager
+def cache_documents():
+    """
+    Context manager that shares documents loaded with `load_from_file_cached` for the
+    duration of the block. If a cache is already active it is reused.
+
+    :yields: None
+    """
+    if document_cache.get() is not None:
+        yield
+        return
+
+    token = document_cache.set({})
+    waits_token = document_waits.set({})
+
+    try:
+        yield
+    finally:
+        document_waits.reset(waits_token)
+        document_cache.reset(token)
+
+
 def determine_file_type(file_ext: str) -> str:
     """
     Given a file extension, return the corresponding file type.
@@ -121,6 +179,22 @@ async def read_from_file(file: str, **kwargs) -> bytes:
     return await run_in_thread(_)
 
 
+async def get_file_size(file: str, **kwargs) -> int:
+    """
+    Get the size of a file in bytes.
+
+    :param file: The path to the file.
+    :type file: Path
+    :return: The size of the file in bytes.
+    """
+
+    def _():
+        fs, path = url_to_fs(file, **kwargs)
+        return fs.size(path)
+
+    return await run_in_thread(_)
+
+
 async def write_to_file(file: str, content: bytes, **kwargs) -> int:
     """
     Write the contents of a byte string to a file.
@@ -166,8 +240,6 @@ async def dump_to_file(
     :rtype: int
     """
     string_path = str(file)
-    pre_process_hooks = pre_process_hooks or []
-    post_process_hooks = post_process_hooks or []
 
     if isinstance(data, dict) and root_alias in data:
         data = data[root_alias]
@@ -177,8 +249,8 @@ async def dump_to_file(
         _type=determine_file_type(get_filename_suffix(string_path)), _default=default_serializer
     )
 
-    pre_process_hooks = get_hooks("pre", operation="dump") + pre_process_hooks
-    post_process_hooks = get_hooks("post", operation="dump") + post_process_hooks
+    pre_process = get_hook_pipeline("pre", "dump", pre_process_hooks)
+    post_process = get_hook_pipeline("post", "dump", post_process_hooks)
 
     # Set the current file context variable to have a reference of the current file
     # being worked on in the hooks
@@ -186,21 +258,23 @@ async def dump_to_file(
 
     try:
         # Pre-process the data
-        for pre_hook in pre_process_hooks:
-            data = await execute_hook(pre_hook, data)
+        with span("manifest.pre_hooks", path=string_path):
+            data = await pre_process(data)
 
         # Serialize the data
-        serialized_data = serializer.dumps(data)
+        with span("manifest.serialize", path=string_path):
+            serialized_data = serializer.dumps(data)
 
         # Post-process the data
-        for post_hook in post_process_hooks:
-            serialized_data = await execute_hook(post_hook, serialized_data)
+        with span("manifest.post_hooks", path=string_path):
+            serialized_data = await post_process(serialized_data)
     finally:
         # Reset the current file context variable
         current_file.reset(token)
 
     # Write the serialized data to the file
-    return await write_to_file(string_path, serialized_data, **kwargs)
+    with span("manifest.write", path=string_path, bytes=len(serialized_data)):
+        return await write_to_file(string_path, serialized_data, **kwargs)
 
 
 async def load_from_file(
@@ -209,101 +283,326 @@ async def load_from_file(
     post_process_hooks: list[Callable] | None = None,
     default_serializer: Any = Undefined,
     root_alias: str = "root",
+    process_threshold: int | None = None,
     **kwargs,
 ) -> Any:
     """
     Parse a file by loading it, deserializing it, and returning the resulting dictionary.
 
+    If a process threshold is given, files at least that many bytes in size are loaded
+    in the shared process pool instead, from reading the file through to the post-process
+    hooks. The hooks and serializer must then be picklable, and any hooks, operations
+    or serializers registered at runtime must also be registered in the worker processes.
+
     :param file: The path to the file to be parsed.
     :type file: str
     :param pre_process_hooks: A list of hooks to be called before deserializing the file.
     :type pre_process_hooks: list[Callable]
     :param post_process_hooks: A list of hooks to be called after deserializing the file.
     :type post_process_hooks: list[Callable]
+    :param process_threshold: The file size in bytes from which to load in a process.
+    :type process_threshold: int | None
     :return: The parsed data from the file.
     :rtype: Any
     """
     string_path = str(file)
-    pre_process_hooks = pre_process_hooks or []
-    post_process_hooks = post_process_hooks or []
 
-    # Get the serializer for the file type
-    serializer = get_serializer_from_type(
-        _type=determine_file_type(get_filename_suffix(string_path)), _default=default_serializer
-    )
+    with span("manifest.load", path=string_path, protocol=get_protocol(string_path)) as load:
+        if (
+            process_threshold is not None
+            and await get_file_size(string_path, **kwargs) >= process_threshold
+        ):
+            usage = get_budget_usage()
+            profile = get_profile()
 
-    pre_process_hooks = get_hooks("pre", operation="load") + pre_process_hooks
-    post_process_hooks = get_hooks("post", operation="load") + post_process_hooks
+            if load is not None:
+                load.set_attribute("process", True)
 
-    parsed_info = parse_file_path(string_path)
+            data, process_profile, process_usage = await run_in_process(
+                _load_in_process,
+                file=file,
+                pre_process_hooks=pre_process_hooks,
+                post_process_hooks=post_process_hooks,
+                default_serializer=default_serializer,
+                root_alias=root_alias,
+                deferred=expressions_deferred(),
+                budget=(
+                    (usage.budget, usage.operations, usage.bytes, remaining_time())
+                    if usage is not None
+                    else None
+                ),
+                depth=get_expression_depth(),
+                profile=profile is not None,
+                **kwargs,
+            )
 
-    if parsed_info["is_local"]:
-        if not os.path.isabs(file):
-            # parse_file_path gives an expanded filepath if local, so replace it
-            # with that to ensure the referenced file path is always absolute
-            file = parsed_info["path"]
+            if profile is not None:
+                profile.merge(process_profile)
+            if usage is not None:
+                # Count the work done in the process against the budget here too
+                charge_usage(*process_usage)
+            return data
+
+        # Get the serializer for the file type
+        serializer = get_serializer_from_type(
+            _type=determine_file_type(get_filename_suffix(string_path)),
+            _default=default_serializer,
+        )
+
+        pre_process = get_hook_pipeline("pre", "load", pre_process_hooks)
+        post_process = get_hook_pipeline("post", "load", post_process_hooks)
+
+        parsed_info = parse_file_path(string_path)
+
+        if parsed_info["is_local"]:
+            if not os.path.isabs(file):
+                # parse_file_path gives an expanded filepath if local, so replace it
+                # with that to ensure the referenced file path is always absolute
+                file = parsed_info["path"]
+
+        # Read the file
+        with span("manifest.read", path=string_path) as read:
+            raw_data = await read_from_file(string_path, **kwargs)
+
+            if read is not None:
+                read.set_attribute("bytes", len(raw_data))
+
+        # Set the current file context variable to have a reference of the current file
+        # being worked on in the hooks
+        token = current_file.set(string_path)
+
+        try:
+            # Pre-process the file contents
+            with span("manifest.pre_hooks", path=string_path):
+                raw_data = await pre_process(raw_data)
+
+            # Deserialize the file contents
+            with span("manifest.deserialize", path=string_path):
+                data = serializer.loads(raw_data)
+
+            # Handle empty files
+            if not data:
+                data = {}
+
+            # Handle files with different root types
+            if not isinstance(data, dict):
+                data = {root_alias: data}
+
+            # Post-process the file contents, sharing any documents referenced
+            # and pure operation results for the duration of the load
+            with (
+                cache_documents(),
+                cache_operations(),
+                span("manifest.post_hooks", path=string_path),
+            ):
+                data = await post_process(data)
+        finally:
+            # Reset the current file context variable
+            current_file.reset(token)
+
+        return data
+
+
+def _load_in_process(
+    deferred: bool,
+    budget: tuple[ExpressionBudget, int, int, float | None] | None,
+    depth: int,
+    profile: bool,
+    **kwargs,
+) -> tuple[Any, BuildProfile | None, tuple[int, int]]:
+    # Entry point of a load in a worker process, where the context of the parent's
+    # build has to be recreated, continuing its budget from the work it has done so far
+    async def _():
+        usage = BudgetUsage(*budget) if budget is not None else None
+        start = (usage.operations, usage.bytes) if usage is not None else (0, 0)
+
+        with (
+            defer_expressions() if deferred else nullcontext(),
+            expression_budget(usage=usage) if usage is not None else nullcontext(),
+            at_expression_depth(depth),
+            profile_build() if profile else nullcontext() as process_profile,
+        ):
+            data = await load_from_file(**kwargs)
+
+        used = (
+            (usage.operations - start[0], usage.bytes - start[1])
+            if usage is not None
+            else (0, 0)
+        )
+        return data, process_profile, used
+
+    return asyncio.run(_())
+
+
+async def load_from_file_cached(file: str | Path) -> Any:
+    """
+    Load a file at most once within the active document cache, keyed by its absolute path.
+    Concurrent loads of the same file share a single in-flight load. Without an active
+    cache this is the same as calling `load_from_file`.
 
-    # Read the file
-    raw_data = await read_from_file(string_path, **kwargs)
-    # Set the current file context variable to have a reference of the current file
-    # being worked on in the hooks
-    token = current_file.set(string_path)
+    :param file: The path to the file to be parsed.
+    :type file: str
+    :return: The parsed data from the file.
+    :rtype: Any
+    :raises ValueError: If the file references itself through a chain of loads.
+    """
+    cache = document_cache.get()
 
-    try:
-        # Pre-process the file contents
-        for pre_hook in pre_process_hooks:
-            raw_data = await execute_hook(pre_hook, raw_data)
+    if cache is None:
+        return await load_from_file(file)
 
-        # Deserialize the file contents
-        data = serializer.loads(raw_data)
+    parsed_info = parse_file_path(str(file))
+    protocol = parsed_info["protocol"]
+    if isinstance(protocol, tuple):
+        protocol = protocol[0]
+    key = f"{protocol}://{parsed_info['path']}"
 
-        # Handle empty files
-        if not data:
-            data = {}
+    current = loading_document.get()
+    waits = document_waits.get()
 
-        # Handle files with different root types
-        if not isinstance(data, dict):
-            data = {root_alias: data}
+    if current is not None:
+        # Waiting on a load which is itself waiting on the current one would never finish
+        if cycle := _find_wait_path(waits, key, current):
+            raise ValueError("Circular $ref detected: " + " -> ".join([current] + cycle))
+        waits.setdefault(current, set()).add(key)
 
-        # Post-process the file contents
-        for post_hook in post_process_hooks:
-            data = await execute_hook(post_hook, data)
+    async def _load() -> Any:
+        # The task runs in a copy of the current context, so this only affects its own loads
+        loading_document.set(key)
+        return await load_from_file(file)
+
+    if key not in cache:
+        cache[key] = asyncio.ensure_future(_load())
+
+    try:
+        # Shield the shared load so a cancelled caller doesn't cancel it for the others
+        return await asyncio.shield(cache[key])
     finally:
-        # Reset the current file context variable
-        current_file.reset(token)
+        if current is not None:
+            waits[current].discard(key)
+
+
+def _find_wait_path(waits: dict[str, set[str]], start: str, target: str) -> list[str]:
+    """
+    Find a path from `start` to `target` through the documents each load is waiting on,
+    or an empty list if there is none.
+    """
+    stack = [[start]]
+    seen = set()
 
-    return data
+    while stack:
+        path = stack.pop()
+        if path[-1] == target:
+            return path
+        if path[-1] in seen:
+            continue
+        seen.add(path[-1])
+        stack.extend(path + [next_key] for next_key in waits.get(path[-1], ()))
+
+    return []
+
+
+async def load_files(
+    files: list[str | Path],
+    pre_process_hooks: list[Callable] | None = None,
+    post_process_hooks: list[Callable] | None = None,
+    process_threshold: int | None = None,
+    **kwargs,
+) -> list[dict]:
+    """
+    Load multiple files by calling `load_from_file()` on each one concurrently and
+    returning the data of each file without merging them.
+
+    :param files: A list of file paths to be loaded.
+    :type files: list[str]
+    :param process_threshold: The file size in bytes from which to load a file in the
+    process pool, see `load_from_file()`.
+    :type process_threshold: int | None
+    :return: The data of each file, in the order given.
+    :rtype: list[dict[str, Any]]
+    """
+    with cache_documents(), cache_operations():
+        return list(
+            await asyncio.gather(
+                *[
+                    load_from_file(
+                        file=file,
+                        pre_process_hooks=pre_process_hooks,
+                        post_process_hooks=post_process_hooks,
+                        process_threshold=process_threshold,
+                        **kwargs,
+                    )
+                    for file in files
+                ]
+            )
+        )
 
 
 async def parse_files(
     files: list[str | Path],
     pre_process_hooks: list[Callable] | None = None,
     post_process_hooks: list[Callable] | None = None,
+    process_threshold: int | None = None,
+    list_keys: dict[str, str] | None = None,
     **kwargs,
 ) -> dict:
     """
-    Parse multiple files by calling `parse_file()` on each one and returning the merged
-    dictionary.
+    Parse multiple files by calling `load_from_file()` on each one concurrently and
+    returning the merged dictionary. The files are merged in the order given.
 
     :param files: A list of file paths to be parsed.
     :type files: list[str]
+    :param process_threshold: The file size in bytes from which to load a file in the
+    process pool, see `load_from_file()`.
+    :type process_threshold: int | None
+    :param list_keys: The key field to merge the records of the list at each top-level
+    key by, see `merge_dicts_flat()`.
+    :type list_keys: dict[str, str] | None
     :return: A dictionary containing the parsed data from all of the files.
     :rtype: dict[str, Any]
     """
     return merge_dicts_flat(
-        *[
-            await load_from_file(
-                file=file,
-                pre_process_hooks=pre_process_hooks,
-                post_process_hooks=post_process_hooks,
-                **kwargs,
-            )
-            for file in files
-        ]
+        *await load_files(
+            files=files,
+            pre_process_hooks=pre_process_hooks,
+            post_process_hooks=post_process_hooks,
+            process_threshold=process_threshold,
+            **kwargs,
+        ),
+        list_keys=list_keys,
     )
 
 
-def parse_env_vars(env_vars: dict[str, Any], prefix: str, delimiter: str = "__") -> dict:
+def get_env_var_paths(env_vars: dict[str, Any], prefix: str, delimiter: str = "__") -> dict:
+    """
+    Get the dot path each environment variable starting with the prefix is parsed to
+    by `parse_env_vars()`.
+
+    :param env_vars: A dictionary containing environment variables.
+    :type env_vars: dict[str, Any]
+    :param prefix: A prefix that identifies which environment variables to parse.
+    :type prefix: str
+    :param delimiter: A delimiter used in the keys of the environment variables. Defaults to "__".
+    :type delimiter: str
+    :return: A dictionary of dot paths to the names of the environment variables.
+    :rtype: dict[str, str]
+    """
+    return {
+        # Remove the beginning prefix and delimiter, convert to lowercase and
+        # replace any delimiters with dots as `parse_env_vars()` does
+        key.replace(prefix + delimiter, "").lower().replace(delimiter, "."): key
+        for key in env_vars
+        # Only parse environment variables that start with the prefix
+        if key.startswith(prefix)
+    }
+
+
+def parse_env_vars(
+    env_vars: dict[str, Any],
+    prefix: str,
+    delimiter: str = "__",
+    model: type[BaseModel] | None = None,
+) -> dict:
     """
     Parse environment variables by converting them into a list of strings in the format "key=value",
     filtering out any keys that do not start with the specified prefix, and then calling
@@ -315,6 +614,9 @@ def parse_env_vars(env_vars: dict[str, Any], prefix: str, delimiter: str = "__")
     :type prefix: str
     :param delimiter: A delimiter used in the keys of the environment variables. Defaults to "__".
     :type delimiter: str
+    :param model: The model to take the types to coerce the values to from, see
+    `parse_key_values()`.
+    :type model: type[BaseModel] | None
     :return: The parsed environment variables as a dictionary.
     :rtype: dict[str, Any]
     """
@@ -331,6 +633,7 @@ def parse_env_vars(env_vars: dict[str, Any], prefix: str, delimiter: str = "__")
             if key.startswith(prefix)
         ],
         coerce=True,
+        model=model,
     )
 
 
@@ -349,7 +652,9 @@ def parse_key_value(key_value: str, coerce: bool = False) -> dict:
     return set_by_dot_path({}, k, v if not coerce else coerce_to_basic_types(v))
 
 
-def parse_key_values(key_values: list[str], coerce: bool = False) -> dict:
+def parse_key_values(
+    key_values: list[str], coerce: bool = False, model: type[BaseModel] | None = None
+) -> dict:
     """
     Parse a list of dot-delimited key value strings and return a nested dictionary.
 
@@ -361,6 +666,10 @@ def parse_key_values(key_values: list[str], coerce: bool = False) -> dict:
     :type key_values: List[str]
     :param coerce: Whether to coerce the values to basic types. Defaults to False.
     :type coerce: bool
+    :param model: The model to take the types to coerce the values to from, rather than
+    guessing them. Values of keys the model doesn't define a basic type for are still
+    guessed.
+    :type model: type[BaseModel] | None
     :returns: A nested dictionary containing the parsed key-value pairs.
     :rtype: dict
 
@@ -369,4 +678,17 @@ def parse_key_values(key_values: list[str], coerce: bool = False) -> dict:
         >>> parse_key_values(kvs)
         {'a': {'b': {'c': '1', 'd': '2'}, 'e': '3'}}
     """
-    return merge_dicts(*[parse_key_value(key_value, coerce=coerce) for key_value in key_values])
+    parsed = []
+
+    # Each key-value is merged into the ones before it rather than set in place, so a
+    # later key-value replaces what it conflicts with and lists are merged by position
+    for key_value in key_values:
+        k, v = key_value.split("=", 1)
+        value: Any = v
+
+        if coerce:
+            value = coerce_to_basic_types(v, get_field_type(model, k) if model else None)
+
+        parsed.append(compile_dot_path(k).set({}, value))
+
+    return merge_dicts(*parsed)
@@ -0,0 +1,60 @@
+from typing import Any, Literal
+
+from manifest.utils import compile_dot_path
+
+
+PATCH_OPERATIONS = ("set", "unset", "merge")
+
+
+class PatchError(ValueError):
+    """
+    Raised by `Manifest.apply_patch` when any of the operations of a patch fail, in
+    which case none of them are applied.
+
+    :param errors: The error messages of each failed operation, by its index in the patch.
+    :type errors: dict[int, list[str]]
+    """
+    def __init__(self, errors: dict[int, list[str]]) -> None:
+        self.errors = errors
+        super().__init__(
+            "Failed to apply patch:\n" + "\n".join(
+                f"  operation {index}: {message}"
+                for index, messages in sorted(errors.items())
+                for message in messages
+            )
+        )
+
+
+def parse_patch_operation(
+    operation: dict[str, Any],
+) -> tuple[Literal["set", "unset", "merge"], tuple, Any]:
+    """
+    Parse an operation of a patch, a dict such as `{"op": "set", "path": "a.b", "value": 1}`.
+    A `set` operation sets the value at the path, `unset` removes it, and `merge` merges
+    the value into the value at the path as `merge_dicts` does.
+
+    :param operation: The operation.
+    :type operation: dict[str, Any]
+    :return: The kind of operation, the parts of its dot path and its value
+    :rtype: tuple[str, tuple, Any]
+    :raises ValueError: If the operation isn't valid.
+    """
+    if not isinstance(operation, dict):
+        raise ValueError(f"Operation must be a dict, not {type(operation).__name__}")
+
+    kind = operation.get("op")
+    path = operation.get("path")
+
+    if kind not in PATCH_OPERATIONS:
+        raise ValueError(f"Operation must be one of {', '.join(PATCH_OPERATIONS)}, not `{kind}`")
+    if not isinstance(path, str) or not path:
+        raise ValueError("Operation must have a non-empty `path`")
+    if kind != "unset" and "value" not in operation:
+        raise ValueError(f"A `{kind}` operation must have a `value`")
+
+    parts = compile_dot_path(path).parts
+
+    if not isinstance(parts[0], str) or not parts[0]:
+        raise ValueError(f"Path `{path}` must start with a key")
+
+    return kind, parts, operation.get("value")
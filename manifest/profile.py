@@ -0,0 +1,523 @@
+import heapq
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Sequence
+
+from manifest.tracing import Span, SpanListener, listen
+
+
+class Timing:
+    """
+    The number of times something ran and how long it took.
+    """
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def __repr__(self) -> str:
+        return f"Timing(count={self.count}, total={self.total:.6f}, max={self.max:.6f})"
+
+    def add(self, duration: float) -> None:
+        """
+        Record a single run.
+
+        :param duration: The duration of the run in seconds.
+        :type duration: float
+        """
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def merge(self, other: "Timing") -> None:
+        """
+        Add the runs recorded by another Timing.
+
+        :param other: The other Timing.
+        :type other: Timing
+        """
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"count": self.count, "total": self.total, "max": self.max}
+
+
+class BuildProfile:
+    """
+    A breakdown of where the time went while building a Manifest or loading files,
+    filled in from the spans traced within `profile_build` or by passing it to
+    `Manifest.build`.
+
+    The times of work done concurrently, such as the stages of files loaded at the
+    same time, are summed, so they can add up to more than the total.
+
+    :param max_expressions: The number of slowest expressions to keep.
+    :type max_expressions: int
+    """
+    def __init__(self, max_expressions: int = 10) -> None:
+        self.max_expressions = max_expressions
+        self.total = 0.0
+        self.stages: dict[str, Timing] = {}
+        self.files: dict[str, dict[str, Timing]] = {}
+        self.bytes_read: dict[str, int] = {}
+        self.hooks: dict[str, Timing] = {}
+        self.operations: dict[str, Timing] = {}
+        self._expressions: list[tuple[float, int, str]] = []
+
+    def __str__(self) -> str:
+        return self.format_table()
+
+    def record_stage(self, stage: str, duration: float, file: str | None = None) -> None:
+        """
+        Record a run of a stage, optionally for a single file.
+
+        :param stage: The name of the stage.
+        :type stage: str
+        :param duration: The duration in seconds.
+        :type duration: float
+        :param file: The file the stage ran for, if any.
+        :type file: str | None
+        """
+        self.stages.setdefault(stage, Timing()).add(duration)
+
+        if file is not None:
+            self.files.setdefault(file, {}).setdefault(stage, Timing()).add(duration)
+
+    def record_bytes(self, file: str, size: int) -> None:
+        """
+        Record the number of bytes read from a file.
+        """
+        self.bytes_read[file] = self.bytes_read.get(file, 0) + size
+
+    def record_hook(self, hook: str, duration: float) -> None:
+        """
+        Record a call of a hook.
+        """
+        self.hooks.setdefault(hook, Timing()).add(duration)
+
+    def record_operation(self, operation: str, duration: float) -> None:
+        """
+        Record an execution of an operation.
+        """
+        self.operations.setdefault(operation, Timing()).add(duration)
+
+    def record_expression(self, expression: str, duration: float) -> None:
+        """
+        Record the resolution of an expression, keeping it if it's among the slowest.
+        """
+        item = (duration, len(self._expressions), expression)
+
+        if len(self._expressions) < self.max_expressions:
+            heapq.heappush(self._expressions, item)
+        elif self._expressions and duration > self._expressions[0][0]:
+            heapq.heapreplace(self._expressions, item)
+
+    def merge(self, other: "BuildProfile") -> None:
+        """
+        Add everything recorded by another profile, such as one filled in by a worker
+        process, except for its total.
+
+        :param other: The other profile.
+        :type other: BuildProfile
+        """
+        for timings, other_timings in (
+            (self.stages, other.stages),
+            (self.hooks, other.hooks),
+            (self.operations, other.operations),
+        ):
+            _merge_timings(timings, other_timings)
+
+        for file, stages in other.files.items():
+            _merge_timings(self.files.setdefault(file, {}), stages)
+
+        for file, size in other.bytes_read.items():
+            self.record_bytes(file, size)
+
+        for duration, _, expression in other._expressions:
+            self.record_expression(expression, duration)
+
+    @property
+    def slowest_expressions(self) -> list[tuple[str, float]]:
+        """
+        The slowest expressions resolved and their durations, slowest first.
+        """
+        return [
+            (expression, duration)
+            for duration, _, expression in sorted(self._expressions, reverse=True)
+        ]
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Get the profile as a JSON serializable dictionary.
+
+        :return: The profile.
+        :rtype: dict[str, Any]
+        """
+        return {
+            "total": self.total,
+            "stages": {name: timing.to_dict() for name, timing in self.stages.items()},
+            "files": {
+                file: {
+                    "bytes": self.bytes_read.get(file, 0),
+                    "stages": {name: timing.to_dict() for name, timing in stages.items()},
+                }
+                for file, stages in self.files.items()
+            },
+            "hooks": {name: timing.to_dict() for name, timing in self.hooks.items()},
+            "operations": {name: timing.to_dict() for name, timing in self.operations.items()},
+            "slowest_expressions": [
+                {"expression": expression, "duration": duration}
+                for expression, duration in self.slowest_expressions
+            ],
+        }
+
+    def to_json(self, **kwargs) -> str:
+        """
+        Get the profile as a JSON string.
+
+        :param kwargs: Additional keyword arguments to pass to `json.dumps`.
+        :return: The profile.
+        :rtype: str
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def format_table(self) -> str:
+        """
+        Format the profile as a plain text table.
+
+        :return: The table.
+        :rtype: str
+        """
+        rows = [("", "count", "total (ms)", "max (ms)")]
+
+        def _section(title: str, timings: dict[str, Timing]) -> None:
+            if timings:
+                rows.append((title, "", "", ""))
+                rows.extend(
+                    (
+                        f"  {name}",
+                        str(timing.count),
+                        f"{timing.total * 1000:.3f}",
+                        f"{timing.max * 1000:.3f}",
+                    )
+                    for name, timing in sorted(
+                        timings.items(), key=lambda item: item[1].total, reverse=True
+                    )
+                )
+
+        _section("stages", self.stages)
+        for file, stages in self.files.items():
+            _section(f"{file} ({self.bytes_read.get(file, 0)} bytes)", stages)
+        _section("hooks", self.hooks)
+        _section("operations", self.operations)
+
+        if self._expressions:
+            rows.append(("slowest expressions", "", "", ""))
+            rows.extend(
+                (f"  {expression}", "1", f"{duration * 1000:.3f}", f"{duration * 1000:.3f}")
+                for expression, duration in self.slowest_expressions
+            )
+
+        rows.append(("total", "", f"{self.total * 1000:.3f}", ""))
+        return _format_rows(rows)
+
+
+def _format_rows(rows: Sequence[tuple[str, ...]]) -> str:
+    # Left align the first column and right align the rest
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+
+    return "\n".join(
+        row[0].ljust(widths[0])
+        + "".join(cell.rjust(width + 2) for cell, width in zip(row[1:], widths[1:], strict=True))
+        for row in rows
+    )
+
+
+def _merge_timings(timings: dict[str, Timing], other: dict[str, Timing]) -> None:
+    for name, timing in other.items():
+        timings.setdefault(name, Timing()).merge(timing)
+
+
+_profile: ContextVar[BuildProfile | None] = ContextVar("build_profile", default=None)
+
+
+class ProfileListener(SpanListener):
+    """
+    Records the spans it receives in a BuildProfile.
+
+    :param profile: The profile to record in.
+    :type profile: BuildProfile
+    """
+    # Spans that contain whole stages, which would be counted twice
+    ignored = ("build", "load", "dump")
+
+    def __init__(self, profile: BuildProfile) -> None:
+        self.profile = profile
+
+    def on_end(self, span: Span) -> None:
+        name = span.name.removeprefix("manifest.")
+        attributes = span.attributes
+
+        if name == "hook":
+            self.profile.record_hook(attributes["hook"], span.duration)
+        elif name == "operation":
+            self.profile.record_operation(attributes["operation"], span.duration)
+        elif name == "expression":
+            self.profile.record_expression(attributes["expression"], span.duration)
+        elif name not in self.ignored:
+            self.profile.record_stage(name, span.duration, attributes.get("path"))
+
+            if name == "read":
+                self.profile.record_bytes(attributes["path"], attributes.get("bytes", 0))
+
+
+@contextmanager
+def profile_build(profile: BuildProfile | None = None):
+    """
+    Context manager that profiles the Manifest builds and file loads in the block.
+
+    :param profile: The profile to fill in. Defaults to a new BuildProfile.
+    :type profile: BuildProfile, optional
+    :yields: The profile
+    """
+    profile = profile if profile is not None else BuildProfile()
+    token = _profile.set(profile)
+    start = time.perf_counter()
+
+    try:
+        with listen(ProfileListener(profile)):
+            yield profile
+    finally:
+        profile.total += time.perf_counter() - start
+        _profile.reset(token)
+
+
+def get_profile() -> BuildProfile | None:
+    """
+    Get the active profile, if any.
+
+    :returns: The active profile
+    """
+    return _profile.get()
+
+
+class MemoryUsage:
+    """
+    The memory allocated by something each time it ran, in bytes. The peak is the most
+    allocated at once above what was allocated when it started, and the retained memory
+    is what was still allocated when it ended.
+    """
+    def __init__(self) -> None:
+        self.count = 0
+        self.peak = 0
+        self.retained = 0
+
+    def __repr__(self) -> str:
+        return f"MemoryUsage(count={self.count}, peak={self.peak}, retained={self.retained})"
+
+    def add(self, peak: int, retained: int) -> None:
+        """
+        Record a single run.
+
+        :param peak: The peak memory allocated during the run.
+        :type peak: int
+        :param retained: The memory still allocated at the end of the run.
+        :type retained: int
+        """
+        self.count += 1
+        self.peak = max(self.peak, peak)
+        self.retained += retained
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"count": self.count, "peak": self.peak, "retained": self.retained}
+
+
+class MemoryProfile:
+    """
+    A breakdown of the memory allocated while building a Manifest or loading files,
+    measured with `tracemalloc` and filled in within `profile_memory` or by passing it
+    to `Manifest.build`.
+
+    Allocations are traced per process, so when files are loaded concurrently the
+    usage of each file includes allocations made by the others at the same time.
+    Files loaded in a worker process are not measured.
+    """
+    def __init__(self) -> None:
+        self.peak = 0
+        self.retained = 0
+        self.stages: dict[str, MemoryUsage] = {}
+        self.files: dict[str, dict[str, MemoryUsage]] = {}
+        self.hooks: dict[str, MemoryUsage] = {}
+
+    def __str__(self) -> str:
+        return self.format_table()
+
+    def record(
+        self, kind: str, name: str, peak: int, retained: int, file: str | None = None
+    ) -> None:
+        """
+        Record the memory allocated by a run of a stage or hook.
+
+        :param kind: Either `stage` or `hook`.
+        :type kind: str
+        :param name: The name of the stage or hook.
+        :type name: str
+        :param peak: The peak memory allocated during the run.
+        :type peak: int
+        :param retained: The memory still allocated at the end of the run.
+        :type retained: int
+        :param file: The file the stage ran for, if any.
+        :type file: str | None
+        """
+        usages = self.hooks if kind == "hook" else self.stages
+        usages.setdefault(name, MemoryUsage()).add(peak, retained)
+
+        if kind == "stage" and file is not None:
+            self.files.setdefault(file, {}).setdefault(name, MemoryUsage()).add(peak, retained)
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Get the profile as a JSON serializable dictionary.
+
+        :return: The profile.
+        :rtype: dict[str, Any]
+        """
+        return {
+            "peak": self.peak,
+            "retained": self.retained,
+            "stages": {name: usage.to_dict() for name, usage in self.stages.items()},
+            "files": {
+                file: {name: usage.to_dict() for name, usage in stages.items()}
+                for file, stages in self.files.items()
+            },
+            "hooks": {name: usage.to_dict() for name, usage in self.hooks.items()},
+        }
+
+    def to_json(self, **kwargs) -> str:
+        """
+        Get the profile as a JSON string.
+
+        :param kwargs: Additional keyword arguments to pass to `json.dumps`.
+        :return: The profile.
+        :rtype: str
+        """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def format_table(self) -> str:
+        """
+        Format the profile as a plain text table.
+
+        :return: The table.
+        :rtype: str
+        """
+        rows = [("", "count", "peak (KiB)", "retained (KiB)")]
+
+        def _section(title: str, usages: dict[str, MemoryUsage]) -> None:
+            if usages:
+                rows.append((title, "", "", ""))
+                rows.extend(
+                    (
+                        f"  {name}",
+                        str(usage.count),
+                        f"{usage.peak / 1024:.1f}",
+                        f"{usage.retained / 1024:.1f}",
+                    )
+                    for name, usage in sorted(
+                        usages.items(), key=lambda item: item[1].peak, reverse=True
+                    )
+                )
+
+        _section("stages", self.stages)
+        for file, stages in self.files.items():
+            _section(file, stages)
+        _section("hooks", self.hooks)
+
+        rows.append(("total", "", f"{self.peak / 1024:.1f}", f"{self.retained / 1024:.1f}"))
+        return _format_rows(rows)
+
+
+class MemoryListener(SpanListener):
+    """
+    Records the memory allocated during the stage and hook spans it receives in a
+    MemoryProfile. `tracemalloc` must be tracing.
+
+    :param profile: The profile to record in.
+    :type profile: MemoryProfile
+    """
+    ignored = ("build", "load", "dump", "operation", "expression")
+
+    def __init__(self, profile: MemoryProfile) -> None:
+        self.profile = profile
+        # The allocated memory when each active span started, and its peak so far
+        self._active: dict[int, list[int]] = {}
+
+    def on_start(self, span: Span) -> None:
+        if span.name.removeprefix("manifest.") in self.ignored:
+            return
+
+        # tracemalloc only keeps a single peak, so save it for the active spans before
+        # resetting it to measure this one
+        _, peak = tracemalloc.get_traced_memory()
+        for usage in self._active.values():
+            usage[1] = max(usage[1], peak)
+
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        self._active[id(span)] = [current, current]
+
+    def on_end(self, span: Span) -> None:
+        usage = self._active.pop(id(span), None)
+        if usage is None:
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+        name = span.name.removeprefix("manifest.")
+        kind, name = ("hook", span.attributes["hook"]) if name == "hook" else ("stage", name)
+
+        self.profile.record(
+            kind,
+            name,
+            max(usage[1], peak) - usage[0],
+            current - usage[0],
+            span.attributes.get("path"),
+        )
+
+
+@contextmanager
+def profile_memory(profile: MemoryProfile | None = None):
+    """
+    Context manager that measures the memory allocated by the Manifest builds and file
+    loads in the block. Starts `tracemalloc` if it isn't already tracing, and stops it
+    again at the end of the block.
+
+    :param profile: The profile to fill in. Defaults to a new MemoryProfile.
+    :type profile: MemoryProfile, optional
+    :yields: The profile
+    """
+    profile = profile if profile is not None else MemoryProfile()
+    started = not tracemalloc.is_tracing()
+
+    if started:
+        tracemalloc.start()
+
+    tracemalloc.reset_peak()
+    start, _ = tracemalloc.get_traced_memory()
+    listener = MemoryListener(profile)
+    # Track the block like a span so its peak is saved when the spans in it reset the peak
+    listener._active[0] = [start, start]
+
+    try:
+        with listen(listener):
+            yield profile
+    finally:
+        current, peak = tracemalloc.get_traced_memory()
+        profile.peak = max(profile.peak, max(listener._active.pop(0)[1], peak) - start)
+        profile.retained += current - start
+
+        if started:
+            tracemalloc.stop()
@@ -1,22 +1,36 @@
-from typing import Any
+from functools import lru_cache
+from types import UnionType
+from typing import Annotated, Any, TypeVar, Union, get_args, get_origin
 from pydantic.version import VERSION
-from pydantic import BaseModel, Field, validator, ConfigDict
+from pydantic import BaseModel, Field, validator, ConfigDict, PrivateAttr, ValidationError
+
+from manifest.utils import compile_dot_path
 
 
 __all__ = (
     "IS_V1",
     "BaseModel",
     "Field",
+    "PrivateAttr",
     "validator",
     "ConfigDict",
+    "ValidationError",
     "GenericModel",
     "model_dump",
     "model_copy",
     "get_model_extras",
+    "get_field_names_by_alias",
+    "is_required_field",
+    "get_extra_behavior",
+    "set_field",
+    "unset_field",
+    "get_field_type",
 )
 
 IS_V1 = VERSION.startswith("1.")
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
 
 if IS_V1:
     from pydantic.generics import GenericModel
@@ -58,11 +72,11 @@ def model_dump(
 
 
 def model_copy(
-    model: BaseModel,
+    model: ModelT,
     *,
     update: dict[str, Any] | None = None,
     deep: bool = False,
-) -> BaseModel:
+) -> ModelT:
     if IS_V1:
         return model.copy(update=update, deep=deep)
     else:
@@ -87,8 +101,122 @@ def get_set_fields(model: BaseModel) -> set[str]:
         return model.model_fields_set
 
 
-def get_fields(model: BaseModel) -> dict[str, Any]:
+def get_fields(model: type[BaseModel] | BaseModel) -> dict[str, Any]:
+    cls: type[BaseModel] = model if isinstance(model, type) else type(model)
+    if IS_V1:
+        return cls.__fields__  # type: ignore
+    else:
+        return cls.model_fields
+
+
+@lru_cache(maxsize=1024)
+def get_field_names_by_alias(model: type[BaseModel]) -> dict[str, str]:
+    names = {}
+    for name, field in get_fields(model).items():
+        names[name] = name
+        if field.alias:
+            names[field.alias] = name
+    return names
+
+
+def is_required_field(model: type[BaseModel], name: str) -> bool:
+    field = get_fields(model).get(name)
+    if field is None:
+        return False
+    if IS_V1:
+        return bool(field.required)
+    else:
+        return field.is_required()
+
+
+def get_extra_behavior(model: type[BaseModel]) -> str:
+    # Get how a model treats extra fields: "allow", "ignore" or "forbid"
+    if IS_V1:
+        extra = model.__config__.extra  # type: ignore
+        return getattr(extra, "value", extra)
+    else:
+        return model.model_config.get("extra") or "ignore"
+
+
+def set_field(model: BaseModel, name: str, value: Any) -> None:
+    # Validate and set a single field without revalidating the rest of the model
     if IS_V1:
-        return model.__fields__
+        field = type(model).__fields__.get(name)  # type: ignore
+        if field is not None:
+            value, errors = field.validate(value, model.__dict__, loc=name, cls=type(model))
+            if errors:
+                raise ValidationError([errors], type(model))  # type: ignore
+            model.__fields_set__.add(name)
+        model.__dict__[name] = value
     else:
-        return model.model_fields
+        model.__pydantic_validator__.validate_assignment(model, name, value)
+
+
+def unset_field(model: BaseModel, name: str) -> None:
+    # Reset a single field to its default, or remove an extra, without revalidating
+    # the rest of the model
+    field = get_fields(type(model)).get(name)
+
+    if field is None:
+        if IS_V1:
+            model.__dict__.pop(name, None)
+        elif model.__pydantic_extra__ and name in model.__pydantic_extra__:
+            extras = {k: v for k, v in model.__pydantic_extra__.items() if k != name}
+            object.__setattr__(model, "__pydantic_extra__", extras)
+        return
+
+    if is_required_field(type(model), name):
+        raise ValueError(f"Field `{name}` of {type(model).__name__} is required")
+
+    if IS_V1:
+        model.__dict__[name] = field.get_default()
+        model.__fields_set__.discard(name)
+    else:
+        model.__dict__[name] = field.get_default(call_default_factory=True)
+        object.__setattr__(
+            model, "__pydantic_fields_set__", model.__pydantic_fields_set__ - {name}
+        )
+
+
+@lru_cache(maxsize=4096)
+def get_field_type(model: type[BaseModel], dot_path: str) -> Any:
+    # Get the type hint of the value at a dot path in a model, or None if it isn't known
+    hint: Any = model
+
+    for part in compile_dot_path(dot_path).parts:
+        hint = _unwrap_optional(hint)
+        origin = get_origin(hint)
+
+        if isinstance(hint, type) and issubclass(hint, BaseModel) and isinstance(part, str):
+            name = get_field_names_by_alias(hint).get(part, part)
+            field = get_fields(hint).get(name)
+            if field is None:
+                return None
+            hint = field.outer_type_ if IS_V1 else field.annotation
+        elif origin in (list, tuple, set, frozenset) and not isinstance(part, str):
+            args = get_args(hint)
+            if origin is tuple and args and args[-1] is not Ellipsis:
+                # Fixed length tuples have a type for each position
+                in_range = isinstance(part, int) and -len(args) <= part < len(args)
+                hint = args[part] if in_range else None
+            else:
+                hint = args[0] if args else None
+        elif origin is dict and isinstance(part, str):
+            args = get_args(hint)
+            hint = args[1] if args else None
+        else:
+            return None
+
+    return hint
+
+
+def _unwrap_optional(hint: Any) -> Any:
+    origin = get_origin(hint)
+
+    if origin is Annotated:
+        return _unwrap_optional(get_args(hint)[0])
+    if origin is Union or origin is UnionType:
+        types = [arg for arg in get_args(hint) if arg is not type(None)]
+        if len(types) == 1:
+            return _unwrap_optional(types[0])
+    return hint
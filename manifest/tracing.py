@@ -0,0 +1,224 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+
+class Span:
+    """
+    A unit of work traced by `span`, such as loading a file or executing an operation.
+
+    :param name: The name of the span.
+    :type name: str
+    :param attributes: The attributes describing the work.
+    :type attributes: dict[str, Any]
+    :param parent: The span this span was started in, if any.
+    :type parent: Span | None
+    """
+    def __init__(
+        self, name: str, attributes: dict[str, Any], parent: "Span | None" = None
+    ) -> None:
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.error: BaseException | None = None
+
+    def __repr__(self) -> str:
+        return f"Span(name={self.name!r}, attributes={self.attributes!r})"
+
+    @property
+    def duration(self) -> float:
+        """
+        The duration of the span in seconds, or up until now if it hasn't ended.
+        """
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """
+        Set an attribute of the span.
+
+        :param key: The attribute name.
+        :type key: str
+        :param value: The attribute value.
+        :type value: Any
+        """
+        self.attributes[key] = value
+
+
+class SpanListener:
+    """
+    Receives the start and end of every span. Subclass it and register an instance
+    with `register_listener`, or for a block of code with `listen`.
+    """
+    def on_start(self, span: Span) -> None:
+        """
+        Called when a span starts.
+
+        :param span: The span.
+        :type span: Span
+        """
+
+    def on_end(self, span: Span) -> None:
+        """
+        Called when a span ends, with `error` set on the span if the work raised.
+
+        :param span: The span.
+        :type span: Span
+        """
+
+
+_LISTENERS: list[SpanListener] = []
+_scoped_listeners: ContextVar[tuple[SpanListener, ...]] = ContextVar(
+    "span_listeners", default=()
+)
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def register_listener(listener: SpanListener) -> None:
+    """
+    Register a listener to receive every span.
+
+    :param listener: The listener.
+    :type listener: SpanListener
+    """
+    _LISTENERS.append(listener)
+
+
+def unregister_listener(listener: SpanListener) -> None:
+    """
+    Unregister a listener.
+
+    :param listener: The listener.
+    :type listener: SpanListener
+    """
+    _LISTENERS.remove(listener)
+
+
+@contextmanager
+def listen(listener: SpanListener):
+    """
+    Context manager that has a listener receive the spans of the block only.
+
+    :param listener: The listener.
+    :type listener: SpanListener
+    :yields: The listener
+    """
+    token = _scoped_listeners.set(_scoped_listeners.get() + (listener,))
+
+    try:
+        yield listener
+    finally:
+        _scoped_listeners.reset(token)
+
+
+def get_listeners() -> list[SpanListener]:
+    """
+    Get the listeners receiving spans in the current context.
+
+    :returns: The registered listeners followed by those added with `listen`
+    """
+    return _LISTENERS + list(_scoped_listeners.get())
+
+
+def current_span() -> Span | None:
+    """
+    Get the innermost span in the current context, if any.
+
+    :returns: The current span
+    """
+    return _current_span.get()
+
+
+def set_span_attribute(key: str, value: Any) -> None:
+    """
+    Set an attribute of the current span, if any.
+
+    :param key: The attribute name.
+    :type key: str
+    :param value: The attribute value.
+    :type value: Any
+    """
+    active = _current_span.get()
+    if active is not None:
+        active.set_attribute(key, value)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Context manager that traces the block as a span, sent to the listeners when it
+    starts and ends. When there are no listeners no span is created.
+
+    :param name: The name of the span.
+    :type name: str
+    :param attributes: The attributes describing the work.
+    :yields: The span, or None if there are no listeners
+    """
+    listeners = get_listeners()
+
+    if not listeners:
+        yield None
+        return
+
+    active = Span(name, attributes, _current_span.get())
+    token = _current_span.set(active)
+
+    for listener in listeners:
+        listener.on_start(active)
+
+    try:
+        yield active
+    except BaseException as e:
+        active.error = e
+        raise
+    finally:
+        active.end = time.perf_counter()
+        _current_span.reset(token)
+
+        for listener in listeners:
+            listener.on_end(active)
+
+
+class OpenTelemetryListener(SpanListener):
+    """
+    Forwards spans to OpenTelemetry, nested under the span active when they start.
+    Requires the `opentelemetry-api` package.
+
+    :param tracer: The tracer to create spans with. Defaults to the tracer of the
+    global tracer provider.
+    :type tracer: opentelemetry.trace.Tracer, optional
+    """
+    def __init__(self, tracer: Any = None) -> None:
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryListener requires `opentelemetry-api` to be installed"
+            ) from e
+
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer("manifest")
+        self._spans: dict[int, Any] = {}
+
+    def on_start(self, span: Span) -> None:
+        parent = self._spans.get(id(span.parent)) if span.parent is not None else None
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+
+        self._spans[id(span)] = self._tracer.start_span(span.name, context=context)
+
+    def on_end(self, span: Span) -> None:
+        otel_span = self._spans.pop(id(span), None)
+        if otel_span is None:
+            return
+
+        for key, value in span.attributes.items():
+            if value is not None:
+                otel_span.set_attribute(f"manifest.{key}", value)
+
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR))
+
+        otel_span.end()
@@ -1,13 +1,18 @@
 import asyncio
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import contextmanager
-from functools import partial
+from contextvars import copy_context
+from functools import lru_cache, partial
 from pathlib import Path
-from typing import Any, Callable, Literal, Union
+from types import UnionType
+from typing import Annotated, Any, Callable, Coroutine, Literal, Union, get_args, get_origin
 
 from fsspec.core import url_to_fs
 
+from manifest.executor import get_executor
+
 
 class SentinelMeta(type):
     def __init__(cls, name, bases, dict):
@@ -43,95 +48,392 @@ def is_async_callable(f: Callable) -> bool:
     return iscoroutinefunction(f)
 
 
+def callable_name(func: Callable) -> str:
+    """
+    Get a readable name for a callable.
+
+    :param func: The callable
+    :returns: The qualified name of the callable, or its repr if it has none
+    """
+    return getattr(func, "__qualname__", None) or repr(func)
+
+
 async def run_in_thread(func: Callable, *args, **kwargs):
     """
-    Run a sync function in the default ThreadPool.
+    Run a sync function in the executor of the current context, see `get_executor`,
+    in a copy of the current context so context variables such as the current file
+    and span are visible to it.
 
     :param func: The callable to run
     :param *args: The args to pass to the callable
     :param **kwargs: The kwargs to pass to the callable
     :returns: The return value of the callable
     """
-    return await asyncio.get_running_loop().run_in_executor(None, partial(func, *args, **kwargs))
+    context = copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        get_executor(), partial(context.run, func, *args, **kwargs)
+    )
 
 
-def parse_dot_path(dot_path: str) -> list:
+_process_pool: ProcessPoolExecutor | None = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
     """
-    Parse a dot path into a list of keys and indices.
-    Handles dot notation and bracket notation for lists.
+    Get the shared ProcessPoolExecutor, creating it on first use.
+
+    :returns: The shared process pool
     """
-    path_parts = []
-    # Split by dots
-    parts = dot_path.split(".")
-    for part in parts:
-        # Find brackets in part
-        match = re.match(r"(.*?)\[(\d*)\]", part)
-        if match:
-            key, index = match.groups()
-            path_parts.append(key)
-            if index:
-                path_parts.append(int(index))
-            else:
-                path_parts.append(Sentinel)
-        else:
-            path_parts.append(part)
-    return path_parts
+    global _process_pool
 
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor()
+    return _process_pool
 
-def get_by_dot_path(data: dict, dot_path: str, default: Any = None) -> Any:
+
+async def run_in_process(func: Callable, *args, **kwargs):
     """
-    Get the value at the specified dot path.
+    Run a sync function in the shared ProcessPool. The callable and its
+    arguments must be picklable.
+
+    :param func: The callable to run
+    :param *args: The args to pass to the callable
+    :param **kwargs: The kwargs to pass to the callable
+    :returns: The return value of the callable
     """
-    assert isinstance(data, dict), "data must be a dictionary"
-    keys = parse_dot_path(dot_path)
+    return await asyncio.get_running_loop().run_in_executor(
+        get_process_pool(), partial(func, *args, **kwargs)
+    )
+
+
+def run_sync(func: Callable[[], Coroutine]) -> Any:
+    """
+    Run a coroutine function to completion from sync code. If an event loop is already
+    running in this thread, the coroutine runs on a new event loop in another thread,
+    in a copy of the current context, and this thread blocks until it completes.
+
+    :param func: The coroutine function to run
+    :returns: The return value of the coroutine
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(func())
+
+    context = copy_context()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(context.run, lambda: asyncio.run(func())).result()
+
+
+class Wildcard(metaclass=SentinelMeta): ...
+
+
+# Stands in for a value that isn't there, where None is a valid value
+class Missing(metaclass=SentinelMeta): ...
+
+
+_DOT_PATH_PART_REGEX = re.compile(r"([^\[]*)((?:\[(?:-?\d+|\*|)\])+)")
+_DOT_PATH_INDEX_REGEX = re.compile(r"\[(-?\d+|\*|)\]")
+
+
+class DotPath:
+    """
+    A dot path parsed into its keys and indices, such as `a.b[0].c`. An empty index `[]`
+    appends to a list, a negative index counts from the end of a list, and `[*]` matches
+    every item of a list.
+
+    Use `compile_dot_path` to get a DotPath, which caches them by string.
+
+    :param dot_path: The dot path.
+    :type dot_path: str
+    """
+    __slots__ = ("path", "parts")
+
+    def __init__(self, dot_path: str) -> None:
+        self.path = dot_path
+        self.parts: tuple = tuple(_parse_dot_path(dot_path))
+
+    def __repr__(self) -> str:
+        return f"DotPath({self.path!r})"
+
+    def get(self, data: dict | list, default: Any = None) -> Any:
+        """
+        Get the value at the path. With a wildcard, a list of the values at the rest of
+        the path for each item is returned.
+
+        :param data: The data to get the value from.
+        :type data: dict | list
+        :param default: The value to return if the path doesn't exist.
+        :type default: Any
+        :returns: The value at the path
+        """
+        return get_by_parts(data, self.parts, 0, default)
+
+    def exists(self, data: dict | list) -> bool:
+        """
+        Check if the path exists. With a wildcard, the rest of the path must exist for
+        every item of a non-empty list.
+
+        :param data: The data to check.
+        :type data: dict | list
+        :returns: Whether the path exists
+        """
+        return _path_exists(data, self.parts, 0)
+
+    def set(self, data: dict | list, value: Any) -> dict | list:
+        """
+        Set the value at the path in place, creating any missing containers along the way.
+        Lists are padded with `Sentinel` up to a positive index past their end.
+
+        :param data: The data to set the value in.
+        :type data: dict | list
+        :param value: The value to set.
+        :type value: Any
+        :returns: The data
+        :raises IndexError: If a negative index is out of range.
+        :raises ValueError: If the path goes through a value that isn't a dict or list.
+        """
+        set_by_parts(data, self.parts, 0, value)
+        return data
+
+    def unset(self, data: dict | list) -> dict | list:
+        """
+        Delete the value at the path in place, if it exists.
+
+        :param data: The data to delete the value from.
+        :type data: dict | list
+        :returns: The data
+        """
+        unset_by_parts(data, self.parts, 0)
+        return data
+
+
+@lru_cache(maxsize=4096)
+def compile_dot_path(dot_path: str) -> DotPath:
+    """
+    Get the DotPath of a dot path string, parsing it only the first time.
+
+    :param dot_path: The dot path.
+    :type dot_path: str
+    :returns: The compiled dot path
+    """
+    return DotPath(dot_path)
+
+
+def _parse_dot_path(dot_path: str) -> list:
+    parts: list = []
+
+    for part in dot_path.split("."):
+        match = _DOT_PATH_PART_REGEX.fullmatch(part)
+
+        if match is None:
+            parts.append(part)
+            continue
+
+        key, indices = match.groups()
+        parts.append(key)
+
+        for index in _DOT_PATH_INDEX_REGEX.findall(indices):
+            parts.append(Sentinel if not index else Wildcard if index == "*" else int(index))
+
+    return parts
+
+
+def get_by_parts(data: Any, parts: tuple, start: int, default: Any) -> Any:
+    """
+    Get the value at the parts of a parsed dot path, see `DotPath.get`.
+
+    :param data: The data to get the value from.
+    :type data: Any
+    :param parts: The parts of the dot path, see `DotPath.parts`.
+    :type parts: tuple
+    :param start: The position in the parts to start from, with data being the value
+    at the parts before it.
+    :type start: int
+    :param default: The value to return if the path doesn't exist.
+    :type default: Any
+    :returns: The value at the path
+    """
+    for position in range(start, len(parts)):
+        key = parts[position]
 
-    for key in keys:
         if isinstance(data, dict):
-            data = data.get(key, default)
-        elif isinstance(data, list) and isinstance(key, int):
-            data = data[key] if key < len(data) else default
-        elif key is Sentinel:
-            return default
+            if key not in data:
+                return default
+            data = data[key]
+        elif isinstance(data, list):
+            if key is Wildcard:
+                return [get_by_parts(item, parts, position + 1, default) for item in data]
+            if not isinstance(key, int) or not -len(data) <= key < len(data):
+                return default
+            data = data[key]
         else:
             return default
+
     return data
 
 
-def set_by_dot_path(data: dict, dot_path: str, value: Any) -> dict:
+def _path_exists(data: Any, parts: tuple, start: int) -> bool:
+    for position in range(start, len(parts)):
+        key = parts[position]
+
+        if isinstance(data, dict):
+            if key not in data:
+                return False
+            data = data[key]
+        elif isinstance(data, list):
+            if key is Wildcard:
+                return bool(data) and all(
+                    _path_exists(item, parts, position + 1) for item in data
+                )
+            if not isinstance(key, int) or not -len(data) <= key < len(data):
+                return False
+            data = data[key]
+        else:
+            return False
+
+    return True
+
+
+def _list_index(ref: list, key: int) -> int:
+    if key < 0:
+        if key < -len(ref):
+            raise IndexError(f"List index {key} out of range")
+    elif key >= len(ref):
+        ref.extend([Sentinel] * (key - len(ref) + 1))
+    return key
+
+
+def _child_container(ref: Any, key: Any, next_key: Any) -> Any:
+    # Get the value at key, creating the type of container the next key indexes if
+    # there's nothing there. Any other value is returned as is, so setting a path
+    # through it fails
+    if isinstance(ref, dict):
+        if key not in ref:
+            ref[key] = {} if isinstance(next_key, str) else []
+        return ref[key]
+
+    if isinstance(ref, list):
+        if key is Sentinel:
+            child: dict | list = {} if isinstance(next_key, str) else []
+            ref.append(child)
+            return child
+        if isinstance(key, int):
+            index = _list_index(ref, key)
+            if ref[index] is Sentinel:
+                ref[index] = {} if isinstance(next_key, str) else []
+            return ref[index]
+        raise ValueError(f"Cannot index a list with `{key}`")
+
+    raise ValueError(f"Unsupported type: {type(ref)}")
+
+
+def set_by_parts(data: Any, parts: tuple, start: int, value: Any) -> None:
     """
-    Set the value at the specified dot path.
+    Set the value at the parts of a parsed dot path in place, see `DotPath.set`.
+
+    :param data: The data to set the value in.
+    :type data: Any
+    :param parts: The parts of the dot path, see `DotPath.parts`.
+    :type parts: tuple
+    :param start: The position in the parts to start from, with data being the value
+    at the parts before it.
+    :type start: int
+    :param value: The value to set.
+    :type value: Any
+    :raises IndexError: If a negative index is out of range.
+    :raises ValueError: If the path goes through a value that isn't a dict or list.
     """
-    assert isinstance(data, dict), "data must be a dictionary"
-    keys = parse_dot_path(dot_path)
-
-    def set_value(ref: dict | list, key: str | int | Sentinel, value: Any) -> None:
-        if isinstance(ref, dict):
-            ref[key] = value
-        elif isinstance(ref, list):
-            if isinstance(key, int):
-                while len(ref) <= key:
-                    ref.append(Sentinel)
-                ref[key] = value
-            elif key is Sentinel:
-                ref.append(value)
+    ref = data
+
+    for position in range(start, len(parts) - 1):
+        key = parts[position]
+
+        if key is Wildcard and isinstance(ref, list):
+            for item in ref:
+                set_by_parts(item, parts, position + 1, value)
+            return
+
+        ref = _child_container(ref, key, parts[position + 1])
 
+    key = parts[-1]
+
+    if isinstance(ref, dict):
+        ref[key] = value
+    elif isinstance(ref, list):
+        if key is Sentinel:
+            ref.append(value)
+        elif key is Wildcard:
+            ref[:] = [value] * len(ref)
+        elif isinstance(key, int):
+            ref[_list_index(ref, key)] = value
+        else:
+            raise ValueError(f"Cannot index a list with `{key}`")
+    else:
+        raise ValueError(f"Unsupported type: {type(ref)}")
+
+
+def unset_by_parts(data: Any, parts: tuple, start: int) -> None:
+    """
+    Delete the value at the parts of a parsed dot path in place, see `DotPath.unset`.
+
+    :param data: The data to delete the value from.
+    :type data: Any
+    :param parts: The parts of the dot path, see `DotPath.parts`.
+    :type parts: tuple
+    :param start: The position in the parts to start from, with data being the value
+    at the parts before it.
+    :type start: int
+    """
     ref = data
-    for key in keys[:-1]:
-        if isinstance(ref, dict):
-            ref = ref.setdefault(key, {})
-        elif isinstance(ref, list):
-            if isinstance(key, int):
-                while len(ref) <= key:
-                    ref.append(Sentinel)
-                ref[key] = value
-                return data
-            elif key is Sentinel:
-                ref.append(value)
-                return data
+
+    for position in range(start, len(parts) - 1):
+        key = parts[position]
+
+        if isinstance(ref, dict) and key in ref:
+            ref = ref[key]
+        elif isinstance(ref, list) and key is Wildcard:
+            for item in ref:
+                unset_by_parts(item, parts, position + 1)
+            return
+        elif isinstance(ref, list) and isinstance(key, int) and -len(ref) <= key < len(ref):
+            ref = ref[key]
         else:
-            raise ValueError(f"Unsupported type: {type(ref)}")
+            return
+
+    key = parts[-1]
+
+    if isinstance(ref, dict):
+        ref.pop(key, None)
+    elif isinstance(ref, list):
+        if key is Wildcard:
+            ref.clear()
+        elif isinstance(key, int) and -len(ref) <= key < len(ref):
+            del ref[key]
+
+
+def parse_dot_path(dot_path: str) -> list:
+    """
+    Parse a dot path into a list of keys and indices.
+    Handles dot notation and bracket notation for lists.
+    """
+    return list(compile_dot_path(dot_path).parts)
+
+
+def get_by_dot_path(data: dict, dot_path: str, default: Any = None) -> Any:
+    """
+    Get the value at the specified dot path.
+    """
+    assert isinstance(data, dict), "data must be a dictionary"
+    return compile_dot_path(dot_path).get(data, default)
+
 
-    set_value(ref, keys[-1], value)
+def set_by_dot_path(data: dict, dot_path: str, value: Any) -> dict:
+    """
+    Set the value at the specified dot path.
+    """
+    assert isinstance(data, dict), "data must be a dictionary"
+    compile_dot_path(dot_path).set(data, value)
     return data
 
 
@@ -140,22 +442,7 @@ def unset_by_dot_path(data: dict, dot_path: str) -> dict:
     Delete the key-value pair at the specified dot path.
     """
     assert isinstance(data, dict), "data must be a dictionary"
-    keys = parse_dot_path(dot_path)
-
-    ref = data
-    for key in keys[:-1]:
-        if isinstance(ref, dict):
-            ref = ref.get(key, {})
-        elif isinstance(ref, list) and isinstance(key, int):
-            ref = ref[key] if key < len(ref) else []
-        else:
-            return data
-
-    if isinstance(ref, dict) and keys[-1] in ref:
-        del ref[keys[-1]]
-    elif isinstance(ref, list) and isinstance(keys[-1], int):
-        if keys[-1] < len(ref):
-            del ref[keys[-1]]
+    compile_dot_path(dot_path).unset(data)
     return data
 
 
@@ -191,24 +478,71 @@ def current_directory(directory: Path):
         os.chdir(old)
 
 
-def import_from_string(path: str) -> Any:
-    from importlib import import_module, reload
+# The imported objects by their import path
+_IMPORT_CACHE: dict[str, Any] = {}
+
+
+def import_from_string(path: str, reload: bool = False) -> Any:
+    """
+    Import an object by its import path, such as `package.module.Class`. Objects are
+    cached by path, so the module is only imported the first time.
+
+    :param path: The import path of the object.
+    :type path: str
+    :param reload: Whether to reload the module even if the object is cached, which
+    also drops the cached objects of the module, see `invalidate_import_cache`.
+    :type reload: bool
+    :returns: The imported object
+    :raises ImportError: If the path isn't valid or the object can't be imported.
+    """
+    from importlib import import_module
+    from importlib import reload as reload_module
+
+    path = path.strip(" ")
+
+    if not reload and path in _IMPORT_CACHE:
+        return _IMPORT_CACHE[path]
 
     try:
-        module_path, class_name = path.strip(" ").rsplit(".", 1)
+        module_path, class_name = path.rsplit(".", 1)
     except ValueError:
         raise ImportError(f"{path} isn't a valid module path.") from None
 
-    initial = import_module(module_path)
-    module = reload(initial)
+    module = import_module(module_path)
+
+    if reload:
+        invalidate_import_cache(module_path)
+        module = reload_module(module)
 
     try:
-        return getattr(module, class_name)
+        target = getattr(module, class_name)
     except AttributeError:
         raise ImportError(f"Module {path} does not have a `{class_name}` attribute") from None  # noqa:E501
 
+    _IMPORT_CACHE[path] = target
+    return target
+
 
-def merge_dicts_flat(*dicts) -> dict:
+def invalidate_import_cache(module_path: str | None = None) -> None:
+    """
+    Drop cached objects imported by `import_from_string` so they're imported again
+    on their next use. The modules themselves aren't reloaded, use `reload=True` with
+    `import_from_string` for that.
+
+    :param module_path: The module to drop the objects of, including those of its
+    submodules. Defaults to dropping every object.
+    :type module_path: str | None
+    """
+    if module_path is None:
+        _IMPORT_CACHE.clear()
+        return
+
+    for path in list(_IMPORT_CACHE):
+        if path.startswith(module_path + "."):
+            del _IMPORT_CACHE[path]
+
+
+def merge_dicts_flat(*dicts, list_keys: dict[str, str] | None = None) -> dict:
     """
     Merge any number of dictionaries into a single flat dictionary.
 
@@ -216,10 +550,16 @@ def merge_dicts_flat(*dicts) -> dict:
     dictionary where keys with identical names are merged into a single value.
 
     If a key contains a list, the latest list replaces the old one unless `Sentinel`
-    is used in which case only the `Sentinel` values are overridden.
+    is used in which case only the `Sentinel` values are overridden. Lists of records
+    can be merged by a key field instead, see `merge_dicts`.
+
+    The dictionaries are not modified, and values that aren't merged are shared by
+    reference with the result.
 
     :param dicts: The dictionaries to merge.
     :type dicts: Any number of dicts
+    :param list_keys: The key field to merge the records of the list at each key by.
+    :type list_keys: dict[str, str] | None
     :returns: A dictionary containing the merged key-value pairs.
     :rtype: dict
 
@@ -231,28 +571,23 @@ def merge_dicts_flat(*dicts) -> dict:
         {'a': 1, 'b': [1, 5, 3], 'c': 3}
     """
     result: dict = {}
+    # The lists created by this merge, which can be merged into in place
+    owned: set[int] = set()
 
     for d in dicts:
         for key, value in d.items():
-            if key in result:
-                if isinstance(result[key], list) and isinstance(value, list):
-                    merged_list = result[key]
-                    for i in range(len(value)):
-                        if i < len(merged_list):
-                            if value[i] is not Sentinel:
-                                merged_list[i] = value[i]
-                        else:
-                            merged_list.append(value[i])
-                    result[key] = merged_list
-                else:
-                    result[key] = value
+            current = result.get(key, Missing)
+
+            if isinstance(current, list) and isinstance(value, list):
+                field = list_keys.get(key) if list_keys else None
+                result[key] = _merge_lists(current, value, owned, field)
             else:
                 result[key] = value
 
     return result
 
 
-def merge_dicts(*dicts) -> dict:
+def merge_dicts(*dicts, list_keys: dict[str, str] | None = None, path: str = "") -> dict:
     """
     Merge any number of dictionaries into a single nested dictionary.
 
@@ -262,32 +597,147 @@ def merge_dicts(*dicts) -> dict:
     If a key contains a list, the lists are concatenated with later values taking precedence,
     and `Sentinel` placeholders in lists are overridden by subsequent values.
 
+    Lists of records can instead be merged by a key field, by giving the dot path of the
+    list in `list_keys`. A record then replaces the record with the same value of the key
+    field, wherever it is in the list, and any other record is appended.
+
+    The dictionaries are not modified. Only the dictionaries and lists that are merged
+    are copied, any other values are shared by reference with the result.
+
     :param dicts: The dictionaries to merge.
     :type dicts: Any number of dicts
+    :param list_keys: The key field to merge the records of the list at each dot path by.
+    :type list_keys: dict[str, str] | None
+    :param path: The dot path the dictionaries are at, when merging part of a larger
+    dictionary, which the dot paths of `list_keys` are relative to the root of.
+    :type path: str
     :returns: A nested dictionary containing the merged key-value pairs.
     :rtype: dict
+
+    :Example:
+        >>> dict1 = {'a': {'b': [{'name': 'x', 'v': 1}, {'name': 'y', 'v': 2}]}}
+        >>> dict2 = {'a': {'b': [{'name': 'y', 'v': 3}]}}
+        >>> merge_dicts(dict1, dict2, list_keys={'a.b': 'name'})
+        {'a': {'b': [{'name': 'x', 'v': 1}, {'name': 'y', 'v': 3}]}}
     """
+    return _merge_dicts(dicts, list_keys, path)
+
+
+def _merge_dicts(dicts, list_keys: dict[str, str] | None, path: str = "") -> dict:
+    # Merge the dicts found at a dot path, where list_keys are relative to the root
     result: dict = {}
+    # The containers created by this merge, which can be merged into in place
+    owned: set[int] = {id(result)}
 
     for d in dicts:
-        for key, value in d.items():
-            if key in result and isinstance(result[key], dict) and isinstance(value, dict):
-                result[key] = merge_dicts(result[key], value)
-            elif key in result and isinstance(result[key], list) and isinstance(value, list):
-                merged_list = result[key]
-                for i in range(len(value)):
-                    if i < len(merged_list):
-                        if value[i] is not Sentinel:
-                            merged_list[i] = value[i]
-                    else:
-                        merged_list.append(value[i])
-                result[key] = merged_list
-            else:
-                result[key] = value
+        # Merge iteratively so deeply nested dictionaries don't hit the recursion limit
+        stack = [(result, d, path)]
+
+        while stack:
+            target, source, prefix = stack.pop()
+
+            for key, value in source.items():
+                current = target.get(key, Missing)
+
+                if isinstance(current, dict) and isinstance(value, dict):
+                    if id(current) not in owned:
+                        current = target[key] = dict(current)
+                        owned.add(id(current))
+                    # Only track the paths when they're needed to look up the list keys
+                    stack.append((current, value, join_dot_path(prefix, key) if list_keys else ""))
+                elif isinstance(current, list) and isinstance(value, list):
+                    field = list_keys.get(join_dot_path(prefix, key)) if list_keys else None
+                    target[key] = _merge_lists(current, value, owned, field)
+                else:
+                    target[key] = value
+
+    return result
+
+
+def join_dot_path(path: str, key: Any) -> str:
+    """
+    Join a key onto a dot path.
+
+    :param path: The dot path, or an empty string for the root.
+    :type path: str
+    :param key: The key.
+    :type key: Any
+    :returns: The dot path of the key.
+    :rtype: str
+    """
+    return f"{path}.{key}" if path else str(key)
+
+
+def merge_lists(*lists, list_key: str | None = None) -> list:
+    """
+    Merge any number of lists into a single list, as `merge_dicts` merges the lists it
+    finds. Each list is overlaid onto the ones before it by position, with `Sentinel`
+    placeholders left as they were, or by the key field of its records if given.
+
+    The lists are not modified, and a single list is returned as is.
+
+    :param lists: The lists to merge.
+    :type lists: Any number of lists
+    :param list_key: The key field to merge the records of the lists by.
+    :type list_key: str | None
+    :returns: The merged list.
+    :rtype: list
+    """
+    if not lists:
+        return []
+
+    result = lists[0]
+    # The lists created by this merge, which can be merged into in place
+    owned: set[int] = set()
+
+    for value in lists[1:]:
+        result = _merge_lists(result, value, owned, list_key)
 
     return result
 
 
+def _merge_lists(
+    current: list, value: list, owned: set[int], field: str | None = None
+) -> list:
+    # Overlay the list positionally, or by the key field of its records if given,
+    # copying it first unless this merge created it
+    if id(current) not in owned:
+        current = list(current)
+        owned.add(id(current))
+
+    if field is None:
+        for i, item in enumerate(value):
+            if i < len(current):
+                if item is not Sentinel:
+                    current[i] = item
+            else:
+                current.append(item)
+
+        return current
+
+    # Index the records by their key so each one is matched in constant time
+    index = {
+        item[field]: i
+        for i, item in enumerate(current)
+        if isinstance(item, dict) and field in item
+    }
+
+    for item in value:
+        if item is Sentinel:
+            continue
+
+        key = item.get(field, Missing) if isinstance(item, dict) else Missing
+
+        if key is not Missing and key in index:
+            current[index[key]] = item
+        else:
+            if key is not Missing:
+                index[key] = len(current)
+            current.append(item)
+
+    return current
+
+
 def get_filename_suffix(file_path: str):
     """
     Get the suffix of a file path.
@@ -305,6 +755,19 @@ def get_filename_suffix(file_path: str):
 
 
 def coerce_sequence(value: list | tuple) -> list:
+    # Coerce sequences of a single type in bulk, skipping the per item dispatch
+    kinds = set(map(type, value))
+
+    if len(kinds) == 1:
+        kind = kinds.pop()
+
+        if kind is str and all(map(str.isdecimal, value)):
+            return list(map(int, value))
+
+        coercer = _COERCERS.get(kind)
+        if coercer is not None:
+            return list(map(coercer, value))
+
     return [coerce_to_basic_types(item) for item in value]
 
 
@@ -321,12 +784,22 @@ def coerce_object(value: object) -> dict:
     return {}
 
 
+_STR_CONSTANTS: dict[str, bool | None] = {
+    "true": True,
+    "false": False,
+    "none": None,
+    "null": None,
+}
+
+
 def coerce_str(value: str) -> Union[int, float, str, bool, None]:
+    # Plain digits are by far the most common, so check for them before normalizing
+    if value.isdecimal():
+        return int(value)
+
     normalized = value.strip().lower()
-    if normalized in ["true", "false"]:
-        return normalized == "true"
-    elif normalized in ["none", "null"]:
-        return None
+    if normalized in _STR_CONSTANTS:
+        return _STR_CONSTANTS[normalized]
     return coerce_num(value)
 
 
@@ -340,16 +813,44 @@ def coerce_num(value: Union[int, float, str]) -> Union[int, float, str]:
         return str(value)
 
 
-def coerce_to_basic_types(value: Any) -> Union[int, float, bool, str, list, dict, None]:
+def _coerce_unchanged(value: Any) -> Any:
+    return value
+
+
+# The coercers of the exact types of values, any other type is checked in turn
+_COERCERS: dict[type, Callable[[Any], Any]] = {
+    str: coerce_str,
+    int: _coerce_unchanged,
+    bool: _coerce_unchanged,
+    type(None): _coerce_unchanged,
+    float: coerce_num,
+    list: coerce_sequence,
+    tuple: coerce_sequence,
+    dict: coerce_dict,
+}
+
+
+def coerce_to_basic_types(
+    value: Any, hint: Any = None
+) -> Union[int, float, bool, str, list, dict, None]:
     """
     Coerces a given value to basic types, including int, float, bool, and str, list, dict, and None.
 
     :param value: The value to be coerced.
     :type value: Any
+    :param hint: The type the value should be coerced to, if known, see `coerce_to_type`.
+    :type hint: Any
 
     :return: The coerced value.
     :rtype: Union[int, float, bool, str, List, Dict, None]
     """
+    if hint is not None:
+        return coerce_to_type(value, hint)
+
+    coercer = _COERCERS.get(type(value))
+    if coercer is not None:
+        return coercer(value)
+
     if isinstance(value, (list, tuple)):
         return coerce_sequence(value)
     elif isinstance(value, dict):
@@ -362,3 +863,81 @@ def coerce_to_basic_types(value: Any) -> Union[int, float, bool, str, list, dict
         return value
     else:
         return coerce_num(value)
+
+
+def coerce_to_type(value: Any, hint: Any) -> Any:
+    """
+    Coerce a value to a type hint such as `int`, `list[float]` or `dict[str, bool]`
+    instead of guessing its type, so for example `"007"` stays a string for a `str` hint.
+    Anything that isn't a basic type, or a value that doesn't convert to its hint,
+    is coerced by `coerce_to_basic_types` instead.
+
+    :param value: The value to be coerced.
+    :type value: Any
+    :param hint: The type hint.
+    :type hint: Any
+    :return: The coerced value.
+    :rtype: Any
+    """
+    origin = get_origin(hint)
+    args = get_args(hint)
+
+    if origin is Annotated:
+        return coerce_to_type(value, args[0])
+
+    if origin is Union or origin is UnionType:
+        types = [arg for arg in args if arg is not type(None)]
+
+        if isinstance(value, str) and len(types) < len(args):
+            if value.strip().lower() in ("none", "null"):
+                return None
+        if len(types) == 1:
+            return coerce_to_type(value, types[0])
+        return coerce_to_basic_types(value)
+
+    if isinstance(value, str):
+        return _coerce_str_to_type(value, hint)
+
+    if isinstance(value, (list, tuple)) and origin in (list, tuple, set, frozenset):
+        return _coerce_sequence_to_type(value, origin, args)
+
+    if isinstance(value, dict) and origin is dict and len(args) == 2:
+        return {k: coerce_to_type(v, args[1]) for k, v in value.items()}
+
+    return coerce_to_basic_types(value)
+
+
+def _coerce_str_to_type(value: str, hint: Any) -> Any:
+    if hint is str:
+        return value
+    if hint is int or hint is float:
+        try:
+            return hint(value)
+        except ValueError:
+            pass
+    elif hint is bool:
+        normalized = value.strip().lower()
+        if normalized in ("true", "false"):
+            return normalized == "true"
+    return coerce_str(value)
+
+
+def _coerce_sequence_to_type(value: list | tuple, origin: Any, args: tuple) -> list:
+    if origin is tuple and args and args[-1] is not Ellipsis:
+        if len(args) == len(value):
+            return [coerce_to_type(item, arg) for item, arg in zip(value, args, strict=True)]
+        return coerce_sequence(value)
+
+    item_hint = args[0] if args else None
+
+    if item_hint is None:
+        return coerce_sequence(value)
+
+    # Convert sequences of strings in bulk
+    if (item_hint is int or item_hint is float) and all(type(item) is str for item in value):
+        try:
+            return list(map(item_hint, value))
+        except ValueError:
+            pass
+
+    return [coerce_to_type(item, item_hint) for item in value]
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+
+from manifest.hooks.expressions.budget import (
+    BudgetExceededError,
+    ExpressionBudget,
+    expression_budget,
+    get_expression_depth,
+)
+from manifest.hooks.expressions.operations import register_operation, unregister_operation
+from manifest.hooks.expressions.resolve import resolve_expression, resolve_expressions
+
+
+async def test_default_max_depth():
+    register_operation("expand", lambda args, _: "$expand{" + args[0] + "}", execution="inline")
+
+    with pytest.raises(BudgetExceededError):
+        await resolve_expression("prefix $expand{x}", {})
+
+    unregister_operation("expand")
+
+
+async def test_expression_budget():
+    data = {f"key{i}": f"$upper{{value{i}}}" for i in range(10)}
+
+    with expression_budget(ExpressionBudget(max_operations=10)) as usage:
+        await resolve_expressions(data)
+        assert usage.operations == 10
+
+    with pytest.raises(BudgetExceededError):
+        with expression_budget(ExpressionBudget(max_operations=9)):
+            await resolve_expressions(data)
+
+    with pytest.raises(BudgetExceededError):
+        with expression_budget(ExpressionBudget(max_bytes=50)):
+            await resolve_expressions(data)
+
+    with pytest.raises(BudgetExceededError):
+        with expression_budget(ExpressionBudget(max_depth=2)):
+            await resolve_expression("$upper{$lower{$reverse{x}}}", {})
+
+    # Operations run in a rescan, such as a `$ref` resolving the expressions of another
+    # file, are one level deeper than the expression that produced them
+    register_operation("wrap", lambda args, _: "$depth{x}", execution="inline")
+    register_operation("depth", lambda args, _: get_expression_depth(), execution="inline")
+
+    assert await resolve_expression("a $wrap{x}", {}) == "a 2"
+
+    unregister_operation("wrap")
+    unregister_operation("depth")
+
+
+async def test_expression_budget_timeout():
+    async def slow(args, _):
+        await asyncio.sleep(1)
+
+    register_operation("slow", slow)
+
+    with pytest.raises(BudgetExceededError):
+        with expression_budget(ExpressionBudget(timeout=0.05)):
+            await resolve_expressions({"a": "$slow{x}"})
+
+    unregister_operation("slow")
@@ -1,10 +1,14 @@
+import asyncio
 import pytest
 import os
+import threading
 
 from manifest.hooks.expressions.operations import (
+    _DISPATCHING_BATCHES,
     execute_operation,
     register_operation,
     get_operation,
+    get_operation_execution,
     unregister_operation
 )
 from manifest.parse import dump_to_file
@@ -22,6 +26,31 @@ def test_register_unregister_get_operation():
         get_operation("test")
 
 
+def pid_op(args, _):
+    return os.getpid()
+
+
+async def test_operation_execution_policies():
+    assert get_operation_execution("upper") == "inline"
+
+    register_operation("thread_id", lambda args, _: threading.get_ident())
+    register_operation("inline_thread_id", lambda args, _: threading.get_ident(), execution="inline")
+    register_operation("pid", pid_op, execution="process")
+
+    assert get_operation_execution("thread_id") == "thread"
+    assert await execute_operation("inline_thread_id", [], {}) == threading.get_ident()
+    assert await execute_operation("thread_id", [], {}) != threading.get_ident()
+    assert await execute_operation("pid", [], {}) != os.getpid()
+
+    for name in ("thread_id", "inline_thread_id", "pid"):
+        unregister_operation(name)
+
+    assert get_operation_execution("pid") == "thread"
+
+    with pytest.raises(ValueError):
+        register_operation("invalid", pid_op, execution="invalid")
+
+
 async def test_ref_operation():
     data = {"compute": {"cpus": 4}}
     file_path = "memory://test.json"
@@ -40,3 +69,81 @@ async def test_ref_operation():
 
     with pytest.raises(ValueError):
         await execute_operation("ref", ["invalid|path|4|5"], {})
+
+
+async def test_operation_caching():
+    from manifest.hooks.expressions.operations import (
+        cache_operations,
+        get_operation_stats,
+        invalidate_operation_cache,
+    )
+
+    calls = []
+
+    def lookup(args, _):
+        calls.append(args[0])
+        return args[0].upper()
+
+    register_operation("pure_lookup", lookup, execution="inline", cache="pure")
+    register_operation("ttl_lookup", lookup, execution="inline", cache="ttl", ttl=60, maxsize=2)
+
+    # Pure results are only reused within a build
+    with cache_operations():
+        assert await execute_operation("pure_lookup", ["a"], {}) == "A"
+        assert await execute_operation("pure_lookup", ["a"], {}) == "A"
+    assert await execute_operation("pure_lookup", ["a"], {}) == "A"
+
+    assert calls == ["a", "a"]
+    assert get_operation_stats("pure_lookup") == {"hits": 1, "misses": 1}
+
+    # TTL results are reused across builds, keeping at most maxsize results
+    calls.clear()
+    for arg in ["a", "a", "b", "c", "a"]:
+        await execute_operation("ttl_lookup", [arg], {})
+
+    assert calls == ["a", "b", "c", "a"]
+    assert get_operation_stats("ttl_lookup") == {"hits": 1, "misses": 4}
+
+    invalidate_operation_cache("ttl_lookup")
+    await execute_operation("ttl_lookup", ["a"], {})
+    assert calls[-1] == "a" and len(calls) == 5
+
+    with pytest.raises(ValueError):
+        register_operation("invalid", lookup, cache="ttl")
+
+    unregister_operation("pure_lookup")
+    unregister_operation("ttl_lookup")
+
+
+async def test_batched_operation():
+    from manifest.hooks.expressions.resolve import resolve_expressions
+
+    backend_calls = []
+
+    async def fetch_secrets(batch, _):
+        backend_calls.append([args[0] for args in batch])
+        return [f"secret-{args[0]}" for args in batch]
+
+    register_operation("secret", fetch_secrets, batch=True)
+
+    data = {f"key{i}": f"$secret{{{i}}}" for i in range(50)}
+    result = await resolve_expressions(data)
+
+    assert result == {f"key{i}": f"secret-{i}" for i in range(50)}
+    assert len(backend_calls) == 1
+    # The dispatching task is only referenced until it's done
+    await asyncio.sleep(0)
+    assert not _DISPATCHING_BATCHES
+    assert sorted(backend_calls[0], key=int) == [str(i) for i in range(50)]
+
+    # Only as many calls as are in flight at once make up a batch
+    backend_calls.clear()
+    await resolve_expressions(data, concurrency=10)
+    assert [len(batch) for batch in backend_calls] == [10] * 5
+
+    register_operation("secret", lambda batch, _: [], batch=True, execution="inline")
+
+    with pytest.raises(ValueError):
+        await execute_operation("secret", ["a"], {})
+
+    unregister_operation("secret")
@@ -42,3 +42,89 @@ async def test_resolve_expressions():
     }
     assert await resolve_expressions(["$reverse{hello}", "$sum{2,3}"]) == ["olleh", 5.0]
     assert await resolve_expressions("$reverse{$ref{key1}}", {"key1": "hello"}) == "olleh"
+
+
+async def test_resolve_expressions_concurrently():
+    import asyncio
+
+    from manifest.hooks.expressions.operations import register_operation, unregister_operation
+
+    in_flight = 0
+    peak = 0
+
+    async def slow_op(args, _):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return args[0]
+
+    register_operation("slow", slow_op)
+
+    data = {f"key{i}": f"$slow{{{i}}}" for i in range(20)}
+    data["nested"] = ["$slow{a}", {"b": "$slow{b}"}, 5]
+
+    result = await resolve_expressions(data, concurrency=4)
+
+    assert list(result.keys()) == list(data.keys())
+    assert result["key7"] == "7"
+    assert result["nested"] == ["a", {"b": "b"}, 5]
+    assert 1 < peak <= 4
+
+    with pytest.raises(ValueError):
+        await resolve_expressions(data, concurrency=0)
+
+    unregister_operation("slow")
+
+
+async def test_resolve_expressions_refs():
+    from manifest.hooks.expressions.operations import register_operation, unregister_operation
+
+    calls = 0
+
+    def count_op(args, _):
+        nonlocal calls
+        calls += 1
+        return args[0]
+
+    register_operation("count", count_op, execution="inline")
+
+    result = await resolve_expressions({
+        "a": "$ref{b}",
+        "b": "$ref{c.d}",
+        "c": {"d": "$upper{$count{hello}}", "e": ["$ref{b}"]},
+        "f": "$ref{c}",
+        "g": "prefix $ref{a}",
+    })
+
+    assert result == {
+        "a": "HELLO",
+        "b": "HELLO",
+        "c": {"d": "HELLO", "e": ["HELLO"]},
+        "f": {"d": "HELLO", "e": ["HELLO"]},
+        "g": "prefix HELLO",
+    }
+    assert calls == 1
+
+    unregister_operation("count")
+
+    with pytest.raises(ValueError, match="Circular"):
+        await resolve_expressions({"a": "$ref{b}", "b": {"c": "$ref{a}"}})
+
+    with pytest.raises(ValueError, match="Circular"):
+        await resolve_expressions({"a": "$ref{a}"})
+
+
+async def test_resolve_expressions_shares_static_subtrees():
+    static = {"a": [1, 2, {"b": "no expressions $here"}], "c": "text"}
+    data = {"static": static, "dynamic": {"d": "$upper{x}", "e": [1, 2]}}
+
+    result = await resolve_expressions(data)
+
+    assert result == {"static": static, "dynamic": {"d": "X", "e": [1, 2]}}
+    assert result["static"] is static
+    assert result["dynamic"]["e"] is data["dynamic"]["e"]
+    assert data["dynamic"]["d"] == "$upper{x}"
+
+    assert await resolve_expressions(static) is static
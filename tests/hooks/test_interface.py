@@ -1,10 +1,13 @@
+import threading
 import pytest
 
 from manifest.hooks.interface import (
     unregister_hook,
     register_hook,
     execute_hook,
-    get_hooks
+    get_hook_pipeline,
+    get_hooks,
+    set_hook_execution,
 )
 
 
@@ -34,6 +37,10 @@ def test_register_get_hooks():
     hooks = get_hooks(hook_type="pre", operation="load")
     assert hook in hooks
 
+    # Changing the returned list doesn't change the registered hooks
+    hooks.remove(hook)
+    assert hook in get_hooks(hook_type="pre", operation="load")
+
     # Assert invalid hook types or operations return an empty list
     assert get_hooks(hook_type="invalid", operation="load") == []
 
@@ -51,3 +58,51 @@ def test_register_get_hooks():
     # Assert invalid hook types or operations raise ValueError in unregister_hook
     with pytest.raises(ValueError):
         unregister_hook(hook, hook_type="invalid", operation="load")
+
+
+async def test_hook_pipeline():
+    threads = []
+
+    def first(value: list):
+        threads.append(threading.get_ident())
+        return value + [1]
+
+    def second(value: list):
+        threads.append(threading.get_ident())
+        return value + [2]
+
+    def cheap(value: list):
+        threads.append(threading.get_ident())
+        return value + [3]
+
+    async def async_hook(value: list):
+        return value + [4]
+
+    set_hook_execution(cheap, "inline")
+
+    pipeline = get_hook_pipeline("pre", "dump", [first, second, cheap, async_hook])
+    assert await pipeline([]) == [1, 2, 3, 4]
+
+    # The consecutive sync hooks share one executor call, the inline hook runs on the loop
+    assert threads[0] == threads[1] != threading.get_ident()
+    assert threads[2] == threading.get_ident()
+
+    # The combined chain is reused until the registered hooks change
+    assert get_hook_pipeline("pre", "dump", [first]) is get_hook_pipeline("pre", "dump", [first])
+
+    before = get_hook_pipeline("pre", "dump")
+    register_hook(first, hook_type="pre", operation="dump")
+    assert get_hook_pipeline("pre", "dump") is not before
+    assert await get_hook_pipeline("pre", "dump")([]) == [1]
+    unregister_hook(first, hook_type="pre", operation="dump")
+
+    with pytest.raises(ValueError):
+        set_hook_execution(first, "invalid")
+
+
+def test_builtin_hooks_inline():
+    from manifest.hooks import substitute_env_vars
+    from manifest.hooks.interface import get_hook_execution
+
+    # The default load pipeline doesn't hand off to the executor
+    assert get_hook_execution(substitute_env_vars) == "inline"
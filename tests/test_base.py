@@ -3,7 +3,9 @@ import os
 from typing import Optional, Union
 
 from manifest.base import Manifest, BaseModel
+from manifest.options import BuildOptions
 from manifest.parse import dump_to_file
+from manifest.patch import PatchError
 
 
 class NestedModel(BaseModel):
@@ -102,6 +104,181 @@ async def test_manifest_build(test_config_files):
     assert config.extra_fields == {"y": 1}
 
 
+async def test_manifest_build_fields_named_like_options():
+    class OptionsManifest(Manifest):
+        profile: str = ""
+        lazy: bool = False
+
+    config = await OptionsManifest.build(profile="prod", lazy=True)
+
+    assert config.profile == "prod"
+    assert config.lazy is True
+
+
+async def test_manifest_build_lazy():
+    from manifest.hooks.expressions.operations import register_operation, unregister_operation
+
+    calls = []
+
+    def track(args, _):
+        calls.append(args[0])
+        return args[0]
+
+    register_operation("track", track, execution="inline")
+
+    class RequiredManifest(MyManifest):
+        name: str
+
+    await dump_to_file(
+        "memory://lazy.yaml",
+        {
+            "name": "$track{app}",
+            "database": "$track{$ref{nested.bar.k}}",
+            "nested": {"foo": False, "bar": {"j": 0.5, "k": "$track{20}"}},
+            "y": "$upper{$track{extra}}",
+        }
+    )
+
+    config = await RequiredManifest.build(
+        ["memory://lazy.yaml"], build_options=BuildOptions(lazy=True)
+    )
+
+    # Only the required field was resolved up front
+    assert calls == ["app"]
+    assert config.name == "app"
+
+    # Resolving a key resolves the keys it references first
+    assert await config.resolve("database") == "20"
+    assert calls == ["app", "20", "20"]
+    assert config.nested.bar == {"j": 0.5, "k": 20}
+
+    # Deferred fields are resolved on access
+    assert config.y == "EXTRA"
+    assert calls[-1] == "extra"
+
+    config = await RequiredManifest.build(
+        ["memory://lazy.yaml"], build_options=BuildOptions(lazy=True)
+    )
+    assert config.normalize()["nested"]["bar"]["k"] == 20
+
+    unregister_operation("track")
+
+
+async def test_manifest_build_lazy_ignores_extras():
+    class StrictManifest(Manifest):
+        x: int = 0
+
+    await dump_to_file(
+        "memory://lazy_extras.yaml",
+        {"x": "$ref{unknown}", "unknown": "$ref{value}", "value": 5}
+    )
+
+    eager = await StrictManifest.build(["memory://lazy_extras.yaml"])
+    config = await StrictManifest.build(
+        ["memory://lazy_extras.yaml"], build_options=BuildOptions(lazy=True)
+    )
+
+    # Keys the model doesn't declare are ignored as when eager, but can still be referenced
+    assert config.normalize() == eager.normalize() == {"x": 5}
+    assert config.set_by_key("x", 1).x == 1
+    assert await config.resolve("x") == 5
+
+
+async def test_manifest_build_lazy_matches_eager(monkeypatch):
+    from manifest.hooks.expressions.operations import register_operation, unregister_operation
+
+    calls = []
+
+    def track(args, _):
+        calls.append(args[0])
+        return args[0]
+
+    register_operation("track", track, execution="inline")
+
+    class LayeredManifest(Manifest):
+        a: str
+        b: str = ""
+        c: dict = {}
+        d: str = ""
+
+    await dump_to_file(
+        "memory://lazy_base.yaml",
+        {"a": "$track{one}", "b": "$ref{a}-$ref{hidden}", "hidden": "$track{secret}"}
+    )
+    await dump_to_file("memory://lazy_overlay.yaml", {"a": "$track{two}"})
+    monkeypatch.setenv("CONFIG__C__E", "lit$upper{z}")
+
+    files = ["memory://lazy_base.yaml", "memory://lazy_overlay.yaml"]
+    eager = await LayeredManifest.build(files, d="$upper{kw}")
+    eager_calls = sorted(calls)
+    calls.clear()
+
+    config = await LayeredManifest.build(
+        files, d="$upper{kw}", build_options=BuildOptions(lazy=True)
+    )
+    for _ in range(3):
+        assert (config.a, config.b, config.c, config.d) == (eager.a, eager.b, eager.c, eager.d)
+
+    # Each expression is resolved once, against the file it comes from
+    assert config.b == "one-secret"
+    assert config.c == {"e": "lit$upper{z}"}
+    assert config.d == "$upper{kw}"
+    assert sorted(calls) == eager_calls == ["one", "secret", "two"]
+
+    unregister_operation("track")
+
+
+async def test_manifest_lazy_dump_and_copy():
+    await dump_to_file(
+        "memory://lazy_dump.yaml",
+        {"x": "$ref{value}", "value": 5, "nested": {"foo": "$ref{flag}"}, "flag": False}
+    )
+
+    config = await MyManifest.build(
+        ["memory://lazy_dump.yaml"], build_options=BuildOptions(lazy=True)
+    )
+
+    assert "x=<Deferred>" in repr(config)
+    # Dumping only some fields only resolves those
+    assert config.model_dump(include={"value"}) == {"value": 5}
+    assert "x=<Deferred>" in repr(config)
+
+    copy = config.model_copy()
+    assert copy.x == 5
+    assert copy.nested.foo is False
+    assert config.model_dump()["x"] == 5
+    assert config == copy
+
+
+async def test_manifest_lazy_get_by_key():
+    await dump_to_file(
+        "memory://lazy_get.yaml",
+        {
+            "x": "$ref{port}",
+            "port": 80,
+            "extra_thing": "$upper{value}",
+            "db": {"host": "$ref{host}"},
+            "host": "localhost",
+        }
+    )
+
+    config = await MyManifest.build(
+        ["memory://lazy_get.yaml"], build_options=BuildOptions(lazy=True)
+    )
+
+    assert config.get_by_key("extra_thing") == "VALUE"
+    assert config.get_by_key("db.host") == "localhost"
+    assert config.get_by_key("x") == 80
+
+    config = await MyManifest.build(
+        ["memory://lazy_get.yaml"], build_options=BuildOptions(lazy=True)
+    )
+
+    assert config.extra_fields == {
+        "port": 80, "extra_thing": "VALUE", "db": {"host": "localhost"}, "host": "localhost"
+    }
+
+
 async def test_manifest_from_files(test_config_files):
     files = ["memory://base.json", "memory://nested.yml"]
     config = await MyManifest.from_files(files)
@@ -160,6 +337,76 @@ async def test_manifest_from_env(test_config_files):
     assert config.normalize() == expected_model
 
 
+async def test_manifest_provenance_and_reload(test_config_files):
+    files = ["memory://base.json", "memory://nested.yml"]
+    os.environ["CONFIG__NESTED__FOO"] = "true"
+
+    config = await MyManifest.build(
+        files, key_values=["x=20"], build_options=BuildOptions(keep_layers=True)
+    )
+
+    del os.environ["CONFIG__NESTED__FOO"]
+
+    assert config.provenance("x") == "key_values"
+    assert config.provenance("database") == "memory://base.json"
+    assert config.provenance("nested.foo") == "CONFIG__NESTED__FOO"
+    assert config.provenance("nested.bar.j") == "memory://nested.yml"
+    assert (await MyManifest.from_files(files)).provenance("x") is None
+    assert (await MyManifest.build(files)).provenance("x") is None
+
+    await dump_to_file("memory://base.json", {"x": 10, "database": "elsewhere"})
+    reloaded = await config.reload(["memory://base.json"])
+
+    assert reloaded.database == "elsewhere"
+    assert reloaded.x == 20
+    assert reloaded.nested.foo is True
+    assert config.database == "someotherplace"
+
+    with pytest.raises(ValueError):
+        await config.reload(["memory://alternate.json"])
+
+    # A changed copy no longer matches its layers
+    for changed in [
+        config.set_by_key("x", 5),
+        config.unset_by_key("x"),
+        config.apply_patch([{"op": "set", "path": "x", "value": 5}]),
+        config.model_copy(update={"x": 5}),
+    ]:
+        assert changed.provenance("x") is None
+        with pytest.raises(ValueError):
+            await changed.reload()
+
+    assert config.model_copy().provenance("x") == "key_values"
+
+    # A file can be passed more than once, and all of its layers are reloaded
+    config = await MyManifest.build(
+        files + ["memory://base.json"], build_options=BuildOptions(keep_layers=True)
+    )
+    assert config.provenance("database") == "memory://base.json"
+
+    await dump_to_file("memory://base.json", {"x": 10, "database": "again"})
+    assert (await config.reload(["memory://base.json"])).database == "again"
+
+
+async def test_manifest_build_coerces_to_field_types():
+    class TypedManifest(Manifest):
+        code: str = ""
+        ports: list[int] = []
+        ratio: Optional[float] = None
+        other: dict[str, str] = {}
+
+    os.environ["CONFIG__CODE"] = "007"
+    config = await TypedManifest.build(
+        key_values=["ports[0]=80", "ports[1]=443", "ratio=null", "other.a=1"]
+    )
+    del os.environ["CONFIG__CODE"]
+
+    assert config.code == "007"
+    assert config.ports == [80, 443]
+    assert config.ratio is None
+    assert config.other == {"a": "1"}
+
+
 async def test_manifest_to_file(test_config_files):
     from manifest.parse import read_from_file
 
@@ -207,6 +454,63 @@ async def test_manifest_set_by_key(test_config_files):
     assert config.database == "sqlite:///database.db"
 
 
+async def test_manifest_set_by_key_nested(test_config_files):
+    config = await MyManifest.build(["memory://base.json", "memory://nested.yml"])
+
+    updated = config.set_by_key("nested.foo", True)
+
+    assert updated.nested.foo is True
+    assert isinstance(updated.nested, NestedModel)
+    assert config.nested.foo is False
+    # Everything off the path is shared with the original
+    assert updated.nested.bar is config.nested.bar
+    assert updated.database is config.database
+
+    updated = config.unset_by_key("nested.bar.j")
+    assert updated.nested.bar == {"k": 10, "l": None}
+    assert config.nested.bar == {"j": 0.5, "k": 10, "l": None}
+
+    with pytest.raises(ValueError):
+        config.set_by_key("nested.foo", "not a bool")
+
+    with pytest.raises(ValueError):
+        config.set_by_key("x.y.z", 1)
+
+
+async def test_manifest_apply_patch(test_config_files):
+    config = await MyManifest.build(["memory://base.json", "memory://nested.yml"])
+
+    updated = config.apply_patch([
+        {"op": "set", "path": "x", "value": 20},
+        {"op": "set", "path": "nested.foo", "value": True},
+        {"op": "unset", "path": "nested.bar.j"},
+        {"op": "merge", "path": "nested.bar", "value": {"m": 1}},
+        {"op": "set", "path": "servers", "value": [{"host": "a"}]},
+        {"op": "set", "path": "servers[0].port", "value": 80},
+        {"op": "unset", "path": "database"},
+    ])
+
+    assert updated.x == 20
+    assert updated.nested.foo is True
+    assert isinstance(updated.nested, NestedModel)
+    assert updated.nested.bar == {"k": 10, "l": None, "m": 1}
+    assert updated.servers == [{"host": "a", "port": 80}]
+    assert updated.database == "sqlite:///database.db"
+    assert config.x == 10
+    assert config.nested.bar == {"j": 0.5, "k": 10, "l": None}
+
+    with pytest.raises(PatchError) as exc_info:
+        config.apply_patch([
+            {"op": "set", "path": "x", "value": 1},
+            {"op": "set", "path": "nested.foo", "value": "not a bool"},
+            {"op": "replace", "path": "x", "value": 2},
+            {"op": "set", "path": "nested.bar.k", "value": "not a number"},
+        ])
+
+    assert sorted(exc_info.value.errors) == [1, 2, 3]
+    assert config.x == 10
+
+
 async def test_manifest_unset_by_key(test_config_files):
     config = await MyManifest.from_key_values(
         key_values=["x=10", "database=someotherplace"]
@@ -231,6 +535,21 @@ async def test_manifest_get_by_key(test_config_files):
     assert config.get_by_key("database") == "someotherplace"
     assert config.get_by_key("nested.foo") == True
 
+    config = await MyManifest.build(
+        key_values=["nested.bar.j=0.5", "servers[0].host=a", "servers[1].host=b"]
+    )
+
+    assert config.get_by_key("nested") == {"foo": True, "bar": {"j": 0.5}}
+    assert config.get_by_key("nested.bar.j") == 0.5
+    assert config.get_by_key("servers[-1].host") == "b"
+    assert config.get_by_key("servers[*].host") == ["a", "b"]
+    assert config.get_by_key("nested.missing") is None
+    assert config.get_by_key("normalize") is None
+
+    nested = config.get_by_key("nested", live=True)
+    assert isinstance(nested, NestedModel)
+    assert nested is config.nested
+
 
 # Fix: RootModels must be manually defined in the Manifest object for
 # now until we drop support for pydantic v1
@@ -0,0 +1,43 @@
+from manifest.base import Manifest
+from manifest.executor import ManifestExecutor, get_executor, use_executor
+from manifest.options import BuildOptions
+from manifest.parse import dump_to_file
+from manifest.utils import run_in_thread
+
+
+async def test_use_executor():
+    default = get_executor()
+    executor = ManifestExecutor(max_workers=2)
+
+    with use_executor(executor):
+        assert get_executor() is executor
+        assert await run_in_thread(lambda: 1) == 1
+
+    assert get_executor() is default
+    assert executor.metrics.completed == 1
+    executor.shutdown()
+
+
+async def test_executor_metrics():
+    class MyManifest(Manifest):
+        x: int = 0
+
+    await dump_to_file("memory://executor.json", {"x": 1})
+    executor = ManifestExecutor(max_workers=1)
+
+    config = await MyManifest.build(
+        files=["memory://executor.json"], build_options=BuildOptions(executor=executor)
+    )
+    assert config.x == 1
+
+    metrics = executor.metrics
+    assert metrics.max_workers == 1
+    assert metrics.queue_depth == 0
+    assert metrics.active_workers == 0
+    assert metrics.completed > 0
+    assert metrics.wait.count == metrics.completed
+    assert metrics.to_dict()["completed"] == metrics.completed
+
+    executor.reset_metrics()
+    assert executor.metrics.completed == 0
+    executor.shutdown()
@@ -0,0 +1,83 @@
+import pytest
+
+from manifest.layers import Layer, LayeredDict
+from manifest.utils import Sentinel, merge_dicts, merge_dicts_flat
+
+
+def test_layered_dict():
+    base = {"a": {"b": 1, "c": [1, 2]}, "d": {"e": 1}, "f": {"g": 1}}
+    overlay = {"a": {"c": [Sentinel, 3]}, "d": {"g": 2}}
+    env = {"a": {"b": 2}}
+
+    layers = LayeredDict([
+        Layer("base.yml", base, flat=True),
+        Layer("overlay.yml", overlay, flat=True),
+        Layer("env", env, sources={"a.b": "CONFIG__A__B"}),
+    ])
+    assert layers.names == ["base.yml", "overlay.yml", "env"]
+    assert layers.data == merge_dicts(merge_dicts_flat(base, overlay), env)
+
+    assert layers.provenance("a.b") == "CONFIG__A__B"
+    assert layers.provenance("a.c[0]") == "base.yml"
+    assert layers.provenance("a.c[1]") == "overlay.yml"
+    assert layers.provenance("d.e") is None
+    assert layers.provenance("d.g") == "overlay.yml"
+    assert layers.provenance("f.g") == "base.yml"
+    assert layers.provenance("missing") is None
+
+    # Only the keys the replaced layer touches are merged again
+    previous = layers.data
+    overlay = {"a": {"c": [4]}}
+    layers.replace("overlay.yml", overlay)
+    assert layers.data == merge_dicts(merge_dicts_flat(base, overlay), env)
+    assert layers.data["f"] is previous["f"]
+    assert layers.provenance("d.e") == "base.yml"
+    assert layers.provenance("a.c[0]") == "overlay.yml"
+
+    layers.remove("env")
+    assert layers.data == merge_dicts_flat(base, overlay)
+    assert layers.provenance("a.b") is None
+
+    layers.add(Layer("kwargs", {"d": {"e": 2}}))
+    assert layers.data["d"] == {"e": 2}
+    assert layers.provenance("d.e") == "kwargs"
+
+    with pytest.raises(ValueError):
+        layers.add(Layer("kwargs", {}))
+
+    with pytest.raises(KeyError):
+        layers.replace("missing", {})
+
+
+def test_layered_dict_copy():
+    layers = LayeredDict([Layer("a", {"x": {"y": 1}}), Layer("b", {"z": 1})])
+    copied = layers.copy()
+    copied.replace("b", {"x": {"y": 2}})
+
+    assert layers.data == {"x": {"y": 1}, "z": 1}
+    assert copied.data == {"x": {"y": 2}}
+    assert layers.provenance("x.y") == "a"
+    assert copied.provenance("x.y") == "b"
+
+
+def test_layered_dict_list_keys():
+    base = {"services": [{"name": "a", "port": 1}, {"name": "b", "port": 2}]}
+    layers = LayeredDict(
+        [Layer("base.yml", base, flat=True), Layer("kwargs", {})],
+        list_keys={"services": "name"},
+    )
+
+    layers.replace("kwargs", {"services": [{"name": "b", "port": 3}]})
+    assert layers.data == {"services": [{"name": "a", "port": 1}, {"name": "b", "port": 3}]}
+    assert layers.provenance("services[1].port") == "kwargs"
+
+
+def test_layered_dict_source():
+    layers = LayeredDict([
+        Layer("files[0]", {"x": 1}, flat=True, source="base.yml"),
+        Layer("files[1]", {"y": 1}, flat=True, source="base.yml"),
+    ])
+
+    assert layers.names == ["files[0]", "files[1]"]
+    assert layers.provenance("x") == layers.provenance("y") == "base.yml"
+    assert layers.copy().provenance("y") == "base.yml"
@@ -1,5 +1,11 @@
+import os
 import pytest
 
+from manifest.hooks.expressions.budget import (
+    BudgetExceededError,
+    ExpressionBudget,
+    expression_budget,
+)
 from manifest.parse import (
     get_serializer_from_type,
     determine_file_type,
@@ -9,7 +15,9 @@ from manifest.parse import (
     dump_to_file,
     write_to_file,
     read_from_file,
+    parse_files,
 )
+from manifest.profile import profile_build
 from manifest.serializers import (
     JSONSerializer,
     YAMLSerializer,
@@ -40,6 +48,10 @@ def test_parse_key_values():
     assert parse_key_values(["a.b.c=5"]) == {"a": {"b": {"c": "5"}}}
     assert parse_key_values(["a.b.c=5", "a.b.d=6"]) == {"a": {"b": {"c": "5", "d": "6"}}}
     assert parse_key_values(["a.b.c=5", "a.b.d=6", "a.b=7"], coerce=True) == {"a": {"b": 7}}
+    # Later key-values are merged into earlier ones, replacing what they conflict with
+    assert parse_key_values(["a=1", "a.b=2"]) == {"a": {"b": "2"}}
+    assert parse_key_values(["a[]=x", "a[]=y"]) == {"a": ["y"]}
+    assert parse_key_values(["a[0]=x", "a[1]=y"]) == {"a": ["x", "y"]}
 
 
 @pytest.mark.parametrize(
@@ -192,4 +204,81 @@ async def test_load_dumps_hooks(file_path, data):
     )
 
     assert result["name"] == "Jane Doe"
-    assert result["age"] == 40
\ No newline at end of file
+    assert result["age"] == 40
+
+def add_pid(data: dict) -> dict:
+    data["pid"] = os.getpid()
+    return data
+
+
+async def test_load_from_file_in_process(tmp_path):
+    large = str(tmp_path / "large.yaml")
+    small = str(tmp_path / "small.yaml")
+    await dump_to_file(large, {"name": "$upper{large}", "items": list(range(1000))})
+    await dump_to_file(small, {"name": "small", "other": 1})
+
+    result = await load_from_file(large, post_process_hooks=[add_pid], process_threshold=1024)
+    assert result["name"] == "LARGE"
+    assert result["items"] == list(range(1000))
+    assert result["pid"] != os.getpid()
+
+    result = await load_from_file(small, post_process_hooks=[add_pid], process_threshold=1024)
+    assert result["pid"] == os.getpid()
+
+    # The profile recorded in the worker process is merged into the active one
+    with profile_build() as profile:
+        await load_from_file(large, process_threshold=1024)
+    assert profile.files[large]["deserialize"].count == 1
+
+    # The work done in the worker process counts against the active budget
+    with expression_budget(ExpressionBudget(max_operations=1)) as usage:
+        await load_from_file(large, process_threshold=1024)
+        assert usage.operations == 1
+
+        with pytest.raises(BudgetExceededError):
+            await load_from_file(large, process_threshold=1024)
+
+    # Files are merged in the order given wherever they were loaded
+    result = await parse_files([large, small], process_threshold=1024)
+    assert result["name"] == "small"
+    assert result["other"] == 1
+    assert len(result["items"]) == 1000
+
+
+async def test_load_from_file_shares_referenced_documents():
+    from manifest.hooks import register_hook
+    from manifest.hooks.interface import unregister_hook
+
+    await dump_to_file("memory://common.json", {"a": {"b": [1, 2]}, "c": "$upper{shared}"})
+    await dump_to_file(
+        "memory://main.json",
+        {f"key{i}": "$ref{memory://common.json|a}" for i in range(10)}
+        | {"c": "$ref{memory://common.json|c}"}
+    )
+
+    loads = []
+
+    def count_loads(data: bytes) -> bytes:
+        loads.append(data)
+        return data
+
+    register_hook(count_loads, hook_type="pre", operation="load")
+
+    try:
+        result = await load_from_file("memory://main.json")
+    finally:
+        unregister_hook(count_loads, hook_type="pre", operation="load")
+
+    assert len(loads) == 2
+    assert result["key0"] == {"b": [1, 2]}
+    assert result["c"] == "SHARED"
+    # Each reference gets its own copy of the shared document's values
+    assert result["key0"] is not result["key1"]
+
+
+async def test_load_from_file_circular_references():
+    await dump_to_file("memory://cycle_a.json", {"a": "$ref{memory://cycle_b.json|b}"})
+    await dump_to_file("memory://cycle_b.json", {"b": "$ref{memory://cycle_a.json|a}"})
+
+    with pytest.raises(ValueError, match="Circular"):
+        await load_from_file("memory://cycle_a.json")
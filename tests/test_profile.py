@@ -0,0 +1,100 @@
+import json
+import tracemalloc
+
+from manifest.base import Manifest
+from manifest.options import BuildOptions
+from manifest.parse import dump_to_file, load_from_file
+from manifest.profile import BuildProfile, MemoryProfile, profile_build, profile_memory
+
+
+class ProfiledManifest(Manifest):
+    name: str = ""
+    count: int = 0
+
+
+async def test_build_profile():
+    await dump_to_file("memory://profile.json", {"name": "$upper{value}", "count": 1})
+
+    profile = BuildProfile()
+    manifest = await ProfiledManifest.build(
+        files=["memory://profile.json"], key_values=["count=2"],
+        build_options=BuildOptions(profile=profile),
+    )
+    assert manifest.name == "VALUE"
+
+    for stage in ("dotenv", "env", "files", "key_values", "merge", "validate", "read"):
+        assert stage in profile.stages
+
+    file = profile.files["memory://profile.json"]
+    assert set(file) == {"read", "pre_hooks", "deserialize", "post_hooks"}
+    assert profile.bytes_read["memory://profile.json"] > 0
+    assert profile.hooks["substitute_env_vars"].count == 1
+    assert profile.hooks["resolve_expressions"].count == 1
+    assert profile.operations["upper"].count == 1
+    assert profile.slowest_expressions[0][0] == "$upper{value}"
+    assert profile.total > 0
+
+    exported = json.loads(profile.to_json())
+    assert exported["files"]["memory://profile.json"]["bytes"] > 0
+    assert exported["operations"]["upper"]["count"] == 1
+
+    table = profile.format_table()
+    assert "memory://profile.json" in table
+    assert "resolve_expressions" in table
+
+
+async def test_profile_build_context_manager():
+    await dump_to_file("memory://profile_other.json", {"a": 1})
+
+    with profile_build() as profile:
+        await load_from_file("memory://profile_other.json")
+        await load_from_file("memory://profile_other.json")
+
+    assert profile.stages["read"].count == 2
+    assert profile.files["memory://profile_other.json"]["deserialize"].count == 2
+
+
+def test_slowest_expressions():
+    profile = BuildProfile(max_expressions=2)
+
+    for index, duration in enumerate([0.3, 0.1, 0.5, 0.2]):
+        profile.record_expression(f"$expr{{{index}}}", duration)
+
+    assert profile.slowest_expressions == [("$expr{2}", 0.5), ("$expr{0}", 0.3)]
+
+
+async def test_memory_profile():
+    await dump_to_file(
+        "memory://profile_memory.json",
+        {"items": [f"item {index}" for index in range(10000)], "name": "$upper{value}"},
+    )
+
+    memory = MemoryProfile()
+    manifest = await ProfiledManifest.build(
+        files=["memory://profile_memory.json"], build_options=BuildOptions(memory_profile=memory)
+    )
+    assert manifest.name == "VALUE"
+
+    file = memory.files["memory://profile_memory.json"]
+    assert set(file) == {"read", "pre_hooks", "deserialize", "post_hooks"}
+    # The parsed tree of 10000 strings is retained and bigger than the raw bytes
+    assert file["deserialize"].retained > 10000 * 40
+    assert file["deserialize"].peak >= file["deserialize"].retained
+    assert memory.hooks["resolve_expressions"].count == 1
+    assert memory.stages["validate"].count == 1
+    assert memory.peak >= file["deserialize"].peak
+
+    assert json.loads(memory.to_json())["files"]["memory://profile_memory.json"]
+    assert "deserialize" in memory.format_table()
+
+
+async def test_profile_memory_context_manager():
+    await dump_to_file("memory://profile_memory_small.json", {"a": 1})
+
+    assert not tracemalloc.is_tracing()
+
+    with profile_memory() as memory:
+        await load_from_file("memory://profile_memory_small.json")
+
+    assert not tracemalloc.is_tracing()
+    assert memory.stages["read"].count == 1
@@ -0,0 +1,86 @@
+import pytest
+
+from manifest.base import Manifest
+from manifest.hooks.expressions.resolve import resolve_expressions
+from manifest.parse import dump_to_file
+from manifest.tracing import (
+    SpanListener,
+    listen,
+    register_listener,
+    span,
+    unregister_listener,
+)
+
+
+class RecordingListener(SpanListener):
+    def __init__(self):
+        self.started = []
+        self.ended = []
+
+    def on_start(self, span):
+        self.started.append(span)
+
+    def on_end(self, span):
+        self.ended.append(span)
+
+
+class TracedManifest(Manifest):
+    name: str = ""
+
+
+async def test_build_spans():
+    await dump_to_file("memory://traced.json", {"name": "$upper{value}"})
+
+    listener = RecordingListener()
+    register_listener(listener)
+
+    try:
+        await TracedManifest.build(files=["memory://traced.json"])
+    finally:
+        unregister_listener(listener)
+
+    spans = {span.name: span for span in listener.ended}
+    assert len(listener.started) == len(listener.ended)
+    assert listener.ended[-1].name == "manifest.build"
+
+    load = spans["manifest.load"]
+    assert load.attributes == {"path": "memory://traced.json", "protocol": "memory"}
+    assert load.parent is spans["manifest.files"]
+    assert spans["manifest.read"].attributes["bytes"] > 0
+    assert spans["manifest.read"].parent is load
+
+    # Sync hooks run in a thread but are still nested in the load
+    hooks = [span for span in listener.ended if span.name == "manifest.hook"]
+    assert {hook.attributes["hook"] for hook in hooks} == {
+        "substitute_env_vars", "resolve_expressions"
+    }
+    assert all(hook.parent.parent is load for hook in hooks)
+
+    assert spans["manifest.operation"].attributes == {"operation": "upper"}
+    assert spans["manifest.operation"].parent is spans["manifest.expression"]
+
+
+async def test_operation_cache_hit_spans():
+    with listen(RecordingListener()) as listener:
+        await resolve_expressions({"a": "$base64{value}", "b": "$base64{value}"})
+
+    operations = [span for span in listener.ended if span.name == "manifest.operation"]
+    assert sorted(span.attributes["cache_hit"] for span in operations) == [False, True]
+
+
+def test_span():
+    with span("outside") as inactive:
+        assert inactive is None
+
+    with listen(RecordingListener()) as listener:
+        with pytest.raises(ValueError):
+            with span("outer", key="value"):
+                with span("inner") as inner:
+                    inner.set_attribute("other", 1)
+                raise ValueError("error")
+
+    inner, outer = listener.ended
+    assert inner.parent is outer
+    assert inner.attributes == {"other": 1}
+    assert isinstance(outer.error, ValueError)
+    assert outer.duration >= inner.duration
@@ -1,5 +1,6 @@
 import pytest
 from pathlib import Path
+from typing import Any, Optional
 
 from manifest.utils import (
     is_async_callable,
@@ -8,11 +9,18 @@ from manifest.utils import (
     unset_by_dot_path,
     current_directory,
     import_from_string,
+    invalidate_import_cache,
     merge_dicts_flat,
     merge_dicts,
+    merge_lists,
     get_filename_suffix,
     coerce_to_basic_types,
+    coerce_to_type,
     Sentinel,
+    Wildcard,
+    compile_dot_path,
+    parse_dot_path,
+    run_sync,
 )
 
 
@@ -27,6 +35,19 @@ def test_is_async_callable():
     assert not is_async_callable(sync_func)
 
 
+async def test_run_sync_in_running_loop():
+    from contextvars import ContextVar
+
+    variable: ContextVar[str] = ContextVar("variable", default="")
+    variable.set("outer")
+
+    async def get_variable():
+        return variable.get()
+
+    # The coroutine runs on another thread's event loop, in a copy of this context
+    assert run_sync(get_variable) == "outer"
+
+
 def test_get_by_dot_path():
     data = {"a": {"b": {"c": 3}}}
 
@@ -78,6 +99,13 @@ def test_set_by_dot_path():
     with pytest.raises(AssertionError):
         set_by_dot_path([1, 2, 3], "0", 4)
 
+    # A path can't go through a value that isn't a dict or list
+    with pytest.raises(ValueError):
+        set_by_dot_path({"a": 1}, "a.b.c", 4)
+
+    with pytest.raises(ValueError):
+        set_by_dot_path({"a": [1]}, "a[0].b", 4)
+
 
 def test_unset_by_dot_path():
     data = {"a": {"b": {"c": 3}}}
@@ -92,6 +120,43 @@ def test_unset_by_dot_path():
     assert unset_by_dot_path({"a": 1}, "b.c") == {"a": 1}
 
 
+def test_compile_dot_path():
+    path = compile_dot_path("a.b[0].c")
+    assert path is compile_dot_path("a.b[0].c")
+    assert path.parts == ("a", "b", 0, "c")
+    assert parse_dot_path("a[1][-1].b[].c[*]") == ["a", 1, -1, "b", Sentinel, "c", Wildcard]
+    assert parse_dot_path("a[b]") == ["a[b]"]
+
+    data = {"a": {"b": [{"c": 1}, {"c": 2}]}}
+    assert path.get(data) == 1
+    assert path.exists(data)
+    assert compile_dot_path("a.b[-1].c").get(data) == 2
+    assert compile_dot_path("a.b[*].c").get(data) == [1, 2]
+    assert compile_dot_path("a.b[5].c").get(data, default=0) == 0
+    assert not compile_dot_path("a.b[5].c").exists(data)
+    assert not compile_dot_path("a.b[*].d").exists(data)
+
+    compile_dot_path("a.b[*].c").set(data, 3)
+    assert data == {"a": {"b": [{"c": 3}, {"c": 3}]}}
+    compile_dot_path("a.b[-1].d").set(data, 4)
+    assert data == {"a": {"b": [{"c": 3}, {"c": 3, "d": 4}]}}
+    compile_dot_path("a.b[*].c").unset(data)
+    assert data == {"a": {"b": [{}, {"d": 4}]}}
+
+    with pytest.raises(IndexError):
+        compile_dot_path("a.b[-3]").set(data, 5)
+
+    # Missing containers are created to match the next key, and sparse
+    # indices are padded in one go
+    data = {}
+    compile_dot_path("x.y[2].z").set(data, 1)
+    assert data == {"x": {"y": [Sentinel, Sentinel, {"z": 1}]}}
+    compile_dot_path("x.y[100000]").set(data, 2)
+    assert len(data["x"]["y"]) == 100001
+    compile_dot_path("x.y[*]").unset(data)
+    assert data == {"x": {"y": []}}
+
+
 def test_current_directory(tmpdir):
     tmp_dir = Path(tmpdir)
     cwd = Path.cwd()
@@ -139,6 +204,25 @@ def test_import_from_string():
         import_from_string(" hello world!")
 
 
+def test_import_from_string_cache(tmp_path, monkeypatch):
+    (tmp_path / "plugin_module.py").write_text("class Plugin: ...\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    plugin = import_from_string("plugin_module.Plugin")
+    assert import_from_string("plugin_module.Plugin") is plugin
+
+    invalidate_import_cache("plugin_module")
+    assert import_from_string("plugin_module.Plugin") is plugin
+
+    (tmp_path / "plugin_module.py").write_text("class Plugin: ...\nclass Other: ...\n")
+    reloaded = import_from_string("plugin_module.Plugin", reload=True)
+    assert reloaded is not plugin
+    assert import_from_string("plugin_module.Plugin") is reloaded
+    assert import_from_string("plugin_module.Other")
+
+    invalidate_import_cache()
+
+
 def test_merge_dicts_flat():
     dict1 = {"a": 1, "b": 2}
     dict2 = {"b": 3, "c": 4}
@@ -190,6 +274,47 @@ def test_merge_dicts_with_lists():
 
     assert merged_dict == expected_dict
 
+def test_merge_dicts_with_list_keys():
+    services = [{"name": f"service{i}", "replicas": 1} for i in range(1000)]
+    dict1 = {"a": {"services": services}, "b": [{"id": 1}]}
+    dict2 = {"a": {"services": [{"name": "service500", "replicas": 3}, {"name": "new"}]}}
+
+    merged_dict = merge_dicts(dict1, dict2, list_keys={"a.services": "name"})
+
+    assert len(merged_dict["a"]["services"]) == 1001
+    assert merged_dict["a"]["services"][500] == {"name": "service500", "replicas": 3}
+    assert merged_dict["a"]["services"][-1] == {"name": "new"}
+    assert dict1["a"]["services"][500] == {"name": "service500", "replicas": 1}
+
+    merged_dict = merge_dicts_flat(
+        {"b": [{"id": 1}, {"id": 2}]},
+        {"b": [{"id": 2, "x": 1}]},
+        list_keys={"b": "id"},
+    )
+    assert merged_dict == {"b": [{"id": 1}, {"id": 2, "x": 1}]}
+
+    # Lists without a key field are still merged by position
+    assert merge_dicts_flat({"b": [{"id": 1}]}, {"b": [{"id": 2}]}) == {"b": [{"id": 2}]}
+
+    # Part of a larger dict is merged with list keys relative to the root
+    merged_dict = merge_dicts(
+        {"services": [{"name": "a", "port": 1}]},
+        {"services": [{"name": "a", "port": 2}]},
+        list_keys={"a.services": "name"},
+        path="a",
+    )
+    assert merged_dict == {"services": [{"name": "a", "port": 2}]}
+
+
+def test_merge_lists():
+    first = [{"id": 1, "x": 1}, {"id": 2}]
+
+    assert merge_lists(first, [{"id": 1, "x": 2}], list_key="id") == [{"id": 1, "x": 2}, {"id": 2}]
+    assert merge_lists([1, 2, 3], [Sentinel, 5], [6]) == [6, 5, 3]
+    assert merge_lists(first) is first
+    assert first == [{"id": 1, "x": 1}, {"id": 2}]
+
+
 def test_merge_dicts_with_lists_and_sentinel():
     dict1 = {"a": {"b": [1, 2, 3]}}
     dict2 = {"a": {"b": [Sentinel, 5, Sentinel]}}
@@ -204,6 +329,38 @@ def test_merge_dicts_with_lists_and_sentinel():
 
     assert merged_dict == expected_dict
 
+def test_merge_dicts_does_not_mutate_inputs():
+    shared = {"x": {"y": 1}}
+    dict1 = {"a": {"b": [1, 2, 3], "c": {"d": 1}}, "shared": shared}
+    dict2 = {"a": {"b": [Sentinel, 5], "c": {"e": 2}}}
+
+    merged = merge_dicts(dict1, dict2)
+
+    assert merged == {"a": {"b": [1, 5, 3], "c": {"d": 1, "e": 2}}, "shared": shared}
+    assert dict1 == {"a": {"b": [1, 2, 3], "c": {"d": 1}}, "shared": shared}
+    assert dict2 == {"a": {"b": [Sentinel, 5], "c": {"e": 2}}}
+    # Untouched subtrees are shared rather than copied
+    assert merged["shared"] is shared
+
+    flat = merge_dicts_flat(dict1["a"], {"b": [Sentinel, 6]})
+    assert flat["b"] == [1, 6, 3]
+    assert dict1["a"]["b"] == [1, 2, 3]
+
+
+def test_merge_dicts_deeply_nested():
+    def nested(depth, leaf):
+        data = leaf
+        for _ in range(depth):
+            data = {"a": data}
+        return data
+
+    merged = merge_dicts(nested(5000, {"b": 1}), nested(5000, {"c": 2}))
+
+    for _ in range(5000):
+        merged = merged["a"]
+    assert merged == {"b": 1, "c": 2}
+
+
 def test_get_filename_suffix():
     file_path = "path/to/file.txt"
     suffix = get_filename_suffix(file_path)
@@ -242,3 +399,26 @@ def test_coerce_to_basic_types():
 
     coerced_data = coerce_to_basic_types(data)
     assert coerced_data == expected_result
+
+
+def test_coerce_to_basic_types_strings():
+    assert coerce_to_basic_types(["1", "2", "3"]) == [1, 2, 3]
+    assert coerce_to_basic_types(["1", "2.5", "true", "null", "text"]) == [1, 2.5, True, None, "text"]
+    assert coerce_to_basic_types(("1", 2, {"a": "3"})) == [1, 2, {"a": 3}]
+
+
+def test_coerce_to_type():
+    assert coerce_to_type("007", str) == "007"
+    assert coerce_to_type("007", int) == 7
+    assert coerce_to_type("1", float) == 1.0
+    assert coerce_to_type("True", bool) is True
+    assert coerce_to_type("null", Optional[int]) is None
+    assert coerce_to_type(["1", "2"], list[float]) == [1.0, 2.0]
+    assert coerce_to_type(["1", "2"], tuple[str, int]) == ["1", 2]
+    assert coerce_to_type({"a": "1"}, dict[str, str]) == {"a": "1"}
+
+    # Values that don't convert to the hint are guessed instead
+    assert coerce_to_type("text", int) == "text"
+    assert coerce_to_type(["1", "x"], list[int]) == [1, "x"]
+    assert coerce_to_basic_types("1", hint=Any) == 1
+